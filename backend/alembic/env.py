@@ -10,6 +10,7 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
 from app.models import Base
 from app.core.config import settings
+from app.core.partitions import is_partition
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -27,6 +28,18 @@ target_metadata = Base.metadata
 # Override the SQLAlchemy URL with the one from settings
 config.set_main_option("sqlalchemy.url", settings.DATABASE_URL)
 
+def include_name(name, type_, parent_names):
+    """Leave the runtime-managed emails partitions out of autogenerate"""
+    if type_ == "table":
+        return not is_partition(name)
+    return True
+
+def include_object(object_, name, type_, reflected, compare_to):
+    """Also skip the copies Postgres makes of foreign keys to emails, one per partition"""
+    if type_ == "foreign_key_constraint" and reflected:
+        return not is_partition(object_.referred_table.name)
+    return True
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -49,6 +62,8 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_name=include_name,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -72,7 +87,9 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection, target_metadata=target_metadata,
+            include_name=include_name,
+            include_object=include_object
         )
 
         with context.begin_transaction():
@@ -0,0 +1,49 @@
+"""Add email_counters
+
+Revision ID: 324a71e04275
+Revises: 4c581d6279b6
+Create Date: 2026-10-19 13:41:05.227716
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '324a71e04275'
+down_revision: Union[str, Sequence[str], None] = '4c581d6279b6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('email_counters',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(), nullable=False),
+    sa.Column('ref_id', sa.Integer(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'kind', 'ref_id')
+    )
+
+    # Backfill from existing emails
+    op.execute("""
+        INSERT INTO email_counters (user_id, kind, ref_id, count)
+        SELECT user_id, 'category', COALESCE(category_id, 0), COUNT(*)
+        FROM emails
+        WHERE user_id IS NOT NULL
+        GROUP BY user_id, COALESCE(category_id, 0)
+        UNION ALL
+        SELECT user_id, 'account', gmail_account_id, COUNT(*)
+        FROM emails
+        WHERE user_id IS NOT NULL AND gmail_account_id IS NOT NULL
+        GROUP BY user_id, gmail_account_id;
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('email_counters')
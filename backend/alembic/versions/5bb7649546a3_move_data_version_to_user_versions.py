@@ -0,0 +1,45 @@
+"""Move data_version to user_versions
+
+Revision ID: 5bb7649546a3
+Revises: ae7eea0b0e4c
+Create Date: 2026-10-19 19:02:44.318207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5bb7649546a3'
+down_revision: Union[str, Sequence[str], None] = 'ae7eea0b0e4c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('user_versions',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('data_version', sa.BigInteger(), server_default='0', nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+
+    # Carry versions over so cached ETags stay valid
+    op.execute("""
+        INSERT INTO user_versions (user_id, data_version)
+        SELECT id, data_version FROM users WHERE data_version > 0;
+    """)
+    op.drop_column('users', 'data_version')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.add_column('users', sa.Column('data_version', sa.BigInteger(), nullable=False, server_default='0'))
+    op.execute("""
+        UPDATE users SET data_version = user_versions.data_version
+        FROM user_versions WHERE user_versions.user_id = users.id;
+    """)
+    op.drop_table('user_versions')
@@ -0,0 +1,47 @@
+"""Add gmail_messages
+
+Revision ID: 5ee8e47982fa
+Revises: 5bb7649546a3
+Create Date: 2026-10-19 19:41:12.904153
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5ee8e47982fa'
+down_revision: Union[str, Sequence[str], None] = '5bb7649546a3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('gmail_messages',
+    sa.Column('gmail_account_id', sa.Integer(), nullable=False),
+    sa.Column('gmail_id', sa.String(), nullable=False),
+    sa.Column('email_id', sa.Integer(), nullable=False),
+    sa.Column('received_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['email_id', 'received_at'], ['emails.id', 'emails.received_at'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['gmail_account_id'], ['gmail_accounts.id'], ),
+    sa.PrimaryKeyConstraint('gmail_account_id', 'gmail_id')
+    )
+    op.create_index('ix_gmail_messages_email_id', 'gmail_messages', ['email_id', 'received_at'], unique=False)
+
+    # Backfill from existing emails; where a message was ingested twice, the first copy wins
+    op.execute("""
+        INSERT INTO gmail_messages (gmail_account_id, gmail_id, email_id, received_at)
+        SELECT DISTINCT ON (gmail_account_id, gmail_id) gmail_account_id, gmail_id, id, received_at
+        FROM emails
+        WHERE gmail_account_id IS NOT NULL AND gmail_id IS NOT NULL
+        ORDER BY gmail_account_id, gmail_id, id;
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_gmail_messages_email_id', table_name='gmail_messages')
+    op.drop_table('gmail_messages')
@@ -0,0 +1,61 @@
+"""Add composite indexes for hot queries
+
+Revision ID: 7b51e2c80e46
+Revises: cfaff238537d
+Create Date: 2026-10-19 09:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7b51e2c80e46'
+down_revision: Union[str, Sequence[str], None] = 'cfaff238537d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (index name, table, columns)
+# - list_emails always filters on user_id and orders by received_at DESC,
+#   optionally narrowed by category_id or gmail_account_id. A category or
+#   account already belongs to a single user, so those two lead their index.
+# - The sync dedup lookup (gmail_id + gmail_account_id) is served by the
+#   existing unique ix_emails_gmail_id.
+# - Category views and account listings filter on user_id.
+INDEXES = [
+    ('ix_emails_user_id_received_at', 'emails', ['user_id', sa.text('received_at DESC')]),
+    ('ix_emails_category_id_received_at', 'emails', ['category_id', sa.text('received_at DESC')]),
+    ('ix_emails_gmail_account_id_received_at', 'emails', ['gmail_account_id', sa.text('received_at DESC')]),
+    ('ix_categories_user_id', 'categories', ['user_id']),
+    ('ix_gmail_accounts_user_id', 'gmail_accounts', ['user_id']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                unique=False,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(
+                name,
+                table_name=table,
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
@@ -0,0 +1,151 @@
+"""Partition emails by received_at month
+
+Revision ID: ae7eea0b0e4c
+Revises: d208d92c46a5
+Create Date: 2026-10-19 23:31:05.842716
+
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'ae7eea0b0e4c'
+down_revision: Union[str, Sequence[str], None] = 'd208d92c46a5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Monthly partitions created for existing mail; anything older goes to emails_p_old
+MONTHS_BACK = 24
+MONTHS_AHEAD = 3
+
+FOREIGN_KEYS = ('emails_category_id_fkey', 'emails_gmail_account_id_fkey', 'emails_user_id_fkey')
+INDEXES = ('ix_emails_ai_dead', 'ix_emails_ai_retry_at', 'ix_emails_category_id_received_at',
+           'ix_emails_gmail_account_id_received_at', 'ix_emails_gmail_id', 'ix_emails_user_id_received_at')
+
+COLUMNS = (
+    "id, gmail_id, subject, sender, content, summary, unsubscribe_link, unsubscribe_one_click, "
+    "received_at, is_archived, category_id, user_id, gmail_account_id, created_at, updated_at, "
+    "ai_status, ai_attempts, ai_error, ai_retry_at"
+)
+
+
+def _add_months(month: datetime, count: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + count
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def _set_aside(table: str, indexes: Sequence[str]) -> None:
+    """Rename emails out of the way and free the names of its constraints and indexes"""
+    op.execute(f"ALTER TABLE emails RENAME TO {table}")
+    op.execute(f"ALTER TABLE {table} RENAME CONSTRAINT emails_pkey TO {table}_pkey")
+    op.execute("ALTER SEQUENCE emails_id_seq OWNED BY NONE")
+    for constraint in FOREIGN_KEYS:
+        op.drop_constraint(constraint, table, type_='foreignkey')
+    for index in indexes:
+        op.drop_index(index, table_name=table)
+
+
+def _create_email_indexes(partitioned: bool) -> None:
+    op.create_index('ix_emails_gmail_id', 'emails', ['gmail_id', 'received_at'] if partitioned else ['gmail_id'], unique=True)
+    op.create_index('ix_emails_user_id_received_at', 'emails', ['user_id', sa.text('received_at DESC')], unique=False)
+    op.create_index('ix_emails_category_id_received_at', 'emails', ['category_id', sa.text('received_at DESC')], unique=False)
+    op.create_index('ix_emails_gmail_account_id_received_at', 'emails', ['gmail_account_id', sa.text('received_at DESC')], unique=False)
+    op.create_index('ix_emails_ai_retry_at', 'emails', ['ai_retry_at'], unique=False, postgresql_where=sa.text('ai_retry_at IS NOT NULL'))
+    op.create_index('ix_emails_ai_dead', 'emails', ['id'], unique=False, postgresql_where=sa.text("ai_status = 'dead'"))
+    if not partitioned:
+        op.create_index('ix_emails_id', 'emails', ['id'], unique=False)
+
+
+def _create_emails_table(partitioned: bool) -> None:
+    op.create_table('emails',
+    sa.Column('id', sa.Integer(), server_default=sa.text("nextval('emails_id_seq'::regclass)"), nullable=False),
+    sa.Column('gmail_id', sa.String(), nullable=True),
+    sa.Column('subject', sa.String(), nullable=True),
+    sa.Column('sender', sa.String(), nullable=True),
+    sa.Column('content', sa.Text(), nullable=True),
+    sa.Column('summary', sa.Text(), nullable=True),
+    sa.Column('unsubscribe_link', sa.Text(), nullable=True),
+    sa.Column('unsubscribe_one_click', sa.Boolean(), server_default='false', nullable=False),
+    sa.Column('received_at', sa.DateTime(), nullable=not partitioned),
+    sa.Column('is_archived', sa.Boolean(), nullable=True),
+    sa.Column('category_id', sa.Integer(), nullable=True),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('gmail_account_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('ai_status', sa.String(), server_default='done', nullable=False),
+    sa.Column('ai_attempts', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('ai_error', sa.Text(), nullable=True),
+    sa.Column('ai_retry_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['category_id'], ['categories.id'], ),
+    sa.ForeignKeyConstraint(['gmail_account_id'], ['gmail_accounts.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id', 'received_at') if partitioned else sa.PrimaryKeyConstraint('id'),
+    **({'postgresql_partition_by': 'RANGE (received_at)'} if partitioned else {})
+    )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('email_partitions',
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('starts_at', sa.DateTime(), nullable=True),
+    sa.Column('ends_at', sa.DateTime(), nullable=False),
+    sa.Column('compacted_at', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+    # Swap in a partitioned table. The old one keeps the data until it is
+    # copied; its constraints and indexes go first so their names are free
+    _set_aside('emails_unpartitioned', INDEXES + ('ix_emails_id',))
+    _create_emails_table(partitioned=True)
+    _create_email_indexes(partitioned=True)
+
+    # The partition key can't be NULL: no range partition accepts it
+    bind = op.get_bind()
+    now = datetime.utcnow()
+    current = datetime(now.year, now.month, 1)
+    oldest = bind.execute(sa.text(
+        "SELECT min(coalesce(received_at, created_at)) FROM emails_unpartitioned"
+    )).scalar()
+    first = max(datetime(oldest.year, oldest.month, 1), _add_months(current, -MONTHS_BACK)) if oldest else current
+    first = min(first, current)
+
+    partitions = [('emails_p_old', None, first)]
+    month = first
+    while month <= _add_months(current, MONTHS_AHEAD):
+        partitions.append((f"emails_p{month:%Y_%m}", month, _add_months(month, 1)))
+        month = _add_months(month, 1)
+    for name, starts_at, ends_at in partitions:
+        lower = f"'{starts_at:%Y-%m-%d}'" if starts_at else "MINVALUE"
+        op.execute(f"CREATE TABLE {name} PARTITION OF emails FOR VALUES FROM ({lower}) TO ('{ends_at:%Y-%m-%d}')")
+    op.bulk_insert(
+        sa.table('email_partitions', sa.column('name'), sa.column('starts_at'), sa.column('ends_at'), sa.column('created_at')),
+        [{'name': name, 'starts_at': starts_at, 'ends_at': ends_at, 'created_at': now} for name, starts_at, ends_at in partitions]
+    )
+
+    op.execute(
+        f"INSERT INTO emails ({COLUMNS}) "
+        f"SELECT {COLUMNS.replace('received_at,', 'coalesce(received_at, created_at, now()),', 1)} "
+        f"FROM emails_unpartitioned"
+    )
+    op.execute("ALTER SEQUENCE emails_id_seq OWNED BY emails.id")
+    op.drop_table('emails_unpartitioned')
+    op.execute("ANALYZE emails")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _set_aside('emails_partitioned', INDEXES)
+    _create_emails_table(partitioned=False)
+    op.execute(f"INSERT INTO emails ({COLUMNS}) SELECT {COLUMNS} FROM emails_partitioned")
+    op.execute("ALTER SEQUENCE emails_id_seq OWNED BY emails.id")
+    # Partitions go with their parent
+    op.drop_table('emails_partitioned')
+    _create_email_indexes(partitioned=False)
+    op.drop_table('email_partitions')
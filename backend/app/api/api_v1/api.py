@@ -1,8 +1,13 @@
 from fastapi import APIRouter
-from app.api.api_v1.endpoints import auth, categories, emails, gmail_accounts
+from app.api.api_v1.endpoints import admin, auth, categories, emails, events, gmail_accounts, jobs, stats, unsubscribe
 
 api_router = APIRouter()
+api_router.include_router(admin.router, prefix="/admin", tags=["admin"])
 api_router.include_router(auth.router, prefix="/auth", tags=["auth"])
 api_router.include_router(categories.router, prefix="/categories", tags=["categories"])
 api_router.include_router(emails.router, prefix="/emails", tags=["emails"])
-api_router.include_router(gmail_accounts.router, prefix="/gmail-accounts", tags=["gmail-accounts"])
\ No newline at end of file
+api_router.include_router(events.router, prefix="/events", tags=["events"])
+api_router.include_router(gmail_accounts.router, prefix="/gmail-accounts", tags=["gmail-accounts"])
+api_router.include_router(jobs.router, prefix="/jobs", tags=["jobs"])
+api_router.include_router(stats.router, prefix="/stats", tags=["stats"])
+api_router.include_router(unsubscribe.router, prefix="/unsubscribe", tags=["unsubscribe"])
@@ -0,0 +1,45 @@
+from typing import List, Optional
+from fastapi import APIRouter, Body, Depends, Query
+from sqlalchemy.orm import Session
+
+from app.api import deps
+from app.core.principal import Principal
+from app.models import Email
+from app.schemas.admin import DeadLetter, RequeueResult
+from app.services.ai import AI_DEAD
+from app.services.ai_retry import requeue_dead_letters
+
+router = APIRouter()
+
+@router.get("/ai/dead-letters", response_model=List[DeadLetter])
+def list_dead_letters(
+    user_id: Optional[int] = None,
+    skip: int = 0,
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(deps.get_db),
+    admin: Principal = Depends(deps.get_admin_principal)
+):
+    """List emails whose AI processing ran out of attempts, newest first"""
+    query = db.query(
+        Email.id, Email.user_id, Email.gmail_account_id, Email.subject, Email.sender,
+        Email.received_at, Email.ai_attempts, Email.ai_error, Email.updated_at
+    ).filter(Email.ai_status == AI_DEAD)
+    if user_id is not None:
+        query = query.filter(Email.user_id == user_id)
+    return query.order_by(Email.id.desc()).offset(skip).limit(limit).all()
+
+@router.post("/ai/dead-letters/requeue", response_model=RequeueResult)
+def requeue_dead_letter_emails(
+    email_ids: Optional[List[int]] = Body(None),
+    user_id: Optional[int] = None,
+    db: Session = Depends(deps.get_db),
+    admin: Principal = Depends(deps.get_admin_principal)
+):
+    """
+    Retry AI processing for dead-lettered emails
+    Requeues the listed emails, or every dead-lettered email (of `user_id`,
+    when given) if no list is sent.
+    """
+    requeued = requeue_dead_letters(db, email_ids, user_id)
+    db.commit()
+    return {"requeued": requeued}
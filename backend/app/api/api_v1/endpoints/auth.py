@@ -15,6 +15,7 @@ import jwt
 os.environ['OAUTHLIB_INSECURE_TRANSPORT'] = '1'
 
 from app.api import deps
+from app.core.principal import Principal
 from app.core.config import settings
 from app.models import User, GmailAccount
 from app.schemas.user import User as UserSchema
@@ -48,7 +49,7 @@ def get_user_from_token(token: str, db: Session) -> User | None:
 @router.get("/google-auth-url", response_model=dict)
 def get_google_auth_url(
     connect_account: bool = False,
-    current_user: User | None = Depends(deps.get_current_user_optional)
+    current_user: Principal | None = Depends(deps.get_current_principal_optional)
 ):
     """
     Get the Google OAuth2 authorization URL
@@ -70,7 +71,7 @@ def get_google_auth_url(
     return {"url": auth_url}
 
 @router.get("/google/callback")
-async def google_callback(
+def google_callback(
     request: Request,
     code: str,
     state: str = "login",
@@ -81,7 +82,7 @@ async def google_callback(
     This endpoint is called by Google's OAuth service
     """
     try:
-        result = await handle_oauth_callback(request, code, state, db)
+        result = handle_oauth_callback(request, code, state, db)
         
         # Redirect to frontend with the result
         params = "&".join([f"{k}={v}" for k, v in result.items()])
@@ -94,7 +95,7 @@ async def google_callback(
         return RedirectResponse(url=frontend_url)
 
 @router.post("/exchange-code")
-async def exchange_code(
+def exchange_code(
     request: Request,
     code: str,
     state: str = "login",
@@ -105,14 +106,14 @@ async def exchange_code(
     This endpoint is called by our frontend
     """
     try:
-        return await handle_oauth_callback(request, code, state, db)
+        return handle_oauth_callback(request, code, state, db)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
         )
 
-async def handle_oauth_callback(
+def handle_oauth_callback(
     request: Request,
     code: str,
     state: str,
@@ -1,34 +1,54 @@
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
 from sqlalchemy.orm import Session
 
 from app.api import deps
-from app.models import User, Category
+from app.api.conditional import make_etag, is_not_modified, not_modified, set_etag
+from app.core.versioning import get_user_version
+from app.core.principal import Principal
+from app.models import Category
 from app.schemas.category import CategoryCreate, CategoryUpdate, Category as CategorySchema
+from app.services.jobs import enqueue_reclassify
+from app.services.reclassify import detach_category
 
 router = APIRouter()
 
 @router.get("/", response_model=List[CategorySchema])
 def get_categories(
+    request: Request,
+    response: Response,
     db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user)
+    current_user: Principal = Depends(deps.get_current_principal)
 ):
     """Get all categories for the current user"""
+    version = get_user_version(db, current_user.id)
+    etag = make_etag(current_user.id, version, "categories")
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+
     return db.query(Category).filter(Category.user_id == current_user.id).all()
 
 @router.post("/", response_model=CategorySchema, status_code=status.HTTP_201_CREATED)
 def create_category(
     category: CategoryCreate,
+    response: Response,
     db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user)
+    current_user: Principal = Depends(deps.get_current_principal)
 ):
-    """Create a new category"""
+    """
+    Create a new category
+    Queues reclassification of uncategorized emails; the job ID is returned
+    in the X-Job-Id header.
+    """
     db_category = Category(
         name=category.name,
         description=category.description,
         user_id=current_user.id
     )
     db.add(db_category)
+    job = enqueue_reclassify(db, current_user.id, uncategorized=True)
+    response.headers["X-Job-Id"] = str(job.id)
     db.commit()
     db.refresh(db_category)
     return db_category
@@ -37,7 +57,7 @@ def create_category(
 def get_category(
     category_id: int,
     db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user)
+    current_user: Principal = Depends(deps.get_current_principal)
 ):
     """Get a specific category"""
     category = db.query(Category).filter(
@@ -55,10 +75,15 @@ def get_category(
 def update_category(
     category_id: int,
     category_update: CategoryUpdate,
+    response: Response,
     db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user)
+    current_user: Principal = Depends(deps.get_current_principal)
 ):
-    """Update a category"""
+    """
+    Update a category
+    A changed name or description queues reclassification of the category's
+    emails and uncategorized emails (job ID in the X-Job-Id header).
+    """
     category = db.query(Category).filter(
         Category.id == category_id,
         Category.user_id == current_user.id
@@ -69,9 +94,16 @@ def update_category(
             detail="Category not found"
         )
     
-    for field, value in category_update.dict().items():
+    changes = {
+        field: value for field, value in category_update.dict().items()
+        if getattr(category, field) != value
+    }
+    for field, value in changes.items():
         setattr(category, field, value)
-    
+
+    if changes:
+        job = enqueue_reclassify(db, current_user.id, category_ids=[category.id], uncategorized=True)
+        response.headers["X-Job-Id"] = str(job.id)
     db.commit()
     db.refresh(category)
     return category
@@ -79,10 +111,16 @@ def update_category(
 @router.delete("/{category_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_category(
     category_id: int,
+    response: Response,
     db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user)
+    current_user: Principal = Depends(deps.get_current_principal)
 ):
-    """Delete a category"""
+    """
+    Delete a category
+    Its emails become uncategorized straight away, and the user's
+    uncategorized emails are queued for reclassification against the
+    remaining categories (job ID in the X-Job-Id header).
+    """
     category = db.query(Category).filter(
         Category.id == category_id,
         Category.user_id == current_user.id
@@ -93,6 +131,10 @@ def delete_category(
             detail="Category not found"
         )
     
+    detached = detach_category(db, current_user.id, category.id)
     db.delete(category)
+    if detached:
+        job = enqueue_reclassify(db, current_user.id, uncategorized=True)
+        response.headers["X-Job-Id"] = str(job.id)
     db.commit()
     return None
\ No newline at end of file
@@ -1,85 +1,41 @@
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query, BackgroundTasks
-from sqlalchemy.orm import Session
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, contains_eager
+from sqlalchemy.orm.attributes import set_committed_value
 from datetime import datetime, timedelta
 
 from app.api import deps
-from app.models import User, Email, Category, GmailAccount
-from app.schemas.email import Email as EmailSchema, EmailCreate, EmailUpdate
-from app.services.gmail import GmailService
+from app.api.conditional import make_etag, is_not_modified, not_modified, set_etag
+from app.core.principal import Principal
+from app.core.versioning import bump_user_versions, get_user_version
+from app.core.changes import DELETE, UPSERT, current_token, log_horizon, record_changes
+from app.core.counters import apply_deltas, deltas_for_rows
+from app.models import Email, EmailChange, Category, GmailAccount, BulkOperation
+from app.schemas.email import Email as EmailSchema, EmailChanges, EmailCreate, EmailUpdate
+from app.schemas.bulk_operation import BulkOperation as BulkOperationSchema, BulkOperationCreate
+from app.services.bulk import apply_bulk_action
+from app.services.export import EXPORT_MEDIA_TYPES, export_statement, stream_export
+from app.services.jobs import (
+    BULK_GMAIL, INTERACTIVE, enqueue_account_sync, enqueue_job, enqueue_summaries, summaries_queued
+)
+from app.services.summaries import get_or_create_summary, lazy_summaries, record_category_view
 
 router = APIRouter()
 
-async def sync_account(db: Session, account: GmailAccount):
-    """Background task to sync a single Gmail account"""
-    try:
-        # Check if we've synced recently (rate limiting)
-        if account.last_sync_time and datetime.utcnow() - account.last_sync_time < timedelta(minutes=5):
-            return f"Skipped sync for {account.email} - too soon since last sync"
-
-        gmail_service = GmailService(account, db)
-        synced_count = 0
-        
-        # Fetch emails since last sync time or last 24 hours if no sync
-        since_time = account.last_sync_time or (datetime.utcnow() - timedelta(days=1))
-        new_emails_data = gmail_service.list_unarchived_emails(since=since_time)
-        
-        for email_data in new_emails_data:
-            # Check if email already exists
-            existing_email = db.query(Email).filter(
-                Email.gmail_id == email_data["gmail_id"],
-                Email.gmail_account_id == account.id
-            ).first()
-
-            if not existing_email:
-                # Create new email record
-                db_email = Email(
-                    gmail_id=email_data["gmail_id"],
-                    subject=email_data["subject"],
-                    sender=email_data["sender"],
-                    content=email_data["content"],
-                    received_at=email_data["received_at"],
-                    user_id=account.user_id,
-                    gmail_account_id=account.id,
-                    is_archived=True  # Mark as archived in our DB since we archive in Gmail
-                )
-                db.add(db_email)
-                synced_count += 1
-                
-                # Archive email in Gmail
-                gmail_service.archive_email(email_data["gmail_id"])
-        
-        # Update last sync time
-        account.last_sync_time = datetime.utcnow()
-        db.add(account)
-        db.commit()
-        
-        return f"Successfully synced {synced_count} new emails for {account.email}"
-    
-    except Exception as e:
-        db.rollback()
-        return f"Error syncing {account.email}: {str(e)}"
-
-async def sync_all_accounts(db: Session, user: User):
-    """Background task to sync all Gmail accounts for a user"""
-    results = []
-    accounts = db.query(GmailAccount).filter(GmailAccount.user_id == user.id).all()
-    
-    for account in accounts:
-        result = await sync_account(db, account)
-        results.append(result)
-    
-    return results
-
-@router.post("/sync")
+@router.post("/sync", status_code=status.HTTP_202_ACCEPTED)
 async def sync_emails(
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user)
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: Principal = Depends(deps.get_current_principal)
 ):
-    """Start a background task to sync emails from all connected Gmail accounts"""
+    """Queue a sync job for each connected Gmail account"""
     # Get all Gmail accounts for the user
-    accounts = db.query(GmailAccount).filter(GmailAccount.user_id == current_user.id).all()
+    result = await db.execute(
+        select(GmailAccount).where(GmailAccount.user_id == current_user.id)
+    )
+    accounts = result.scalars().all()
     
     if not accounts:
         raise HTTPException(
@@ -87,26 +43,32 @@ async def sync_emails(
             detail="No Gmail accounts connected"
         )
     
-    # Add the sync task to background tasks
-    background_tasks.add_task(sync_all_accounts, db, current_user)
+    jobs = [
+        await db.run_sync(enqueue_account_sync, account.id, current_user.id)
+        for account in accounts
+    ]
+    await db.commit()
     
     return {
-        "message": f"Started syncing emails for {len(accounts)} account(s)",
-        "accounts": [account.email for account in accounts]
+        "message": f"Queued sync for {len(accounts)} account(s)",
+        "accounts": [account.email for account in accounts],
+        "job_ids": [job.id for job in jobs]
     }
 
-@router.post("/{account_id}/sync")
+@router.post("/{account_id}/sync", status_code=status.HTTP_202_ACCEPTED)
 async def sync_specific_account(
     account_id: int,
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user)
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: Principal = Depends(deps.get_current_principal)
 ):
-    """Start a background task to sync emails from a specific Gmail account"""
-    account = db.query(GmailAccount).filter(
-        GmailAccount.id == account_id,
-        GmailAccount.user_id == current_user.id
-    ).first()
+    """Queue a sync job for a specific Gmail account"""
+    result = await db.execute(
+        select(GmailAccount).where(
+            GmailAccount.id == account_id,
+            GmailAccount.user_id == current_user.id
+        )
+    )
+    account = result.scalar_one_or_none()
     
     if not account:
         raise HTTPException(
@@ -122,79 +84,208 @@ async def sync_specific_account(
             headers={"Retry-After": "300"}
         )
     
-    # Add the sync task to background tasks
-    background_tasks.add_task(sync_account, db, account)
+    job = await db.run_sync(enqueue_account_sync, account.id, current_user.id)
+    await db.commit()
     
     return {
-        "message": f"Started syncing emails for {account.email}"
+        "message": f"Queued sync for {account.email}",
+        "job_id": job.id
     }
 
-@router.get("/", response_model=List[EmailSchema])
-def list_emails(
-    db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user),
-    category_id: Optional[int] = Query(None),
-    gmail_account_id: Optional[int] = Query(None),
-    search: Optional[str] = Query(None),
-    skip: int = Query(0, ge=0),
-    limit: int = Query(50, ge=1, le=100)
-):
-    """
-    List emails with optional filters:
-    - category_id: Filter by category
-    - gmail_account_id: Filter by Gmail account
-    - search: Search in subject/content
-    - skip/limit: Pagination
-    """
-    query = db.query(Email).join(Email.gmail_account).filter(Email.user_id == current_user.id)
+def email_filters(
+    db: Session,
+    user_id: int,
+    category_id: Optional[int] = None,
+    gmail_account_id: Optional[int] = None,
+    search: Optional[str] = None
+) -> list:
+    """Filter criteria shared by list_emails and export_emails"""
+    criteria = [Email.user_id == user_id]
     
     if category_id is not None:
-        query = query.filter(Email.category_id == category_id)
+        criteria.append(Email.category_id == category_id)
     
     if gmail_account_id is not None:
         # Verify the account belongs to the user
         account = db.query(GmailAccount).filter(
             GmailAccount.id == gmail_account_id,
-            GmailAccount.user_id == current_user.id
+            GmailAccount.user_id == user_id
         ).first()
         if not account:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Gmail account not found"
             )
-        query = query.filter(Email.gmail_account_id == gmail_account_id)
+        criteria.append(Email.gmail_account_id == gmail_account_id)
     
     if search:
         search_filter = f"%{search}%"
-        query = query.filter(
+        criteria.append(
             (Email.subject.ilike(search_filter)) |
             (Email.content.ilike(search_filter))
         )
+
+    return criteria
+
+@router.get("/", response_model=List[EmailSchema])
+def list_emails(
+    request: Request,
+    response: Response,
+    db: Session = Depends(deps.get_db),
+    current_user: Principal = Depends(deps.get_current_principal),
+    category_id: Optional[int] = Query(None),
+    gmail_account_id: Optional[int] = Query(None),
+    search: Optional[str] = Query(None),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=100)
+):
+    """
+    List emails with optional filters:
+    - category_id: Filter by category
+    - gmail_account_id: Filter by Gmail account
+    - search: Search in subject/content
+    - skip/limit: Pagination
+    Supports conditional requests via ETag / If-None-Match. In lazy summary
+    mode, missing summaries on the page are queued for generation.
+    """
+    version = get_user_version(db, current_user.id)
+    etag = make_etag(current_user.id, version, "emails", category_id, gmail_account_id, search, skip, limit)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+
+    query = db.query(Email).join(Email.gmail_account).filter(
+        *email_filters(db, current_user.id, category_id, gmail_account_id, search)
+    )
     
     # Order by received_at descending (newest first)
     query = query.order_by(Email.received_at.desc())
     
     # Apply pagination
     emails = query.offset(skip).limit(limit).all()
+
+    # Previews without a summary get one in the background
+    missing = [email.id for email in emails if email.summary is None]
+    # Re-listing a page usually finds them queued already; that check takes no lock
+    if missing and lazy_summaries() and not summaries_queued(db, current_user.id, missing):
+        enqueue_summaries(db, current_user.id, missing)
+        db.commit()
     return emails
 
+@router.get("/export")
+def export_emails(
+    db: Session = Depends(deps.get_db),
+    current_user: Principal = Depends(deps.get_current_principal),
+    format: Literal["ndjson", "csv"] = Query("ndjson"),
+    gzip: bool = Query(False),
+    include_content: bool = Query(True),
+    category_id: Optional[int] = Query(None),
+    gmail_account_id: Optional[int] = Query(None),
+    search: Optional[str] = Query(None)
+):
+    """
+    Stream all matching emails as NDJSON or CSV, newest first
+    Accepts the same filters as list_emails. Rows are read through a
+    server-side cursor, so memory use does not grow with the export size.
+    """
+    criteria = email_filters(db, current_user.id, category_id, gmail_account_id, search)
+    stmt = export_statement(criteria, include_content)
+
+    headers = {"Content-Disposition": f'attachment; filename="emails.{format}"'}
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+
+    return StreamingResponse(
+        stream_export(stmt, format, gzip),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers=headers
+    )
+
+@router.get("/changes", response_model=EmailChanges)
+def list_email_changes(
+    db: Session = Depends(deps.get_db),
+    current_user: Principal = Depends(deps.get_current_principal),
+    since: Optional[int] = Query(None, ge=0),
+    limit: int = Query(500, ge=1, le=1000)
+):
+    """
+    Emails created, updated or deleted since a change token
+    Call without `since` to get a starting token, then pass the returned
+    `next_token` each time. Deleted emails are returned as IDs in `deleted`.
+    Responds 410 when the token is older than the retained change log;
+    the client should reload and start over with a fresh token.
+    """
+    if since is None:
+        return EmailChanges(changes=[], deleted=[], next_token=current_token(db, current_user.id), has_more=False)
+
+    if since < log_horizon(db):
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail="Change token expired; reload and request a new token"
+        )
+
+    entries = db.query(EmailChange.seq, EmailChange.email_id, EmailChange.op).filter(
+        EmailChange.user_id == current_user.id,
+        EmailChange.seq > since
+    ).order_by(EmailChange.seq).limit(limit + 1).all()
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+    if not entries:
+        return EmailChanges(changes=[], deleted=[], next_token=since, has_more=False)
+
+    # Only the latest entry per email matters
+    latest_ops = {}
+    for entry in entries:
+        latest_ops.pop(entry.email_id, None)
+        latest_ops[entry.email_id] = entry.op
+
+    upserted_ids = [email_id for email_id, op in latest_ops.items() if op == UPSERT]
+    emails = {
+        email.id: email for email in db.query(Email).filter(
+            Email.id.in_(upserted_ids),
+            Email.user_id == current_user.id
+        )
+    } if upserted_ids else {}
+
+    return EmailChanges(
+        changes=[emails[email_id] for email_id in upserted_ids if email_id in emails],
+        # Rows gone since their last upsert are tombstones too
+        deleted=[email_id for email_id, op in latest_ops.items() if op == DELETE or email_id not in emails],
+        next_token=entries[-1].seq,
+        has_more=has_more
+    )
+
 @router.get("/{email_id}", response_model=EmailSchema)
-def get_email(
+async def get_email(
     email_id: int,
-    db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user)
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: Principal = Depends(deps.get_current_principal)
 ):
-    """Get a specific email"""
-    email = db.query(Email).join(Email.gmail_account).filter(
-        Email.id == email_id,
-        Email.user_id == current_user.id
-    ).first()
+    """
+    Get a specific email
+    In lazy summary mode a missing summary is generated and stored here.
+    """
+    result = await db.execute(
+        select(Email).join(Email.gmail_account).options(contains_eager(Email.gmail_account)).where(
+            Email.id == email_id,
+            Email.user_id == current_user.id
+        )
+    )
+    email = result.scalar_one_or_none()
     
     if not email:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Email not found"
         )
+
+    if lazy_summaries():
+        record_category_view(email.category_id)
+        if email.summary is None:
+            # Don't hold the connection while the summary is generated
+            await db.commit()
+            summary = await get_or_create_summary(email.id, email.subject, email.content)
+            set_committed_value(email, "summary", summary)
     
     return email
 
@@ -203,7 +294,7 @@ def update_email(
     email_id: int,
     email_update: EmailUpdate,
     db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user)
+    current_user: Principal = Depends(deps.get_current_principal)
 ):
     """Update email details (category, summary, archived status)"""
     email = db.query(Email).filter(
@@ -229,7 +320,7 @@ def update_email(
 def delete_email(
     email_id: int,
     db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user)
+    current_user: Principal = Depends(deps.get_current_principal)
 ):
     """Delete an email"""
     email = db.query(Email).filter(
@@ -251,15 +342,100 @@ def delete_email(
 def bulk_delete_emails(
     email_ids: List[int],
     db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user)
+    current_user: Principal = Depends(deps.get_current_principal)
 ):
     """Delete multiple emails"""
-    result = db.query(Email).filter(
-        Email.id.in_(email_ids),
-        Email.user_id == current_user.id
-    ).delete(synchronize_session=False)
-    
+    deleted = db.execute(
+        delete(Email)
+        .where(Email.id.in_(email_ids), Email.user_id == current_user.id)
+        .returning(Email.user_id, Email.category_id, Email.gmail_account_id, Email.id)
+    ).all()
+
+    # Bulk deletes bypass the ORM flush hooks
+    if deleted:
+        apply_deltas(db.connection(), deltas_for_rows([row[:3] for row in deleted], -1))
+        bump_user_versions(db.connection(), [current_user.id])
+        record_changes(db.connection(), [(current_user.id, row.id, DELETE) for row in deleted])
     db.commit()
     return {
-        "message": f"Successfully deleted {result} emails"
-    }
\ No newline at end of file
+        "message": f"Successfully deleted {len(deleted)} emails"
+    }
+
+@router.post("/bulk", response_model=BulkOperationSchema, status_code=status.HTTP_202_ACCEPTED)
+def create_bulk_operation(
+    operation_in: BulkOperationCreate,
+    db: Session = Depends(deps.get_db),
+    current_user: Principal = Depends(deps.get_current_principal)
+):
+    """
+    Apply an action to many emails at once:
+    - recategorize: set category_id (local only)
+    - archive/unarchive: toggle the INBOX label
+    - trash: move to Gmail trash and remove locally
+    - delete: remove locally and move to Gmail trash, which Gmail empties
+      after 30 days (permanent deletion needs a broader OAuth scope)
+    The local change is applied immediately; Gmail changes are batched by a worker job.
+    """
+    if operation_in.action == "recategorize" and operation_in.category_id is not None:
+        category = db.query(Category).filter(
+            Category.id == operation_in.category_id,
+            Category.user_id == current_user.id
+        ).first()
+        if not category:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Category not found"
+            )
+
+    email_ids = list(set(operation_in.email_ids))
+    affected_count, gmail_targets = apply_bulk_action(
+        db, current_user.id, operation_in.action, email_ids, operation_in.category_id
+    )
+    gmail_message_count = sum(len(ids) for ids in gmail_targets.values())
+
+    operation = BulkOperation(
+        user_id=current_user.id,
+        action=operation_in.action,
+        status="running" if gmail_message_count else "completed",
+        requested_count=len(email_ids),
+        affected_count=affected_count,
+        gmail_message_count=gmail_message_count,
+        gmail_failed_count=0,
+        completed_at=None if gmail_message_count else datetime.utcnow()
+    )
+    db.add(operation)
+    db.flush()
+
+    # Queued in the same transaction, so the job exists iff the operation does
+    if gmail_message_count:
+        enqueue_job(
+            db,
+            BULK_GMAIL,
+            {"operation_id": operation.id, "action": operation.action, "targets": gmail_targets},
+            user_id=current_user.id,
+            priority=INTERACTIVE
+        )
+    db.commit()
+    db.refresh(operation)
+
+    return operation
+
+@router.get("/bulk/{operation_id}", response_model=BulkOperationSchema)
+def get_bulk_operation(
+    operation_id: int,
+    db: Session = Depends(deps.get_db),
+    current_user: Principal = Depends(deps.get_current_principal)
+):
+    """Get the status of a bulk operation"""
+    operation = db.query(BulkOperation).filter(
+        BulkOperation.id == operation_id,
+        BulkOperation.user_id == current_user.id
+    ).first()
+
+    if not operation:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Bulk operation not found"
+        )
+
+    return operation
@@ -0,0 +1,48 @@
+import asyncio
+import json
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import StreamingResponse
+
+from app.api import deps
+from app.core.config import settings
+from app.core.events import event_broker
+from app.core.principal import Principal
+
+router = APIRouter()
+
+def format_event(event: dict) -> str:
+    """Encode an event as a server-sent events message"""
+    return f"event: {event['type']}\ndata: {json.dumps(event['data'])}\n\n"
+
+async def event_stream(request: Request, user_id: int):
+    async with event_broker.subscribe(user_id) as queue:
+        yield ": connected\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=settings.EVENTS_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    return
+                # Reconnects the listener if the database connection dropped
+                await event_broker.ensure_listening()
+                yield ": heartbeat\n\n"
+                continue
+            yield format_event(event)
+
+@router.get("/stream")
+async def stream_events(
+    request: Request,
+    current_user: Principal = Depends(deps.get_stream_principal)
+):
+    """
+    Server-sent events for the current user's mailbox:
+    - sync.started / sync.finished / sync.failed: per Gmail account
+    - email.ingested: a new email was stored
+    - email.categorized: AI processing assigned a summary and category
+    - resync: events were dropped; refetch instead of applying deltas
+    """
+    return StreamingResponse(
+        event_stream(request, current_user.id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
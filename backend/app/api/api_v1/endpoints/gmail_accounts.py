@@ -4,26 +4,26 @@ from sqlalchemy.orm import Session
 from datetime import datetime
 
 from app.api import deps
-from app.models import User, GmailAccount
+from app.core.principal import Principal
+from app.models import GmailAccount
 from app.schemas.gmail_account import GmailAccount as GmailAccountSchema
-from app.services.gmail import GmailService
-from app.worker import sync_all_accounts
+from app.services.jobs import enqueue_account_sync
 
 router = APIRouter()
 
 @router.get("/", response_model=List[GmailAccountSchema])
 def list_gmail_accounts(
     db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user)
+    current_user: Principal = Depends(deps.get_current_principal)
 ):
     """List all Gmail accounts connected to the user"""
-    return current_user.gmail_accounts
+    return db.query(GmailAccount).filter(GmailAccount.user_id == current_user.id).all()
 
 @router.post("/connect", response_model=GmailAccountSchema)
 async def connect_gmail_account(
     auth_code: str,
     db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user)
+    current_user: Principal = Depends(deps.get_current_principal)
 ):
     """Connect a new Gmail account using OAuth"""
     try:
@@ -69,7 +69,7 @@ async def connect_gmail_account(
 def disconnect_gmail_account(
     account_id: int,
     db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user)
+    current_user: Principal = Depends(deps.get_current_principal)
 ):
     """Disconnect a Gmail account"""
     account = db.query(GmailAccount).filter(
@@ -87,13 +87,13 @@ def disconnect_gmail_account(
     db.commit()
     return None
 
-@router.post("/{account_id}/sync", status_code=status.HTTP_200_OK)
-async def sync_gmail_account(
+@router.post("/{account_id}/sync", status_code=status.HTTP_202_ACCEPTED)
+def sync_gmail_account(
     account_id: int,
     db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user)
+    current_user: Principal = Depends(deps.get_current_principal)
 ):
-    """Sync emails for a specific Gmail account"""
+    """Queue a sync job for a specific Gmail account"""
     account = db.query(GmailAccount).filter(
         GmailAccount.id == account_id,
         GmailAccount.user_id == current_user.id
@@ -105,58 +105,25 @@ async def sync_gmail_account(
             detail="Gmail account not found"
         )
     
-    try:
-        # Initialize Gmail service with account's credentials
-        gmail_service = GmailService(
-            access_token=account.access_token,
-            refresh_token=account.refresh_token
-        )
-        
-        # Get new emails since last sync
-        new_emails = gmail_service.list_unarchived_emails(
-            since=account.last_sync_time
-        )
-        
-        processed_count = 0
-        for email_data in new_emails:
-            # Store email in database
-            email = Email(
-                gmail_id=email_data["gmail_id"],
-                subject=email_data["subject"],
-                sender=email_data["sender"],
-                content=email_data["content"],
-                received_at=email_data["received_at"],
-                user_id=current_user.id,
-                gmail_account_id=account.id
-            )
-            db.add(email)
-            
-            # Archive the email in Gmail
-            gmail_service.archive_email(email_data["gmail_id"])
-            processed_count += 1
-        
-        # Update last sync time
-        account.last_sync_time = datetime.utcnow()
-        db.commit()
-        
-        return {"message": f"Successfully synced {processed_count} new emails"}
-        
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to sync emails: {str(e)}"
-        )
+    job = enqueue_account_sync(db, account.id, current_user.id)
+    db.commit()
+    
+    return {"message": f"Queued sync for {account.email}", "job_id": job.id}
 
-@router.post("/sync-all", status_code=status.HTTP_200_OK)
-async def sync_all_gmail_accounts(
-    current_user: User = Depends(deps.get_current_user)
+@router.post("/sync-all", status_code=status.HTTP_202_ACCEPTED)
+def sync_all_gmail_accounts(
+    db: Session = Depends(deps.get_db),
+    current_user: Principal = Depends(deps.get_current_principal)
 ):
-    """Trigger a sync of all Gmail accounts"""
-    try:
-        await sync_all_accounts()
-        return {"message": "Successfully triggered sync for all accounts"}
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to sync all accounts: {str(e)}"
-        )
\ No newline at end of file
+    """Queue a sync job for each of the user's Gmail accounts"""
+    account_ids = [
+        account_id for (account_id,) in
+        db.query(GmailAccount.id).filter(GmailAccount.user_id == current_user.id).all()
+    ]
+    jobs = [enqueue_account_sync(db, account_id, current_user.id) for account_id in account_ids]
+    db.commit()
+    
+    return {
+        "message": f"Queued sync for {len(jobs)} account(s)",
+        "job_ids": [job.id for job in jobs]
+    }
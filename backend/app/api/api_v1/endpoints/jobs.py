@@ -0,0 +1,29 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+
+from app.api import deps
+from app.core.principal import Principal
+from app.models import Job
+from app.schemas.job import Job as JobSchema
+
+router = APIRouter()
+
+@router.get("/{job_id}", response_model=JobSchema)
+def get_job(
+    job_id: int,
+    db: Session = Depends(deps.get_db),
+    current_user: Principal = Depends(deps.get_current_principal)
+):
+    """Get the status of a background job"""
+    job = db.query(Job).filter(
+        Job.id == job_id,
+        Job.user_id == current_user.id
+    ).first()
+
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+
+    return job
@@ -0,0 +1,60 @@
+from fastapi import APIRouter, Depends, Request, Response
+from sqlalchemy.orm import Session
+
+from app.api import deps
+from app.api.conditional import make_etag, is_not_modified, not_modified, set_etag
+from app.core.counters import ACCOUNT, CATEGORY, UNCATEGORIZED
+from app.core.principal import Principal
+from app.core.versioning import get_user_version
+from app.models import Category, EmailCounter, GmailAccount
+from app.schemas.stats import EmailStats, CategoryCount, AccountCount
+
+router = APIRouter()
+
+@router.get("/", response_model=EmailStats)
+def get_stats(
+    request: Request,
+    response: Response,
+    db: Session = Depends(deps.get_db),
+    current_user: Principal = Depends(deps.get_current_principal)
+):
+    """Email counts per category and per Gmail account, read from precomputed counters"""
+    version = get_user_version(db, current_user.id)
+    etag = make_etag(current_user.id, version, "stats")
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+
+    counters = db.query(EmailCounter).filter(
+        EmailCounter.user_id == current_user.id,
+        EmailCounter.count > 0
+    ).all()
+    category_names = dict(
+        db.query(Category.id, Category.name).filter(Category.user_id == current_user.id).all()
+    )
+    account_emails = dict(
+        db.query(GmailAccount.id, GmailAccount.email).filter(GmailAccount.user_id == current_user.id).all()
+    )
+
+    categories = []
+    accounts = []
+    for counter in counters:
+        if counter.kind == CATEGORY:
+            category_id = None if counter.ref_id == UNCATEGORIZED else counter.ref_id
+            categories.append(CategoryCount(
+                category_id=category_id,
+                name=category_names.get(category_id),
+                count=counter.count
+            ))
+        elif counter.kind == ACCOUNT:
+            accounts.append(AccountCount(
+                gmail_account_id=counter.ref_id,
+                email=account_emails.get(counter.ref_id),
+                count=counter.count
+            ))
+
+    return EmailStats(
+        total=sum(category.count for category in categories),
+        categories=categories,
+        accounts=accounts
+    )
@@ -0,0 +1,73 @@
+from datetime import datetime
+from typing import List, Optional
+from fastapi import APIRouter, Depends, status, Query
+from sqlalchemy.orm import Session
+
+from app.api import deps
+from app.core.principal import Principal
+from app.models import Email, UnsubscribeRequest
+from app.schemas.unsubscribe import UnsubscribeCreate, UnsubscribeRequest as UnsubscribeRequestSchema
+from app.services.jobs import INTERACTIVE, UNSUBSCRIBE, enqueue_job
+from app.services.unsubscribe import is_http_url, plan_unsubscribes
+
+router = APIRouter()
+
+@router.post("/", response_model=List[UnsubscribeRequestSchema], status_code=status.HTTP_202_ACCEPTED)
+def create_unsubscribe_requests(
+    payload: UnsubscribeCreate,
+    db: Session = Depends(deps.get_db),
+    current_user: Principal = Depends(deps.get_current_principal)
+):
+    """
+    Unsubscribe from the senders of the given emails
+    Creates one request per sender and queues a worker job to execute them.
+    """
+    emails = db.query(
+        Email.sender,
+        Email.unsubscribe_link,
+        Email.unsubscribe_one_click
+    ).filter(
+        Email.id.in_(payload.email_ids),
+        Email.user_id == current_user.id
+    ).all()
+
+    requests = []
+    for sender, (url, one_click) in plan_unsubscribes(emails).items():
+        request = UnsubscribeRequest(
+            user_id=current_user.id,
+            sender=sender,
+            url=url,
+            one_click=one_click,
+            status="pending"
+        )
+        if not is_http_url(url):
+            request.status = "skipped"
+            request.error = "Unsubscribe link is not an HTTP(S) URL" if url else "No unsubscribe link found"
+            request.completed_at = datetime.utcnow()
+        requests.append(request)
+
+    db.add_all(requests)
+    db.flush()
+
+    pending_ids = [request.id for request in requests if request.status == "pending"]
+    if pending_ids:
+        enqueue_job(db, UNSUBSCRIBE, {"request_ids": pending_ids}, user_id=current_user.id, priority=INTERACTIVE)
+    db.commit()
+    for request in requests:
+        db.refresh(request)
+
+    return requests
+
+@router.get("/", response_model=List[UnsubscribeRequestSchema])
+def list_unsubscribe_requests(
+    db: Session = Depends(deps.get_db),
+    current_user: Principal = Depends(deps.get_current_principal),
+    status_filter: Optional[str] = Query(None, alias="status"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=100)
+):
+    """List unsubscribe requests, newest first"""
+    query = db.query(UnsubscribeRequest).filter(UnsubscribeRequest.user_id == current_user.id)
+    if status_filter:
+        query = query.filter(UnsubscribeRequest.status == status_filter)
+    return query.order_by(UnsubscribeRequest.id.desc()).offset(skip).limit(limit).all()
@@ -0,0 +1,33 @@
+import hashlib
+from typing import Any
+
+from fastapi import Request, Response, status
+
+# Clients may keep the payload but must revalidate it on every use
+CACHE_CONTROL = "private, no-cache"
+
+def make_etag(user_id: int, version: int, *parts: Any) -> str:
+    """Strong ETag for a response derived from a user's data version"""
+    digest = hashlib.sha1(repr((user_id, version) + parts).encode()).hexdigest()
+    return f'"{digest[:20]}"'
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """Whether the request's If-None-Match already covers this ETag"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison, so ignore any W/ prefix
+    candidates = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return etag in candidates
+
+def not_modified(etag: str) -> Response:
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers={"ETag": etag, "Cache-Control": CACHE_CONTROL},
+    )
+
+def set_etag(response: Response, etag: str) -> None:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
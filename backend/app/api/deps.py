@@ -1,12 +1,13 @@
 from typing import Generator, Optional
-from fastapi import Depends, HTTPException, status, Header
+from fastapi import Depends, HTTPException, status, Header, Query
 from fastapi.security import OAuth2AuthorizationCodeBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 import jwt
 from jwt.exceptions import PyJWTError
 
-from app.core.database import SessionLocal
+from app.core.database import SessionLocal, AsyncSessionLocal, get_async_db
 from app.core.config import settings
+from app.core.principal import Principal, principal_cache
 from app.models import User
 
 oauth2_scheme = OAuth2AuthorizationCodeBearer(
@@ -21,42 +22,112 @@ def get_db() -> Generator:
     finally:
         db.close()
 
-async def get_current_user(
-    db: Session = Depends(get_db),
-    authorization: str = Header(None)
-) -> User:
-    """Get current user from JWT token"""
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
 
+def _get_bearer_token(authorization: Optional[str]) -> str:
+    """Extract the token from a 'Bearer <token>' header"""
     if not authorization:
-        raise credentials_exception
+        raise _credentials_exception()
 
     try:
         scheme, token = authorization.split()
-        if scheme.lower() != "bearer":
-            raise credentials_exception
+    except ValueError:
+        raise _credentials_exception()
+    if scheme.lower() != "bearer":
+        raise _credentials_exception()
+    return token
 
+def _decode_token(token: str) -> dict:
+    try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
-        user_id = int(payload.get("sub"))
-        
-        user = db.query(User).filter(User.id == user_id).first()
-        if not user:
-            raise credentials_exception
-            
-        return user
-    except (PyJWTError, ValueError):
-        raise credentials_exception
+        payload["sub"] = int(payload.get("sub"))
+        return payload
+    except (PyJWTError, TypeError, ValueError):
+        raise _credentials_exception()
+
+async def get_current_user(
+    db: AsyncSession = Depends(get_async_db),
+    authorization: str = Header(None)
+) -> User:
+    """Get current user from JWT token"""
+    token = _get_bearer_token(authorization)
+    payload = _decode_token(token)
+
+    user = await db.get(User, payload["sub"])
+    if not user:
+        raise _credentials_exception()
+
+    return user
 
 async def get_current_user_optional(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     authorization: str = Header(None)
 ) -> Optional[User]:
     """Like get_current_user but returns None if no valid auth"""
     try:
         return await get_current_user(db, authorization)
     except HTTPException:
-        return None
\ No newline at end of file
+        return None
+
+async def get_current_principal(
+    authorization: str = Header(None)
+) -> Principal:
+    """
+    Get the authenticated principal for the JWT token
+    Served from the in-process principal cache when possible; handlers
+    that need the full User entity should use get_current_user instead.
+    A cache miss looks the user up in its own short session, so requests
+    don't hold an async connection beside their get_db one.
+    """
+    token = _get_bearer_token(authorization)
+
+    principal = principal_cache.get(token)
+    if principal:
+        return principal
+
+    payload = _decode_token(token)
+    async with AsyncSessionLocal() as db:
+        user = await db.get(User, payload["sub"])
+    if not user:
+        raise _credentials_exception()
+
+    principal = Principal(id=user.id, email=user.email)
+    principal_cache.set(token, principal, payload.get("exp"))
+    return principal
+
+async def get_current_principal_optional(
+    authorization: str = Header(None)
+) -> Optional[Principal]:
+    """Like get_current_principal but returns None if no valid auth"""
+    try:
+        return await get_current_principal(authorization)
+    except HTTPException:
+        return None
+
+async def get_admin_principal(
+    principal: Principal = Depends(get_current_principal)
+) -> Principal:
+    """Get the authenticated principal, requiring an address listed in ADMIN_EMAILS"""
+    if principal.email.lower() not in {email.lower() for email in settings.ADMIN_EMAILS}:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+    return principal
+
+async def get_stream_principal(
+    authorization: str = Header(None),
+    token: Optional[str] = Query(None)
+) -> Principal:
+    """
+    Get the authenticated principal for a long-lived stream
+    EventSource cannot send headers, so the token may be passed as ?token=.
+    """
+    if token:
+        authorization = f"Bearer {token}"
+    return await get_current_principal(authorization)
@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta
+from typing import Iterable, Tuple
+
+from sqlalchemy import event, delete, func, select
+from sqlalchemy.orm import Session
+
+from app.models.email import Email
+from app.models.email_change import EmailChange
+
+UPSERT = "upsert"
+DELETE = "delete"
+
+def record_changes(connection, changes: Iterable[Tuple[int, int, str]]) -> None:
+    """
+    Append (user_id, email_id, op) entries to the change log
+    Must run after bump_user_versions in the same transaction: the version
+    row lock taken there orders a user's writers, so their log sequence
+    numbers follow commit order and a reader never skips an entry committed
+    late.
+    """
+    rows = [
+        {"user_id": user_id, "email_id": email_id, "op": op}
+        for user_id, email_id, op in changes
+        if user_id is not None
+    ]
+    if rows:
+        connection.execute(EmailChange.__table__.insert(), rows)
+
+def current_token(db: Session, user_id: int) -> int:
+    """Change token that covers everything the user has committed so far"""
+    user_seq = db.execute(
+        select(func.max(EmailChange.seq)).where(EmailChange.user_id == user_id)
+    ).scalar()
+    if user_seq is not None:
+        return user_seq
+    # Nothing logged for this user (or all of it pruned): start at the horizon
+    return max(log_horizon(db), 0)
+
+def log_horizon(db: Session) -> int:
+    """Oldest token still answerable from the log"""
+    min_seq = db.execute(select(func.min(EmailChange.seq))).scalar()
+    return min_seq - 1 if min_seq is not None else 0
+
+def prune_changes(db: Session, older_than: timedelta) -> int:
+    """
+    Delete log entries older than the given age; returns the number deleted
+    The newest expired entry is kept as a marker, so the horizon stays exact.
+    """
+    marker = db.execute(
+        select(func.max(EmailChange.seq)).where(EmailChange.changed_at < datetime.utcnow() - older_than)
+    ).scalar()
+    if marker is None:
+        return 0
+    result = db.execute(delete(EmailChange).where(EmailChange.seq < marker))
+    db.commit()
+    return result.rowcount
+
+# session.info key: this transaction's flushed Email changes, logged at commit
+_PENDING_CHANGES = "changes_pending"
+
+@event.listens_for(Session, "after_flush")
+def _note_flushed_emails(session, flush_context):
+    """Note flushed Email inserts, updates and deletes"""
+    changes = session.info.setdefault(_PENDING_CHANGES, [])
+    for obj in session.new:
+        if isinstance(obj, Email):
+            changes.append((obj.user_id, obj.id, UPSERT))
+    for obj in session.dirty:
+        if isinstance(obj, Email) and session.is_modified(obj, include_collections=False):
+            changes.append((obj.user_id, obj.id, UPSERT))
+    for obj in session.deleted:
+        if isinstance(obj, Email):
+            changes.append((obj.user_id, obj.id, DELETE))
+
+@event.listens_for(Session, "before_commit")
+def _log_flushed_emails(session):
+    """Log the noted Email changes (after versioning's bump, which flushes first)"""
+    changes = session.info.pop(_PENDING_CHANGES, None)
+    if changes:
+        record_changes(session.connection(), changes)
+
+@event.listens_for(Session, "after_transaction_end")
+def _forget_pending_changes(session, transaction):
+    # Rolled back or closed without a commit
+    if transaction.parent is None:
+        session.info.pop(_PENDING_CHANGES, None)
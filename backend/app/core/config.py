@@ -1,23 +1,122 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, List, Optional
 
 class Settings(BaseSettings):
     # Database
     DATABASE_URL: str
 
+    # Database connection budget per process, split between the sync and async engines
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_ASYNC_POOL_SHARE: float = 0.3  # Fraction of the budget given to the async engine
+    WORKER_DB_ASYNC_POOL_SHARE: float = 0.1  # The worker's share; its jobs are nearly all sync
+    DB_POOL_TIMEOUT: int = 30  # seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = 1800  # seconds before a connection is replaced
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_TIMEOUT_MS: Optional[int] = None
+    # Connecting through PgBouncer in transaction pooling mode: disables
+    # client-side pooling and server-side prepared statement caching
+    DB_PGBOUNCER: bool = False
+
     # Security
     SECRET_KEY: str
+    ADMIN_EMAILS: List[str] = []  # Users allowed on the /admin endpoints
+
+    # Authenticated principals cached per token (seconds, entries)
+    PRINCIPAL_CACHE_TTL: int = 60
+    PRINCIPAL_CACHE_SIZE: int = 10000
     
     # Google OAuth
     GOOGLE_CLIENT_ID: Optional[str] = None
     GOOGLE_CLIENT_SECRET: Optional[str] = None
     GOOGLE_REDIRECT_URI: Optional[str] = "http://localhost:8000/api/v1/auth/google/callback"
+    GMAIL_API_ENDPOINT: Optional[str] = None  # Override the Gmail API root URL (benchmarks, fakes)
+    GMAIL_TIMEOUT_SECONDS: float = 60.0  # Per Gmail API request
     
     # Frontend
     FRONTEND_URL: Optional[str] = "http://localhost:4200"
     
     # OpenAI
     OPENAI_API_KEY: Optional[str] = None
+    OPENAI_BASE_URL: Optional[str] = None  # Override the API base URL (benchmarks, fakes)
+    OPENAI_TIMEOUT_SECONDS: float = 60.0  # Per OpenAI request; the client default is 10 minutes
+    CLASSIFY_BATCH_SIZE: int = 20  # Emails per batched classification request
+    CLASSIFY_EMAIL_CHARS: int = 1500  # Per-email truncation in batched requests
+    SUMMARY_MODE: str = "eager"  # "eager" summarizes on ingest, "lazy" on first view
+    SUMMARY_CONCURRENCY: int = 5  # Concurrent summary requests per worker job
+    SUMMARY_PREWARM_CATEGORIES: int = 3  # Lazy mode: most-viewed categories to summarize ahead; 0 disables
+    SUMMARY_PREWARM_EMAILS: int = 20  # Newest unsummarized emails per pre-warmed category
+    SUMMARY_PREWARM_INTERVAL_MINUTES: int = 30
+    CATEGORY_VIEW_FLUSH_SECONDS: int = 30  # How often API processes write buffered category view counts
+    AI_MAX_ATTEMPTS: int = 5  # Processing attempts per email before it is dead-lettered
+    AI_RETRY_BASE_SECONDS: int = 300  # Doubles per failed attempt
+    AI_RETRY_BATCH_SIZE: int = 100  # Emails retried per job
+    AI_RETRY_INTERVAL_SECONDS: int = 60  # How often the worker looks for due retries
+
+    # Gmail and OpenAI failure handling
+    RETRY_MAX_ATTEMPTS: int = 4  # Tries per call, including the first
+    RETRY_BASE_SECONDS: float = 0.5  # Backoff ceiling before the first retry; doubles per retry
+    RETRY_MAX_SECONDS: float = 20.0  # Longest single backoff, Retry-After included
+    BREAKER_FAILURE_THRESHOLD: int = 5  # Consecutive failures that open a Gmail account's breaker
+    BREAKER_GLOBAL_FAILURE_THRESHOLD: int = 20  # Consecutive failures that open a dependency-wide breaker
+    BREAKER_RESET_SECONDS: float = 30.0  # Open time before a trial call
+    BREAKER_AUTH_RESET_SECONDS: float = 900.0  # Open time after an auth failure
+
+    # Bulk unsubscribe
+    UNSUBSCRIBE_CONCURRENCY: int = 20
+    UNSUBSCRIBE_PER_HOST_CONCURRENCY: int = 2
+    UNSUBSCRIBE_TIMEOUT: float = 10.0  # seconds per request
+    # Only for local testing: allow links that resolve to private addresses
+    UNSUBSCRIBE_ALLOW_PRIVATE_HOSTS: bool = False
+
+    # Event stream
+    EVENTS_DATABASE_URL: Optional[str] = None  # Direct connection for LISTEN when DATABASE_URL points at PgBouncer
+    EVENTS_HEARTBEAT_SECONDS: int = 15
+    EVENTS_QUEUE_SIZE: int = 100
+
+    # Request profiling (off unless PROFILING_ENABLED)
+    PROFILING_ENABLED: bool = False
+    PROFILING_SAMPLE_RATE: float = 0.0  # Fraction of requests profiled
+    PROFILING_TOKEN: Optional[str] = None  # Profiles any request sending X-Profile: <token>
+    PROFILING_INTERVAL_MS: float = 5.0
+    PROFILING_OUTPUT_DIR: str = "profiles"
+
+    # Worker
+    WORKER_METRICS_PORT: Optional[int] = 9100  # Prometheus endpoint; unset to disable
+    WORKER_LOOP_LAG_INTERVAL_SECONDS: float = 0.5
+    WORKER_STALL_THRESHOLD_SECONDS: float = 1.0  # Log the loop's stack when blocked this long
+    WORKER_TRACEMALLOC: bool = False  # Trace from startup and log diffs periodically; SIGUSR1 works regardless
+    WORKER_TRACEMALLOC_INTERVAL_MINUTES: int = 15
+    WORKER_TRACEMALLOC_TOP: int = 15
+    WORKER_TRACEMALLOC_FRAMES: int = 1
+    COUNTER_RECONCILE_INTERVAL_MINUTES: int = 60
+    EMAIL_CHANGES_RETENTION_DAYS: int = 7
+    # emails is partitioned by received_at month; see app.core.partitions
+    EMAIL_PARTITION_MONTHS_AHEAD: int = 3  # Future months kept ready for inserts
+    EMAIL_PARTITION_MAINTENANCE_INTERVAL_MINUTES: int = 360
+    EMAIL_BODY_RETENTION_MONTHS: int = 12  # Bodies in older partitions are trimmed; 0 keeps them all
+    EMAIL_COMPACT_PREVIEW_CHARS: int = 1000  # Body characters kept when trimming; 0 drops the body
+    EMAIL_COMPACT_BATCH_SIZE: int = 5000  # Email IDs covered per trimming transaction
+    SYNC_INTERVAL_SECONDS: int = 60
+    JOB_POLL_INTERVAL_SECONDS: float = 2.0
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_RETRY_BASE_SECONDS: int = 30
+    JOB_LOCK_TIMEOUT_MINUTES: int = 30  # Running jobs without a heartbeat for this long are released
+    JOB_HEARTBEAT_SECONDS: int = 60  # How often running jobs refresh their lock
+    JOB_RETENTION_DAYS: int = 7
+    # Worker lanes per priority class: concurrent jobs, and jobs started per second (0 = unlimited)
+    JOB_LANES: Dict[str, Dict[str, float]] = {
+        "interactive": {"concurrency": 4, "rate": 0},
+        "push": {"concurrency": 2, "rate": 0},
+        "scheduled": {"concurrency": 4, "rate": 2},
+        "backfill": {"concurrency": 1, "rate": 0.5},
+    }
+    FAIR_QUANTUM: int = 10  # Emails of credit per unit of users.job_weight per round-robin round; must be positive
+    USER_MAX_INFLIGHT_LLM: int = 4  # Concurrent OpenAI requests per user from worker jobs; 0 disables
+    USER_EMAIL_BUDGET_PER_CYCLE: int = 200  # Emails synced per user per sync cycle outside interactive syncs; 0 disables
+    RECLASSIFY_BATCH_SIZE: int = 100  # Emails classified, then updated, per chunk
+    RECLASSIFY_CONCURRENCY: int = 5  # Concurrent OpenAI requests per reclassify job
+    CATEGORY_DETACH_BATCH_SIZE: int = 1000  # Emails moved out of a deleted category per transaction
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,139 @@
+from collections import Counter
+from typing import Iterable, Optional, Tuple
+
+from sqlalchemy import event, func, inspect, literal, select, delete, union_all
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.core.versioning import bump_user_versions
+from app.models.email import Email
+from app.models.email_counter import EmailCounter
+
+CATEGORY = "category"
+ACCOUNT = "account"
+UNCATEGORIZED = 0
+
+# (user_id, kind, ref_id) -> change in count
+CounterKey = Tuple[int, str, int]
+
+def email_keys(user_id: int, category_id: Optional[int], gmail_account_id: Optional[int]) -> list:
+    """Counter keys an email with these attributes contributes to"""
+    keys = [(user_id, CATEGORY, category_id or UNCATEGORIZED)]
+    if gmail_account_id is not None:
+        keys.append((user_id, ACCOUNT, gmail_account_id))
+    return keys
+
+def deltas_for_rows(rows: Iterable, sign: int) -> Counter:
+    """Deltas for (user_id, category_id, gmail_account_id) rows added (+1) or removed (-1)"""
+    deltas = Counter()
+    for user_id, category_id, gmail_account_id in rows:
+        for key in email_keys(user_id, category_id, gmail_account_id):
+            deltas[key] += sign
+    return deltas
+
+def apply_deltas(connection, deltas: Counter) -> None:
+    """Add the given deltas to the counter table"""
+    # Sorted so concurrent transactions lock counter rows in the same order
+    rows = [
+        {"user_id": user_id, "kind": kind, "ref_id": ref_id, "count": delta}
+        for (user_id, kind, ref_id), delta in sorted(deltas.items())
+        if delta and user_id is not None
+    ]
+    if not rows:
+        return
+    stmt = insert(EmailCounter.__table__).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["user_id", "kind", "ref_id"],
+        set_={"count": EmailCounter.__table__.c.count + stmt.excluded.count},
+    )
+    connection.execute(stmt)
+
+def reconcile_counters(db: Session, user_id: int) -> bool:
+    """
+    Rebuild one user's counters from the emails table if they have drifted
+    Counters that already match are left alone, so the user's data version
+    (and cached ETags) only move when a count was actually wrong. Returns
+    whether anything was corrected. Drift from writes racing with this
+    rebuild is corrected on the next pass.
+    """
+    by_category = (
+        select(
+            Email.user_id,
+            literal(CATEGORY).label("kind"),
+            func.coalesce(Email.category_id, UNCATEGORIZED).label("ref_id"),
+            func.count().label("count"),
+        )
+        .where(Email.user_id == user_id)
+        .group_by(Email.user_id, func.coalesce(Email.category_id, UNCATEGORIZED))
+    )
+    by_account = (
+        select(
+            Email.user_id,
+            literal(ACCOUNT).label("kind"),
+            Email.gmail_account_id.label("ref_id"),
+            func.count().label("count"),
+        )
+        .where(Email.user_id == user_id, Email.gmail_account_id.isnot(None))
+        .group_by(Email.user_id, Email.gmail_account_id)
+    )
+
+    actual = {(kind, ref_id): count for _, kind, ref_id, count in db.execute(union_all(by_category, by_account))}
+    stored = {
+        (kind, ref_id): count
+        for kind, ref_id, count in db.execute(
+            select(EmailCounter.kind, EmailCounter.ref_id, EmailCounter.count).where(EmailCounter.user_id == user_id)
+        )
+        if count  # Deltas can leave rows at zero; emails has no row for those
+    }
+    if actual == stored:
+        db.commit()
+        return False
+
+    db.execute(delete(EmailCounter).where(EmailCounter.user_id == user_id))
+    stmt = insert(EmailCounter.__table__).from_select(
+        ["user_id", "kind", "ref_id", "count"],
+        union_all(by_category, by_account),
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["user_id", "kind", "ref_id"],
+        set_={"count": stmt.excluded.count},
+    )
+    db.execute(stmt)
+    # Corrected counts must not be hidden behind a cached ETag
+    bump_user_versions(db.connection(), [user_id])
+    db.commit()
+    return True
+
+@event.listens_for(Email.category_id, "set", active_history=True)
+def _load_previous_category(target, value, oldvalue, initiator):
+    """Registered with active_history so recategorizations know the old value"""
+
+@event.listens_for(Session, "before_flush")
+def _load_deleted_emails(session, flush_context, instances):
+    # Touch the columns we count by so expired ones load before the rows go away
+    for obj in session.deleted:
+        if isinstance(obj, Email):
+            obj.user_id, obj.category_id, obj.gmail_account_id
+
+@event.listens_for(Session, "after_flush")
+def _count_flushed_emails(session, flush_context):
+    """Translate flushed Email inserts, recategorizations and deletes into counter deltas"""
+    deltas = Counter()
+    for obj in session.new:
+        if isinstance(obj, Email):
+            deltas.update(deltas_for_rows([(obj.user_id, obj.category_id, obj.gmail_account_id)], 1))
+    for obj in session.deleted:
+        if isinstance(obj, Email):
+            deltas.update(deltas_for_rows([(obj.user_id, obj.category_id, obj.gmail_account_id)], -1))
+    for obj in session.dirty:
+        if not isinstance(obj, Email):
+            continue
+        history = inspect(obj).attrs.category_id.history
+        if not history.has_changes() or not history.deleted:
+            continue
+        old_category, new_category = history.deleted[0], obj.category_id
+        if (old_category or UNCATEGORIZED) != (new_category or UNCATEGORIZED):
+            deltas[(obj.user_id, CATEGORY, old_category or UNCATEGORIZED)] -= 1
+            deltas[(obj.user_id, CATEGORY, new_category or UNCATEGORIZED)] += 1
+
+    apply_deltas(session.connection(), deltas)
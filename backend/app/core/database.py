@@ -1,11 +1,181 @@
-from sqlalchemy import create_engine
+import time
+from uuid import uuid4
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
 from .config import settings
+from .metrics import DB_POOL_CHECKOUT_SECONDS, DB_POOL_CONNECTIONS, DB_QUERY_SECONDS
 
-engine = create_engine(settings.DATABASE_URL)
+class _TimedCheckoutMixin:
+    """Pool mixin that records how long each checkout waited"""
+    engine_label = "sync"
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT_SECONDS.labels(self.engine_label).observe(time.perf_counter() - start)
+
+class TimedQueuePool(_TimedCheckoutMixin, QueuePool):
+    pass
+
+class TimedNullPool(_TimedCheckoutMixin, NullPool):
+    pass
+
+class TimedAsyncQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    engine_label = "async"
+
+class TimedAsyncNullPool(_TimedCheckoutMixin, NullPool):
+    engine_label = "async"
+
+def get_async_database_url(url: str) -> str:
+    """Rewrite a PostgreSQL URL to use the asyncpg driver"""
+    for prefix in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    return url
+
+def _split_budget(total: int, minimum: int, async_share: float) -> tuple:
+    """Split a connection count into (sync, async) shares, each at least `minimum`"""
+    async_count = max(round(total * async_share), minimum)
+    return max(total - async_count, minimum), async_count
+
+def _pool_options(pool_class, null_pool_class, is_async: bool, async_share: float) -> dict:
+    """
+    Engine keyword arguments for the configured pooling mode
+    DB_POOL_SIZE and DB_MAX_OVERFLOW are one budget for the process, split
+    between the sync and async engines, so running both doesn't double
+    the connections a process can open.
+    """
+    if settings.DB_PGBOUNCER:
+        # PgBouncer owns the pool; keep no idle connections on our side
+        return {"poolclass": null_pool_class}
+    pool_size = _split_budget(settings.DB_POOL_SIZE, 1, async_share)[is_async]
+    max_overflow = _split_budget(settings.DB_MAX_OVERFLOW, 0, async_share)[is_async]
+    return {
+        "poolclass": pool_class,
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+def _sync_connect_args() -> dict:
+    if settings.DB_STATEMENT_TIMEOUT_MS and not settings.DB_PGBOUNCER:
+        return {"options": f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"}
+    return {}
+
+def _async_connect_args() -> dict:
+    connect_args = {}
+    if settings.DB_STATEMENT_TIMEOUT_MS and not settings.DB_PGBOUNCER:
+        connect_args["server_settings"] = {"statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)}
+    if settings.DB_PGBOUNCER:
+        # Prepared statements don't survive transaction pooling
+        connect_args["statement_cache_size"] = 0
+        connect_args["prepared_statement_cache_size"] = 0
+        connect_args["prepared_statement_name_func"] = lambda: f"__asyncpg_{uuid4()}__"
+    return connect_args
+
+_STATEMENT_OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE", "WITH"}
+
+def _statement_operation(statement: str) -> str:
+    """Leading SQL keyword, used as a low-cardinality metric label"""
+    words = statement.split(None, 1)
+    keyword = words[0].upper() if words else ""
+    return keyword if keyword in _STATEMENT_OPERATIONS else "OTHER"
+
+def _instrument_engine(sync_engine, label: str) -> None:
+    """Track in-use connections and query latency, and apply per-transaction settings"""
+    in_use = DB_POOL_CONNECTIONS.labels(label, "in_use")
+    event.listen(sync_engine, "checkout", lambda *args: in_use.inc())
+    event.listen(sync_engine, "checkin", lambda *args: in_use.dec())
+
+    pool = sync_engine.pool
+    if hasattr(pool, "checkedin"):
+        DB_POOL_CONNECTIONS.labels(label, "idle").set_function(pool.checkedin)
+        DB_POOL_CONNECTIONS.labels(label, "overflow").set_function(lambda: max(pool.overflow(), 0))
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def observe_query_time(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        DB_QUERY_SECONDS.labels(label, _statement_operation(statement)).observe(elapsed)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def discard_query_timer(exception_context):
+        # Failed statements never reach after_cursor_execute. Connect errors
+        # carry no execution context (and no cursor attribute at all)
+        if exception_context.execution_context is not None and exception_context.connection is not None:
+            starts = exception_context.connection.info.get("query_start")
+            if starts:
+                starts.pop()
+
+    if settings.DB_STATEMENT_TIMEOUT_MS and settings.DB_PGBOUNCER:
+        # PgBouncer drops startup options, so scope the timeout to each transaction
+        @event.listens_for(sync_engine, "begin")
+        def set_statement_timeout(conn):
+            conn.exec_driver_sql(f"SET LOCAL statement_timeout = {int(settings.DB_STATEMENT_TIMEOUT_MS)}")
+
+def _create_sync_engine(async_share: float):
+    sync_engine = create_engine(
+        settings.DATABASE_URL,
+        connect_args=_sync_connect_args(),
+        **_pool_options(TimedQueuePool, TimedNullPool, is_async=False, async_share=async_share),
+    )
+    _instrument_engine(sync_engine, "sync")
+    return sync_engine
+
+def _create_async_engine(async_share: float):
+    new_engine = create_async_engine(
+        get_async_database_url(settings.DATABASE_URL),
+        connect_args=_async_connect_args(),
+        **_pool_options(TimedAsyncQueuePool, TimedAsyncNullPool, is_async=True, async_share=async_share),
+    )
+    _instrument_engine(new_engine.sync_engine, "async")
+    return new_engine
+
+# One engine of each kind per process, shared by the API and the worker.
+# Sync endpoints and worker code need a blocking driver and asyncpg can't
+# serve them, so both engines stay; their pools share one connection budget
+engine = _create_sync_engine(settings.DB_ASYNC_POOL_SHARE)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine for endpoints that run on the event loop
+async_engine = _create_async_engine(settings.DB_ASYNC_POOL_SHARE)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
+def sync_pool_capacity():
+    """Connections the sync engine can hold at once; None when PgBouncer does the pooling"""
+    if settings.DB_PGBOUNCER:
+        return None
+    return engine.pool.size() + engine.pool._max_overflow
+
+def set_async_pool_share(async_share: float) -> None:
+    """
+    Re-split this process's connection budget between the two engines
+    For processes that lean on one engine, like the worker, whose jobs are
+    nearly all sync. Call before anything connects: both engines are
+    replaced and the session factories rebound to them.
+    """
+    global engine, async_engine
+    engine.dispose()
+    engine = _create_sync_engine(async_share)
+    SessionLocal.configure(bind=engine)
+    # Nothing has connected yet, so the old async engine has no connections to close
+    async_engine = _create_async_engine(async_share)
+    AsyncSessionLocal.configure(bind=async_engine)
+
 Base = declarative_base()
 
 # Dependency
@@ -14,4 +184,8 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,128 @@
+import asyncio
+import logging
+import signal
+import sys
+import threading
+import time
+import traceback
+import tracemalloc
+from typing import Optional
+
+from app.core.config import settings
+from app.core.metrics import EVENT_LOOP_LAG_SECONDS, EVENT_LOOP_STALLS
+
+logger = logging.getLogger(__name__)
+
+class LoopMonitor:
+    """
+    Measures event loop lag and reports stalls
+    A probe coroutine wakes every `interval` seconds and records how late it
+    woke. A watchdog thread logs the loop thread's stack when the probe has
+    not run for `threshold` seconds, i.e. while a blocking call is still
+    holding the loop.
+    """
+
+    def __init__(self, interval: float, threshold: float):
+        self.interval = interval
+        self.threshold = threshold
+        self._last_tick = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._stopped = threading.Event()
+
+    def start(self) -> asyncio.Task:
+        self._loop_thread_id = threading.get_ident()
+        self._last_tick = time.monotonic()
+        threading.Thread(target=self._watch, name="loop-watchdog", daemon=True).start()
+        return asyncio.create_task(self._probe())
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    async def _probe(self) -> None:
+        while not self._stopped.is_set():
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            EVENT_LOOP_LAG_SECONDS.set(max(now - expected, 0))
+            self._last_tick = now
+
+    def _watch(self) -> None:
+        stalled_since = None
+        while not self._stopped.wait(self.threshold / 4):
+            blocked = time.monotonic() - self._last_tick - self.interval
+            if blocked >= self.threshold:
+                if stalled_since is None:
+                    stalled_since = self._last_tick
+                    EVENT_LOOP_STALLS.inc()
+                    frame = sys._current_frames().get(self._loop_thread_id)
+                    stack = "".join(traceback.format_stack(frame)) if frame else "<unavailable>\n"
+                    logger.warning(f"Event loop blocked for {blocked:.2f}s; loop thread stack:\n{stack}")
+            elif stalled_since is not None:
+                logger.warning(f"Event loop unblocked after {time.monotonic() - stalled_since:.2f}s")
+                stalled_since = None
+
+class MemoryTracer:
+    """
+    tracemalloc snapshot diffs, logging the top allocation sites since the
+    previous snapshot. The first call starts tracing and takes the baseline.
+    """
+
+    def __init__(self, top: int):
+        self.top = top
+        self._previous: Optional[tracemalloc.Snapshot] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _snapshot() -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<unknown>"),
+        ))
+
+    def report(self) -> None:
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(settings.WORKER_TRACEMALLOC_FRAMES)
+                self._previous = self._snapshot()
+                logger.info("tracemalloc started; the next snapshot will be diffed against this baseline")
+                return
+
+            snapshot = self._snapshot()
+            stats = snapshot.compare_to(self._previous, "lineno")[:self.top]
+            self._previous = snapshot
+            current, peak = tracemalloc.get_traced_memory()
+            lines = "\n".join(f"  {stat}" for stat in stats)
+            logger.info(
+                f"tracemalloc: {current / 1e6:.1f} MB traced (peak {peak / 1e6:.1f} MB); "
+                f"top {self.top} allocation changes:\n{lines}"
+            )
+
+    def report_in_background(self) -> None:
+        """Signal-handler entry point; snapshots are slow, so keep them off the loop"""
+        asyncio.get_running_loop().run_in_executor(None, self.report)
+
+def start_worker_diagnostics() -> LoopMonitor:
+    """
+    Start loop-lag monitoring and stall detection, and arm tracemalloc
+    reports on SIGUSR1 (or periodically when WORKER_TRACEMALLOC is set).
+    Must be called from the running event loop.
+    """
+    monitor = LoopMonitor(
+        settings.WORKER_LOOP_LAG_INTERVAL_SECONDS,
+        settings.WORKER_STALL_THRESHOLD_SECONDS
+    )
+    monitor.start()
+
+    tracer = MemoryTracer(settings.WORKER_TRACEMALLOC_TOP)
+    if hasattr(signal, "SIGUSR1"):
+        asyncio.get_running_loop().add_signal_handler(signal.SIGUSR1, tracer.report_in_background)
+    if settings.WORKER_TRACEMALLOC:
+        tracer.report()
+        asyncio.create_task(_report_periodically(tracer))
+    return monitor
+
+async def _report_periodically(tracer: MemoryTracer) -> None:
+    while True:
+        await asyncio.sleep(settings.WORKER_TRACEMALLOC_INTERVAL_MINUTES * 60)
+        await asyncio.to_thread(tracer.report)
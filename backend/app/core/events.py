@@ -0,0 +1,121 @@
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional, Set
+
+import asyncpg
+from sqlalchemy import func, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+EVENTS_CHANNEL = "email_events"
+
+# Event types
+SYNC_STARTED = "sync.started"
+SYNC_FINISHED = "sync.finished"
+SYNC_FAILED = "sync.failed"
+EMAIL_INGESTED = "email.ingested"
+EMAIL_CATEGORIZED = "email.categorized"
+EMAIL_SUMMARIZED = "email.summarized"
+RECLASSIFY_PROGRESS = "reclassify.progress"
+RESYNC = "resync"  # Events were dropped; the client should refetch
+
+def publish_event(db: Session, user_id: int, type: str, **data) -> None:
+    """
+    Queue an event for the user's stream
+    Sent with pg_notify inside the session's transaction, so listeners only
+    see it once the transaction commits. Keep payloads small: NOTIFY caps
+    them at 8000 bytes.
+    """
+    payload = json.dumps({"user_id": user_id, "type": type, "data": data}, default=str)
+    db.execute(select(func.pg_notify(EVENTS_CHANNEL, payload)))
+
+def _listen_dsn() -> str:
+    """Plain libpq DSN for the LISTEN connection"""
+    # LISTEN needs a session-level connection, so it cannot go through
+    # PgBouncer in transaction mode
+    url = make_url(settings.EVENTS_DATABASE_URL or settings.DATABASE_URL)
+    return url.set(drivername="postgresql").render_as_string(hide_password=False)
+
+class EventBroker:
+    """
+    Fans out notifications on EVENTS_CHANNEL to per-user subscriber queues
+    Each process holds one LISTEN connection, opened on the first
+    subscription and reopened after it drops. Slow subscribers that fill
+    their queue are sent a single resync event instead of the backlog.
+    """
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self._subscribers: Dict[int, Set[asyncio.Queue]] = defaultdict(set)
+        self._connection: Optional[asyncpg.Connection] = None
+        self._lock = asyncio.Lock()
+
+    async def ensure_listening(self) -> None:
+        async with self._lock:
+            if self._connection is not None and not self._connection.is_closed():
+                return
+            connection = await asyncpg.connect(_listen_dsn())
+            connection.add_termination_listener(self._on_terminate)
+            await connection.add_listener(EVENTS_CHANNEL, self._on_notify)
+            reconnected = self._connection is not None
+            self._connection = connection
+        if reconnected:
+            # Anything sent while we were disconnected is lost
+            self._broadcast({"type": RESYNC, "data": {}})
+
+    @asynccontextmanager
+    async def subscribe(self, user_id: int) -> AsyncIterator[asyncio.Queue]:
+        """Register a queue that receives the user's events until the block exits"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers[user_id].add(queue)
+        try:
+            await self.ensure_listening()
+            yield queue
+        finally:
+            queues = self._subscribers.get(user_id)
+            if queues is not None:
+                queues.discard(queue)
+                if not queues:
+                    del self._subscribers[user_id]
+
+    async def close(self) -> None:
+        async with self._lock:
+            if self._connection is not None and not self._connection.is_closed():
+                await self._connection.close()
+            self._connection = None
+
+    def _on_terminate(self, connection: asyncpg.Connection) -> None:
+        logger.warning("Event listener connection closed")
+
+    def _on_notify(self, connection: asyncpg.Connection, pid: int, channel: str, payload: str) -> None:
+        try:
+            event = json.loads(payload)
+            user_id = event.pop("user_id")
+        except (ValueError, KeyError):
+            logger.warning(f"Ignoring malformed event payload: {payload[:200]}")
+            return
+        for queue in self._subscribers.get(user_id, ()):
+            self._offer(queue, event)
+
+    def _broadcast(self, event: dict) -> None:
+        for queues in self._subscribers.values():
+            for queue in queues:
+                self._offer(queue, event)
+
+    @staticmethod
+    def _offer(queue: asyncio.Queue, event: dict) -> None:
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait({"type": RESYNC, "data": {}})
+
+event_broker = EventBroker(settings.EVENTS_QUEUE_SIZE)
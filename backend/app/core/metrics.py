@@ -0,0 +1,126 @@
+from prometheus_client import Counter, Gauge, Histogram
+
+# Database
+DB_POOL_CHECKOUT_SECONDS = Histogram(
+    "db_pool_checkout_seconds",
+    "Time spent waiting to check a connection out of the pool",
+    ["engine"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+DB_POOL_CONNECTIONS = Gauge(
+    "db_pool_connections",
+    "Database connections held by the pool, by state",
+    ["engine", "state"],
+)
+DB_QUERY_SECONDS = Histogram(
+    "db_query_seconds",
+    "Database statement execution time",
+    ["engine", "operation"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+
+# Job queue
+JOB_QUEUE_WAIT_SECONDS = Histogram(
+    "job_queue_wait_seconds",
+    "Time from a job becoming runnable to a worker claiming it",
+    ["priority"],
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900, 3600),
+)
+JOBS_RUNNING = Gauge(
+    "jobs_running",
+    "Jobs currently running in this worker by priority class",
+    ["priority"],
+)
+
+USER_JOB_SERVICE = Counter(
+    "worker_user_service_total",
+    "Work done for each user by worker jobs, in emails handled (min 1 per job); share = rate / sum(rate)",
+    ["user_id", "priority"],
+)
+USER_LLM_IN_FLIGHT = Gauge(
+    "worker_user_llm_in_flight",
+    "OpenAI requests in flight per user from worker jobs",
+    ["user_id"],
+)
+
+# Email sync
+SYNC_DURATION_SECONDS = Histogram(
+    "email_sync_duration_seconds",
+    "Duration of one Gmail account sync",
+    ["status"],
+    buckets=(0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600),
+)
+SYNC_LAST_DURATION_SECONDS = Gauge(
+    "email_sync_last_duration_seconds",
+    "Duration of the most recent sync, per Gmail account",
+    ["gmail_account_id"],
+)
+SYNC_FRESHNESS_LAG_SECONDS = Gauge(
+    "email_sync_freshness_lag_seconds",
+    "Now minus the newest ingested received_at, per Gmail account",
+    ["gmail_account_id"],
+)
+EMAILS_PROCESSED = Counter(
+    "emails_processed_total",
+    "Emails that completed each processing stage",
+    ["stage"],
+)
+
+# External APIs
+GMAIL_API_CALLS = Counter(
+    "gmail_api_calls_total",
+    "Gmail API requests by method and HTTP status",
+    ["method", "status"],
+)
+GMAIL_API_SECONDS = Histogram(
+    "gmail_api_seconds",
+    "Gmail API request latency",
+    ["method"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+OPENAI_REQUEST_SECONDS = Histogram(
+    "openai_request_seconds",
+    "OpenAI request latency by prompt type",
+    ["prompt", "status"],
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60),
+)
+OPENAI_TOKENS = Counter(
+    "openai_tokens_total",
+    "OpenAI tokens used by prompt type",
+    ["prompt", "kind"],
+)
+DEPENDENCY_ERRORS = Counter(
+    "dependency_errors_total",
+    "Failed Gmail and OpenAI call attempts by error kind",
+    ["dependency", "kind"],
+)
+DEPENDENCY_RETRIES = Counter(
+    "dependency_retries_total",
+    "Gmail and OpenAI calls retried after a failed attempt, by error kind",
+    ["dependency", "kind"],
+)
+BREAKER_TRANSITIONS = Counter(
+    "circuit_breaker_transitions_total",
+    "Circuit breaker state changes; state=open counts trips, state=closed recoveries",
+    ["dependency", "scope", "state"],
+)
+BREAKERS_OPEN = Gauge(
+    "circuit_breakers_open",
+    "Circuit breakers currently open or half-open",
+    ["dependency", "scope"],
+)
+CLASSIFY_BATCH_FALLBACKS = Counter(
+    "classify_batch_fallbacks_total",
+    "Emails from batched classification answers that were reclassified one at a time",
+    ["reason"],
+)
+
+# Worker event loop
+EVENT_LOOP_LAG_SECONDS = Gauge(
+    "event_loop_lag_seconds",
+    "How late the most recent loop-lag probe woke up",
+)
+EVENT_LOOP_STALLS = Counter(
+    "event_loop_stalls_total",
+    "Times the event loop was blocked beyond the stall threshold",
+)
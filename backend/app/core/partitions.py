@@ -0,0 +1,145 @@
+"""
+Monthly partitions of the emails table, and retention of old bodies
+
+emails is range-partitioned by received_at: one partition per month,
+named emails_pYYYY_MM, plus emails_p_old for everything before the first
+monthly partition. There is deliberately no default partition, so queries
+ordered by received_at with a LIMIT read the newest partitions first and
+never open the rest. Every partition is recorded in email_partitions.
+
+The worker keeps EMAIL_PARTITION_MONTHS_AHEAD months created ahead of
+time, and trims the bodies in partitions older than
+EMAIL_BODY_RETENTION_MONTHS to a short preview; summaries and metadata
+are kept.
+"""
+import logging
+import re
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.core.changes import UPSERT, record_changes
+from app.core.config import settings
+from app.core.versioning import bump_user_versions
+from app.models.email_partition import EmailPartition
+
+logger = logging.getLogger(__name__)
+
+OLD_PARTITION = "emails_p_old"
+# Partitions are created at runtime, so migrations and autogenerate skip them
+PARTITION_NAME = re.compile(r"^emails_p(\d{4}_\d{2}|_old)$")
+
+def is_partition(name: str) -> bool:
+    return bool(PARTITION_NAME.match(name))
+
+def month_start(value: datetime) -> datetime:
+    return datetime(value.year, value.month, 1)
+
+def add_months(month: datetime, count: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + count
+    return datetime(index // 12, index % 12 + 1, 1)
+
+def partition_name(month: datetime) -> str:
+    return f"emails_p{month:%Y_%m}"
+
+def create_partition(db: Session, month: datetime) -> bool:
+    """Create and register the partition for a month; returns False if it already exists"""
+    name = partition_name(month)
+    if db.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar() is not None:
+        return False
+    ends_at = add_months(month, 1)
+    db.execute(text(
+        f"CREATE TABLE {name} PARTITION OF emails "
+        f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{ends_at:%Y-%m-%d}')"
+    ))
+    db.execute(
+        insert(EmailPartition)
+        .values(name=name, starts_at=month, ends_at=ends_at, created_at=datetime.utcnow())
+        .on_conflict_do_nothing()
+    )
+    return True
+
+def ensure_partitions(db: Session, now: Optional[datetime] = None) -> List[str]:
+    """
+    Create any missing partitions from this month to EMAIL_PARTITION_MONTHS_AHEAD
+    Commits, and returns the names of the partitions created.
+    """
+    current = month_start(now or datetime.utcnow())
+    created = []
+    for offset in range(settings.EMAIL_PARTITION_MONTHS_AHEAD + 1):
+        month = add_months(current, offset)
+        # Creating a partition locks the parent briefly; one transaction each
+        if create_partition(db, month):
+            created.append(partition_name(month))
+        db.commit()
+    return created
+
+def compact_partition(db: Session, partition: EmailPartition) -> int:
+    """
+    Trim the bodies in one partition to EMAIL_COMPACT_PREVIEW_CHARS
+    Works through the partition directly, a range of IDs per transaction,
+    so only its rows are locked and only briefly. Each batch bumps its
+    users' data versions and logs the trimmed emails, so cached lists and
+    synced clients pick up the shorter bodies. Returns the number of rows
+    trimmed.
+    """
+    name = partition.name
+    if not is_partition(name):
+        raise ValueError(f"Not an emails partition: {name}")
+    low, high = db.execute(text(f"SELECT min(id), max(id) FROM {name}")).one()
+    db.commit()
+    if low is None:
+        return 0
+
+    preview_chars = settings.EMAIL_COMPACT_PREVIEW_CHARS
+    body = "left(content, :chars)" if preview_chars else "NULL"
+    trimmed = 0
+    for start in range(low, high + 1, settings.EMAIL_COMPACT_BATCH_SIZE):
+        rows = db.execute(
+            text(
+                f"UPDATE {name} SET content = {body} "
+                f"WHERE id >= :start AND id < :end AND length(content) > :chars "
+                f"RETURNING id, user_id"
+            ),
+            {"start": start, "end": start + settings.EMAIL_COMPACT_BATCH_SIZE, "chars": preview_chars}
+        ).all()
+        # Set-based statements bypass the ORM flush hooks
+        bump_user_versions(db.connection(), [row.user_id for row in rows])
+        record_changes(db.connection(), [(row.user_id, row.id, UPSERT) for row in rows])
+        db.commit()
+        trimmed += len(rows)
+    return trimmed
+
+def vacuum_partition(db: Session, name: str) -> None:
+    """Vacuum a partition so the space of trimmed bodies is freed"""
+    if not is_partition(name):
+        raise ValueError(f"Not an emails partition: {name}")
+    # VACUUM can't run inside a transaction block
+    with db.get_bind().connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text(f"VACUUM (ANALYZE) {name}"))
+
+def apply_retention(db: Session, now: Optional[datetime] = None) -> List[str]:
+    """
+    Trim bodies in partitions that ended more than EMAIL_BODY_RETENTION_MONTHS ago
+    Each partition is compacted once; returns the names compacted.
+    """
+    if not settings.EMAIL_BODY_RETENTION_MONTHS:
+        return []
+    cutoff = add_months(month_start(now or datetime.utcnow()), -settings.EMAIL_BODY_RETENTION_MONTHS)
+    partitions = db.query(EmailPartition).filter(
+        EmailPartition.ends_at <= cutoff,
+        EmailPartition.compacted_at.is_(None)
+    ).order_by(EmailPartition.ends_at).all()
+
+    compacted = []
+    for partition in partitions:
+        trimmed = compact_partition(db, partition)
+        vacuum_partition(db, partition.name)
+        partition.compacted_at = datetime.utcnow()
+        db.commit()
+        logger.info(f"Trimmed {trimmed} email bodies in {partition.name}")
+        compacted.append(partition.name)
+    return compacted
@@ -0,0 +1,160 @@
+import asyncio
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Optional, Set
+
+from fastapi import FastAPI
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+
+from app.core.config import settings
+
+PROFILE_HEADER = b"x-profile"
+
+class RequestProfile:
+    """Call-stack samples and SQL statistics collected for one request"""
+
+    def __init__(self, method: str, path: str):
+        self.id = f"{datetime.utcnow():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+        self.method = method
+        self.path = path
+        self.status: Optional[int] = None
+        self.started = time.perf_counter()
+        self.duration = 0.0
+        # Threads whose stacks belong to this request: the event loop thread,
+        # plus threadpool threads seen running its SQL
+        self.thread_ids: Set[int] = {threading.get_ident()}
+        self.stacks: Counter = Counter()
+        self.sql_count = 0
+        self.sql_time = 0.0
+
+    def collapsed(self) -> str:
+        """Stacks in collapsed format (flamegraph.pl, speedscope, inferno)"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "duration_ms": round(self.duration * 1000, 2),
+            "sql_count": self.sql_count,
+            "sql_time_ms": round(self.sql_time * 1000, 2),
+            "samples": sum(self.stacks.values()),
+        }
+
+_current_profile: ContextVar[Optional[RequestProfile]] = ContextVar("current_profile", default=None)
+
+def _frame_name(frame) -> str:
+    return f"{frame.f_globals.get('__name__', '?')}:{frame.f_code.co_name}"
+
+class StackSampler(threading.Thread):
+    """Samples the stacks of a profile's threads at a fixed interval"""
+
+    def __init__(self, profile: RequestProfile, interval: float):
+        super().__init__(name=f"profiler-{profile.id}", daemon=True)
+        self.profile = profile
+        self.interval = interval
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            frames = sys._current_frames()
+            for thread_id in list(self.profile.thread_ids):
+                frame = frames.get(thread_id)
+                names = []
+                while frame is not None:
+                    names.append(_frame_name(frame))
+                    frame = frame.f_back
+                if names:
+                    self.profile.stacks[";".join(reversed(names))] += 1
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self.join()
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current_profile.get()
+    if profile is not None:
+        profile.thread_ids.add(threading.get_ident())
+        context._profile_start = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current_profile.get()
+    start = getattr(context, "_profile_start", None)
+    if profile is not None and start is not None:
+        profile.sql_count += 1
+        profile.sql_time += time.perf_counter() - start
+
+def _write_report(profile: RequestProfile) -> None:
+    os.makedirs(settings.PROFILING_OUTPUT_DIR, exist_ok=True)
+    base = os.path.join(settings.PROFILING_OUTPUT_DIR, profile.id)
+    with open(f"{base}.folded", "w") as f:
+        f.write(profile.collapsed())
+    with open(f"{base}.json", "w") as f:
+        json.dump(profile.summary(), f, indent=2)
+
+class ProfilingMiddleware:
+    """
+    Profile a sample of requests, or any request carrying the admin header
+    `X-Profile: <PROFILING_TOKEN>`. Each profiled response gets X-Profile-Id
+    and Server-Timing headers; the collapsed stacks and a JSON summary are
+    written to PROFILING_OUTPUT_DIR under that ID.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    def _should_profile(self, scope) -> bool:
+        if settings.PROFILING_TOKEN:
+            for name, value in scope["headers"]:
+                if name == PROFILE_HEADER:
+                    return value.decode("latin-1") == settings.PROFILING_TOKEN
+        return random.random() < settings.PROFILING_SAMPLE_RATE
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope["method"], scope["path"])
+        token = _current_profile.set(profile)
+        sampler = StackSampler(profile, settings.PROFILING_INTERVAL_MS / 1000)
+        sampler.start()
+
+        async def send_with_profile(message):
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                elapsed = (time.perf_counter() - profile.started) * 1000
+                headers = MutableHeaders(scope=message)
+                headers.append("X-Profile-Id", profile.id)
+                headers.append(
+                    "Server-Timing",
+                    f'sql;dur={profile.sql_time * 1000:.2f};desc="{profile.sql_count} queries", '
+                    f"app;dur={elapsed:.2f}"
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            profile.duration = time.perf_counter() - profile.started
+            _current_profile.reset(token)
+            await asyncio.to_thread(sampler.stop)
+            await asyncio.to_thread(_write_report, profile)
+
+def install_profiling(app: FastAPI) -> None:
+    """Add the profiling middleware and SQL hooks; nothing is registered unless called"""
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    app.add_middleware(ProfilingMiddleware)
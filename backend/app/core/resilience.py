@@ -0,0 +1,236 @@
+"""
+Retries and circuit breakers for calls to Gmail and OpenAI
+
+Client code turns exceptions into a DependencyError with one of four
+kinds. Transient and quota errors are retried a bounded number of times
+with jittered exponential backoff; auth and permanent errors are not.
+Circuit breakers count failures per Gmail account and per dependency,
+and while one is open calls fail fast with CircuitOpenError instead of
+adding load to a dependency that is already failing.
+"""
+import asyncio
+import logging
+import random
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional, Sequence
+
+from app.core.config import settings
+from app.core.metrics import BREAKER_TRANSITIONS, BREAKERS_OPEN, DEPENDENCY_ERRORS, DEPENDENCY_RETRIES
+
+logger = logging.getLogger(__name__)
+
+# Error kinds
+AUTH = "auth"  # Credentials revoked or invalid; needs the user or an operator
+QUOTA = "quota"  # Rate or quota limited; retry after backing off
+TRANSIENT = "transient"  # Timeouts, connection errors, 5xx
+PERMANENT = "permanent"  # The request itself is wrong or its target is gone
+
+RETRYABLE = (QUOTA, TRANSIENT)
+
+# Breaker states
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class DependencyError(Exception):
+    """A failed call to an external dependency, classified by kind"""
+
+    def __init__(self, dependency: str, kind: str, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.dependency = dependency
+        self.kind = kind
+        self.retry_after = retry_after
+
+class CircuitOpenError(DependencyError):
+    """Raised instead of calling a dependency whose breaker is open"""
+
+    def __init__(self, breaker: "CircuitBreaker", retry_in: float):
+        super().__init__(
+            breaker.dependency,
+            TRANSIENT,
+            f"{breaker.name} circuit open; retry in {retry_in:.1f}s",
+            retry_after=retry_in
+        )
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker
+    Opens after `threshold` consecutive counted failures, or at once on a
+    trip kind. After the open period one trial call is let through; its
+    outcome closes the breaker or opens it again. Error kinds that are
+    neither counted nor trip kinds mean the dependency answered, so they
+    count as successes. Safe to share between threads.
+    """
+
+    def __init__(
+        self,
+        dependency: str,
+        scope: str,
+        key: Optional[str] = None,
+        threshold: int = 5,
+        counted: Iterable[str] = (TRANSIENT,),
+        trips: Iterable[str] = ()
+    ):
+        self.dependency = dependency
+        self.scope = scope
+        self.name = f"{dependency} {scope} {key}" if key else f"{dependency} {scope}"
+        self.threshold = threshold
+        self.counted = set(counted)
+        self.trips = set(trips)
+        self.state = CLOSED
+        self.failures = 0
+        self.open_until = 0.0
+        self.probe_started: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def before_call(self) -> None:
+        """Raise CircuitOpenError unless a call may go ahead now"""
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            now = time.monotonic()
+            if now < self.open_until:
+                raise CircuitOpenError(self, self.open_until - now)
+            # One trial call at a time; a trial that never reported back is replaced
+            if self.probe_started is not None and now - self.probe_started < settings.BREAKER_RESET_SECONDS:
+                raise CircuitOpenError(self, settings.BREAKER_RESET_SECONDS - (now - self.probe_started))
+            if self.state == OPEN:
+                self._transition(HALF_OPEN)
+            self.probe_started = now
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.probe_started = None
+            if self.state != CLOSED:
+                self._transition(CLOSED)
+
+    def record_failure(self, kind: str) -> None:
+        if kind not in self.counted and kind not in self.trips:
+            self.record_success()
+            return
+        with self._lock:
+            self.failures += 1
+            self.probe_started = None
+            if kind in self.trips:
+                self._open(settings.BREAKER_AUTH_RESET_SECONDS)
+            elif self.state == HALF_OPEN or self.failures >= self.threshold:
+                self._open(settings.BREAKER_RESET_SECONDS)
+
+    def _open(self, seconds: float) -> None:
+        self.open_until = time.monotonic() + seconds
+        if self.state != OPEN:
+            self._transition(OPEN)
+
+    def _transition(self, state: str) -> None:
+        if self.state == CLOSED:
+            BREAKERS_OPEN.labels(self.dependency, self.scope).inc()
+        elif state == CLOSED:
+            BREAKERS_OPEN.labels(self.dependency, self.scope).dec()
+        BREAKER_TRANSITIONS.labels(self.dependency, self.scope, state).inc()
+        if state == OPEN:
+            logger.warning(f"Circuit breaker {self.name} opened after {self.failures} failure(s)")
+        elif state == CLOSED:
+            logger.info(f"Circuit breaker {self.name} closed")
+        self.state = state
+
+class BreakerGroup:
+    """Breakers created on demand, one per key (e.g. per Gmail account)"""
+
+    def __init__(self, dependency: str, scope: str, **options):
+        self.dependency = dependency
+        self.scope = scope
+        self.options = options
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key) -> CircuitBreaker:
+        with self._lock:
+            breaker = self.breakers.get(str(key))
+            if breaker is None:
+                breaker = self.breakers[str(key)] = CircuitBreaker(
+                    self.dependency, self.scope, str(key), **self.options
+                )
+            return breaker
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+    """Full-jitter exponential backoff before retry number `attempt`, honouring Retry-After"""
+    ceiling = min(settings.RETRY_MAX_SECONDS, settings.RETRY_BASE_SECONDS * 2 ** (attempt - 1))
+    delay = random.uniform(0, ceiling)
+    if retry_after:
+        delay = max(delay, min(retry_after, settings.RETRY_MAX_SECONDS))
+    return delay
+
+def _failed(
+    dependency: str,
+    error: Exception,
+    classify: Callable[[Exception], DependencyError],
+    breakers: Sequence[CircuitBreaker],
+    attempt: int,
+    attempts: int
+) -> float:
+    """Record a failed attempt; returns the delay before retrying or raises"""
+    classified = error if isinstance(error, DependencyError) else classify(error)
+    DEPENDENCY_ERRORS.labels(dependency, classified.kind).inc()
+    for breaker in breakers:
+        breaker.record_failure(classified.kind)
+    if classified.kind not in RETRYABLE or attempt >= attempts:
+        if classified is error:
+            raise error
+        raise classified from error
+    DEPENDENCY_RETRIES.labels(dependency, classified.kind).inc()
+    return backoff_delay(attempt, classified.retry_after)
+
+def call_with_retry(
+    dependency: str,
+    func: Callable,
+    classify: Callable[[Exception], DependencyError],
+    breakers: Sequence[CircuitBreaker] = (),
+    attempts: Optional[int] = None
+):
+    """
+    Call `func` through the breakers, retrying retryable failures
+    Blocks while backing off, so run it in a thread from async code.
+    Raises the last failure as a DependencyError.
+    """
+    attempts = attempts or settings.RETRY_MAX_ATTEMPTS
+    for attempt in range(1, attempts + 1):
+        for breaker in breakers:
+            breaker.before_call()
+        try:
+            result = func()
+        except Exception as e:
+            time.sleep(_failed(dependency, e, classify, breakers, attempt, attempts))
+            continue
+        for breaker in breakers:
+            breaker.record_success()
+        return result
+
+async def async_call_with_retry(
+    dependency: str,
+    func: Callable,
+    classify: Callable[[Exception], DependencyError],
+    breakers: Sequence[CircuitBreaker] = (),
+    attempts: Optional[int] = None
+):
+    """Async counterpart of call_with_retry; `func` returns an awaitable"""
+    attempts = attempts or settings.RETRY_MAX_ATTEMPTS
+    for attempt in range(1, attempts + 1):
+        for breaker in breakers:
+            breaker.before_call()
+        try:
+            result = await func()
+        except Exception as e:
+            await asyncio.sleep(_failed(dependency, e, classify, breakers, attempt, attempts))
+            continue
+        for breaker in breakers:
+            breaker.record_success()
+        return result
+
+def retry_after_seconds(value) -> Optional[float]:
+    """Parse a Retry-After header given in seconds; HTTP dates are ignored"""
+    try:
+        return max(float(value), 0.0) if value is not None else None
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,75 @@
+from typing import Iterable
+
+from sqlalchemy import event, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.models.user_version import UserVersion
+from app.models.category import Category
+from app.models.email import Email
+from app.models.gmail_account import GmailAccount
+
+# Objects whose changes are visible in list/category responses
+VERSIONED_MODELS = (Email, Category, GmailAccount)
+
+# session.info key: owners of this transaction's flushed changes, bumped at commit
+_PENDING_BUMPS = "versioning_user_ids"
+
+def bump_user_versions(connection, user_ids: Iterable[int]) -> None:
+    """Advance the data version of each given user"""
+    # Sorted so concurrent transactions lock version rows in the same order
+    rows = [
+        {"user_id": user_id, "data_version": 1}
+        for user_id in sorted({user_id for user_id in user_ids if user_id is not None})
+    ]
+    if not rows:
+        return
+    stmt = insert(UserVersion.__table__).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["user_id"],
+        set_={"data_version": UserVersion.__table__.c.data_version + 1},
+    )
+    connection.execute(stmt)
+
+def get_user_version(db: Session, user_id: int) -> int:
+    """Current data version for a user (0 if unknown)"""
+    return db.execute(
+        select(UserVersion.data_version).where(UserVersion.user_id == user_id)
+    ).scalar() or 0
+
+@event.listens_for(Session, "before_flush")
+def _load_deleted_owners(session, flush_context, instances):
+    # Touch user_id so expired objects load it before their rows go away
+    for obj in session.deleted:
+        if isinstance(obj, VERSIONED_MODELS):
+            obj.user_id
+
+@event.listens_for(Session, "after_flush")
+def _note_versioned_changes(session, flush_context):
+    """Note the owner of every flushed change to a versioned model"""
+    user_ids = session.info.setdefault(_PENDING_BUMPS, set())
+    for obj in list(session.new) + list(session.deleted):
+        if isinstance(obj, VERSIONED_MODELS):
+            user_ids.add(obj.user_id)
+    for obj in session.dirty:
+        if isinstance(obj, VERSIONED_MODELS) and session.is_modified(obj, include_collections=False):
+            user_ids.add(obj.user_id)
+
+@event.listens_for(Session, "before_commit")
+def _bump_versions_before_commit(session):
+    """
+    Bump each noted owner's version once per transaction, just before commit
+    The version row lock is then held only for the commit, not from a
+    transaction's first flush to its end.
+    """
+    # Commit flushes after this hook; flush now so every change is noted
+    session.flush()
+    user_ids = session.info.pop(_PENDING_BUMPS, None)
+    if user_ids:
+        bump_user_versions(session.connection(), user_ids)
+
+@event.listens_for(Session, "after_transaction_end")
+def _forget_pending_bumps(session, transaction):
+    # Rolled back or closed without a commit
+    if transaction.parent is None:
+        session.info.pop(_PENDING_BUMPS, None)
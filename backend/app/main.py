@@ -1,9 +1,29 @@
-from fastapi import FastAPI
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from app.api.api_v1.api import api_router
 from app.core.config import settings
+from app.core.events import event_broker
+from app.core.profiling import install_profiling
+from app.services.summaries import flush_category_views, flush_category_views_periodically
 
-app = FastAPI(title="Email Sorter API")
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    view_flusher = asyncio.create_task(flush_category_views_periodically())
+    yield
+    view_flusher.cancel()
+    try:
+        await flush_category_views()
+    except Exception as e:
+        logger.warning(f"Could not write category views on shutdown: {str(e)}")
+    await event_broker.close()
+
+app = FastAPI(title="Email Sorter API", lifespan=lifespan)
 
 # Configure CORS
 app.add_middleware(
@@ -12,11 +32,21 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Response headers the client reads beyond the CORS-safelisted ones
+    expose_headers=["ETag", "X-Job-Id", "Retry-After"],
 )
 
+if settings.PROFILING_ENABLED:
+    install_profiling(app)
+
 # Include API router
 app.include_router(api_router, prefix="/api/v1")
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
\ No newline at end of file
+    return {"status": "healthy"}
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus metrics for this process"""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -1,7 +1,19 @@
 from app.core.database import Base
 from .user import User
+from .user_version import UserVersion
 from .category import Category
 from .email import Email
 from .gmail_account import GmailAccount
+from .gmail_message import GmailMessage
+from .email_counter import EmailCounter
+from .email_change import EmailChange
+from .email_partition import EmailPartition
+from .bulk_operation import BulkOperation
+from .unsubscribe_request import UnsubscribeRequest
+from .job import Job
 
-# This will make the models available when importing from app.models
\ No newline at end of file
+# This will make the models available when importing from app.models
+
+# Register listeners that keep UserVersion.data_version, email counters and the
+# email change log current. versioning must come first: see app.core.changes
+from app.core import versioning, counters, changes
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text
+from datetime import datetime
+
+from app.core.database import Base
+
+class BulkOperation(Base):
+    """A bulk email action and the status of its Gmail-side propagation"""
+    __tablename__ = "bulk_operations"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    action = Column(String, nullable=False)
+    status = Column(String, nullable=False, default="running")  # running, completed, failed
+    requested_count = Column(Integer, nullable=False, default=0)
+    affected_count = Column(Integer, nullable=False, default=0)
+    gmail_message_count = Column(Integer, nullable=False, default=0)
+    gmail_failed_count = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    completed_at = Column(DateTime, nullable=True)
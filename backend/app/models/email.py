@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean, Index, text
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
@@ -7,20 +7,43 @@ from app.core.database import Base
 class Email(Base):
     __tablename__ = "emails"
 
-    id = Column(Integer, primary_key=True, index=True)
-    gmail_id = Column(String, unique=True, index=True)
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    gmail_id = Column(String)
     subject = Column(String)
     sender = Column(String)
     content = Column(Text)
     summary = Column(Text, nullable=True)
     unsubscribe_link = Column(Text, nullable=True)  # Added this field
-    received_at = Column(DateTime)
+    unsubscribe_one_click = Column(Boolean, nullable=False, default=False, server_default="false")  # RFC 8058
+    # Partition key (see app.core.partitions), so it is part of the table's primary key
+    received_at = Column(DateTime, primary_key=True)
     is_archived = Column(Boolean, default=False)
     category_id = Column(Integer, ForeignKey("categories.id"), nullable=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     gmail_account_id = Column(Integer, ForeignKey("gmail_accounts.id"))
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # AI processing: pending, done, failed (retry queued) or dead (retries used up)
+    ai_status = Column(String, nullable=False, default="done", server_default="done")
+    ai_attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    ai_error = Column(Text, nullable=True)
+    ai_retry_at = Column(DateTime, nullable=True)  # Set while pending or failed
+
+    # Composite indexes matching the list_emails access patterns
+    __table_args__ = (
+        # Unique indexes on a partitioned table must include the partition key;
+        # GmailMessage deduplicates by Gmail ID alone
+        Index("ix_emails_gmail_id", gmail_id, received_at, unique=True),
+        Index("ix_emails_user_id_received_at", user_id, received_at.desc()),
+        Index("ix_emails_category_id_received_at", category_id, received_at.desc()),
+        Index("ix_emails_gmail_account_id_received_at", gmail_account_id, received_at.desc()),
+        # AI retry queue and dead-letter list; other emails stay out of both
+        Index("ix_emails_ai_retry_at", ai_retry_at, postgresql_where=text("ai_retry_at IS NOT NULL")),
+        Index("ix_emails_ai_dead", id, postgresql_where=text("ai_status = 'dead'")),
+        {"postgresql_partition_by": "RANGE (received_at)"},
+    )
+    # The ORM still identifies rows by id alone
+    __mapper_args__ = {"primary_key": [id]}
 
     # Relationships
     category = relationship("Category", back_populates="emails")
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, BigInteger, Integer, String, DateTime, Index
+from datetime import datetime
+
+from app.core.database import Base
+
+class EmailChange(Base):
+    """One entry in the email change log served by /emails/changes"""
+    __tablename__ = "email_changes"
+
+    seq = Column(BigInteger, primary_key=True)
+    # No foreign keys: entries outlive the rows they describe
+    user_id = Column(Integer, nullable=False)
+    email_id = Column(Integer, nullable=False)
+    op = Column(String, nullable=False)  # "upsert" or "delete"
+    changed_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_email_changes_user_id_seq", "user_id", "seq"),
+        Index("ix_email_changes_changed_at", "changed_at"),
+    )
@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer, String, ForeignKey
+
+from app.core.database import Base
+
+class EmailCounter(Base):
+    """Precomputed email count per (user, category) and (user, Gmail account)"""
+    __tablename__ = "email_counters"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    kind = Column(String, primary_key=True)  # "category" or "account"
+    ref_id = Column(Integer, primary_key=True)  # category/account id, 0 = uncategorized
+    count = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,14 @@
+from sqlalchemy import Column, String, DateTime
+from datetime import datetime
+
+from app.core.database import Base
+
+class EmailPartition(Base):
+    """A partition of the emails table; created and compacted by app.core.partitions"""
+    __tablename__ = "email_partitions"
+
+    name = Column(String, primary_key=True)
+    starts_at = Column(DateTime, nullable=True)  # None for the partition holding everything older
+    ends_at = Column(DateTime, nullable=False)
+    compacted_at = Column(DateTime, nullable=True)  # When its bodies were trimmed
+    created_at = Column(DateTime, default=datetime.utcnow)
@@ -14,7 +14,7 @@ class GmailAccount(Base):
     refresh_token = Column(Text, nullable=True)
     token_expiry = Column(DateTime, nullable=True)
     last_sync_time = Column(DateTime, nullable=True)
-    user_id = Column(Integer, ForeignKey("users.id"))
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
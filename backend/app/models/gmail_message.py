@@ -0,0 +1,25 @@
+from sqlalchemy import Column, DateTime, ForeignKey, ForeignKeyConstraint, Index, Integer, String
+
+from app.core.database import Base
+
+class GmailMessage(Base):
+    """
+    Gmail message already ingested for an account, for sync deduplication
+    Unique indexes on emails must include the partition key received_at,
+    so this table enforces one email per (account, Gmail ID) on its own.
+    Rows go away with their email.
+    """
+    __tablename__ = "gmail_messages"
+
+    gmail_account_id = Column(Integer, ForeignKey("gmail_accounts.id"), primary_key=True)
+    gmail_id = Column(String, primary_key=True)
+    email_id = Column(Integer, nullable=False)
+    received_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        ForeignKeyConstraint(
+            ["email_id", "received_at"], ["emails.id", "emails.received_at"], ondelete="CASCADE"
+        ),
+        # Found by the cascade when emails are deleted
+        Index("ix_gmail_messages_email_id", "email_id", "received_at"),
+    )
@@ -0,0 +1,44 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, JSON, Index, text
+from datetime import datetime
+
+from app.core.database import Base
+
+class Job(Base):
+    """A unit of background work, queued in Postgres and drained by the worker"""
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)
+    payload = Column(JSON, nullable=False, default=dict)
+    dedupe_key = Column(String, nullable=True)
+    status = Column(String, nullable=False, default="queued")  # queued, running, succeeded, failed
+    priority = Column(String, nullable=False, default="scheduled", server_default="scheduled")  # interactive, push, scheduled, backfill
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    run_after = Column(DateTime, nullable=False, default=datetime.utcnow)
+    locked_by = Column(String, nullable=True)
+    locked_at = Column(DateTime, nullable=True)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    completed_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # Claim order for each worker lane; finished jobs drop out of the index
+        Index(
+            "ix_jobs_queued_priority_run_after",
+            "priority",
+            "run_after",
+            "id",
+            postgresql_where=text("status = 'queued'"),
+        ),
+        # At most one live job per dedupe key
+        Index(
+            "ix_jobs_active_dedupe_key",
+            "dedupe_key",
+            unique=True,
+            postgresql_where=text("status IN ('queued', 'running')"),
+        ),
+    )
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean
+from datetime import datetime
+
+from app.core.database import Base
+
+class UnsubscribeRequest(Base):
+    """One unsubscribe attempt for a sender, created by a bulk unsubscribe"""
+    __tablename__ = "unsubscribe_requests"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    sender = Column(String, nullable=False)
+    url = Column(Text, nullable=True)
+    one_click = Column(Boolean, nullable=False, default=False)
+    status = Column(String, nullable=False, default="pending")  # pending, succeeded, failed, skipped
+    status_code = Column(Integer, nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    completed_at = Column(DateTime, nullable=True)
@@ -0,0 +1,14 @@
+from sqlalchemy import Column, BigInteger, Integer, ForeignKey
+
+from app.core.database import Base
+
+class UserVersion(Base):
+    """
+    Data version of a user's emails, categories and accounts
+    Bumped whenever any of them change. Kept off the users row so writers
+    don't queue behind logins and profile updates, or touch users.updated_at.
+    """
+    __tablename__ = "user_versions"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    data_version = Column(BigInteger, nullable=False, default=0, server_default="0")
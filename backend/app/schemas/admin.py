@@ -0,0 +1,21 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Optional
+
+class DeadLetter(BaseModel):
+    """An email whose AI processing ran out of attempts"""
+    id: int
+    user_id: int
+    gmail_account_id: int
+    subject: Optional[str] = None
+    sender: Optional[str] = None
+    received_at: Optional[datetime] = None
+    ai_attempts: int
+    ai_error: Optional[str] = None
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class RequeueResult(BaseModel):
+    requeued: int
@@ -0,0 +1,26 @@
+from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import List, Literal, Optional
+
+BulkAction = Literal["recategorize", "archive", "unarchive", "delete", "trash"]
+
+class BulkOperationCreate(BaseModel):
+    action: BulkAction
+    email_ids: List[int] = Field(..., min_length=1, max_length=10000)
+    category_id: Optional[int] = None  # Target for recategorize; None clears the category
+
+class BulkOperation(BaseModel):
+    id: int
+    action: str
+    status: str
+    requested_count: int
+    affected_count: int
+    gmail_message_count: int
+    gmail_failed_count: int
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    completed_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 from .gmail_account import GmailAccount
 
 class EmailBase(BaseModel):
@@ -30,4 +30,10 @@ class Email(EmailBase):
     gmail_account: Optional[GmailAccount] = None
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class EmailChanges(BaseModel):
+    changes: List[Email]  # Created or updated emails, current state
+    deleted: List[int]  # IDs of deleted emails
+    next_token: int  # Pass as ?since= on the next call
+    has_more: bool
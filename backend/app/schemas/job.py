@@ -0,0 +1,20 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+class Job(BaseModel):
+    id: int
+    kind: str
+    status: str
+    payload: Dict[str, Any]
+    attempts: int
+    max_attempts: int
+    run_after: datetime
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    completed_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,17 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+class CategoryCount(BaseModel):
+    category_id: Optional[int] = None  # None for uncategorized emails
+    name: Optional[str] = None
+    count: int
+
+class AccountCount(BaseModel):
+    gmail_account_id: int
+    email: Optional[str] = None
+    count: int
+
+class EmailStats(BaseModel):
+    total: int
+    categories: List[CategoryCount]
+    accounts: List[AccountCount]
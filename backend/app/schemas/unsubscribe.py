@@ -0,0 +1,20 @@
+from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import List, Optional
+
+class UnsubscribeCreate(BaseModel):
+    email_ids: List[int] = Field(..., min_length=1, max_length=5000)
+
+class UnsubscribeRequest(BaseModel):
+    id: int
+    sender: str
+    url: Optional[str] = None
+    one_click: bool
+    status: str
+    status_code: Optional[int] = None
+    error: Optional[str] = None
+    created_at: datetime
+    completed_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
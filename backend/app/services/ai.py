@@ -1,20 +1,165 @@
-from typing import List, Optional
+import asyncio
+import json
+import logging
+import time
+from typing import Dict, List, Optional
+import openai
 from openai import AsyncOpenAI
-from datetime import datetime
+from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
+from app.core.metrics import CLASSIFY_BATCH_FALLBACKS, OPENAI_REQUEST_SECONDS, OPENAI_TOKENS
+from app.core.resilience import (
+    AUTH, QUOTA, TRANSIENT, PERMANENT, CircuitBreaker, CircuitOpenError, DependencyError,
+    async_call_with_retry, retry_after_seconds
+)
 from app.models import Category, Email
+from app.services.fairness import llm_slot
+
+logger = logging.getLogger(__name__)
+
+OPENAI = "openai"
+
+# Stored as the summary when summarization fails
+SUMMARY_ERROR = "Error generating summary"
+
+# Placeholder for batch entries that must be classified on their own
+_UNRESOLVED = object()
+
+# Email.ai_status values
+AI_PENDING = "pending"
+AI_DONE = "done"
+AI_FAILED = "failed"  # Waiting in the retry queue
+AI_DEAD = "dead"  # Out of attempts; listed for admins to requeue
+
+# Every call shares one API key, so quota and auth failures affect them all
+openai_breaker = CircuitBreaker(
+    OPENAI, "global",
+    threshold=settings.BREAKER_GLOBAL_FAILURE_THRESHOLD,
+    counted=(TRANSIENT, QUOTA),
+    trips=(AUTH,)
+)
+
+def record_ai_outcome(email: Email, error: Optional[Exception] = None) -> None:
+    """
+    Update an email's AI processing state after an attempt
+    Failures are retried with exponential backoff until AI_MAX_ATTEMPTS,
+    then dead-lettered. A call refused by the open OpenAI breaker never
+    reached OpenAI, so it is rescheduled without using up an attempt.
+    """
+    now = datetime.utcnow()
+    if error is None:
+        email.ai_status = AI_DONE
+        email.ai_error = None
+        email.ai_retry_at = None
+        return
+
+    email.ai_error = str(error)[:1000]
+    if isinstance(error, CircuitOpenError):
+        email.ai_status = AI_FAILED
+        email.ai_retry_at = now + timedelta(seconds=max(error.retry_after or 0, settings.AI_RETRY_BASE_SECONDS))
+        return
+    email.ai_attempts = (email.ai_attempts or 0) + 1
+    if email.ai_attempts >= settings.AI_MAX_ATTEMPTS:
+        email.ai_status = AI_DEAD
+        email.ai_retry_at = None
+    else:
+        email.ai_status = AI_FAILED
+        email.ai_retry_at = now + timedelta(
+            seconds=settings.AI_RETRY_BASE_SECONDS * 2 ** (email.ai_attempts - 1)
+        )
+
+def classify_openai_error(error: Exception) -> DependencyError:
+    """Map an OpenAI client exception to a DependencyError kind"""
+    retry_after = None
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError)):
+        kind = TRANSIENT
+    elif isinstance(error, openai.RateLimitError):
+        kind = QUOTA
+    elif isinstance(error, (openai.AuthenticationError, openai.PermissionDeniedError)):
+        kind = AUTH
+    elif isinstance(error, openai.APIStatusError):
+        kind = TRANSIENT if error.status_code in (408, 409) or error.status_code >= 500 else PERMANENT
+    else:
+        kind = PERMANENT
+    if isinstance(error, openai.APIStatusError):
+        retry_after = retry_after_seconds(error.response.headers.get("retry-after"))
+    return DependencyError(OPENAI, kind, str(error), retry_after)
+
+def parse_batch_classification(content: str, count: int, category_ids: set) -> list:
+    """
+    Validate a batched classification answer of the form {"1": 12, "2": null}
+    Returns one entry per email: a category ID, None, or _UNRESOLVED when the
+    entry is missing or names an unknown category.
+    """
+    try:
+        answer = json.loads(content)
+    except ValueError:
+        answer = None
+    if not isinstance(answer, dict):
+        CLASSIFY_BATCH_FALLBACKS.labels("parse_error").inc(count)
+        return [_UNRESOLVED] * count
+
+    results = []
+    for number in range(1, count + 1):
+        value = answer.get(str(number), _UNRESOLVED)
+        if isinstance(value, str) and value.strip().isdigit():
+            value = int(value)
+        elif isinstance(value, str) and value.strip().lower() == "none":
+            value = None
+        if value is not None and (isinstance(value, bool) or value not in category_ids):
+            value = _UNRESOLVED
+        if value is _UNRESOLVED:
+            CLASSIFY_BATCH_FALLBACKS.labels("invalid_entry").inc()
+        results.append(value)
+    return results
 
 class AIService:
     def __init__(self):
         """Initialize OpenAI client with API key"""
-        self.client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+        # Retries happen in _complete, where they also feed the circuit breaker
+        self.client = AsyncOpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            base_url=settings.OPENAI_BASE_URL,
+            timeout=settings.OPENAI_TIMEOUT_SECONDS,
+            max_retries=0
+        )
+
+    async def _complete(self, prompt_type: str, **kwargs):
+        """
+        Create a chat completion, recording latency and token usage for the prompt type
+        Waits for a free slot under the per-user in-flight cap when run from a job.
+        Quota and transient errors are retried with backoff; failures raise a
+        DependencyError, or CircuitOpenError while OpenAI is failing.
+        """
+        async def attempt():
+            start = time.perf_counter()
+            status = "error"
+            try:
+                response = await self.client.chat.completions.create(**kwargs)
+                status = "ok"
+                return response
+            finally:
+                OPENAI_REQUEST_SECONDS.labels(prompt_type, status).observe(time.perf_counter() - start)
 
-    async def classify_email(self, email_content: str, categories: List[Category]) -> Optional[int]:
+        async with llm_slot():
+            response = await async_call_with_retry(OPENAI, attempt, classify_openai_error, [openai_breaker])
+        if response.usage:
+            OPENAI_TOKENS.labels(prompt_type, "prompt").inc(response.usage.prompt_tokens)
+            OPENAI_TOKENS.labels(prompt_type, "completion").inc(response.usage.completion_tokens)
+        return response
+
+    async def classify_email(
+        self,
+        email_content: str,
+        categories: List[Category],
+        raise_errors: bool = False
+    ) -> Optional[int]:
         """
         Classify an email into one of the available categories
-        Returns the category ID or None if no suitable category found
+        Returns the category ID or None if no suitable category found. API
+        errors also return None unless `raise_errors` is set.
         """
         if not categories:
             return None
@@ -37,7 +182,8 @@ Analyze the email and choose the most appropriate category. If none of the categ
 Only respond with the category ID number or "None". No other text."""
 
         try:
-            response = await self.client.chat.completions.create(
+            response = await self._complete(
+                "classify",
                 model="gpt-3.5-turbo",
                 messages=[
                     {"role": "system", "content": "You are a precise email classifier that only responds with category IDs or None."},
@@ -63,13 +209,92 @@ Only respond with the category ID number or "None". No other text."""
             return None
 
         except Exception as e:
-            print(f"Error in classify_email: {str(e)}")
+            if raise_errors:
+                raise
+            logger.warning(f"Error in classify_email: {str(e)}")
             return None
 
-    async def summarize_email(self, email_content: str, subject: str) -> str:
+    async def classify_emails(
+        self,
+        email_contents: List[str],
+        categories: List[Category],
+        raise_errors: bool = False
+    ) -> List[Optional[int]]:
+        """
+        Classify several emails, packing up to CLASSIFY_BATCH_SIZE into each request
+        Returns category IDs (or None) in input order. Emails are truncated to
+        CLASSIFY_EMAIL_CHARS and the category list is sent once per request;
+        entries the batched answer gets wrong are retried with classify_email.
+        """
+        if not categories:
+            return [None] * len(email_contents)
+
+        results = []
+        for start in range(0, len(email_contents), settings.CLASSIFY_BATCH_SIZE):
+            batch = email_contents[start:start + settings.CLASSIFY_BATCH_SIZE]
+            results.extend(await self._classify_batch(batch, categories, raise_errors))
+        return results
+
+    async def _classify_batch(
+        self,
+        email_contents: List[str],
+        categories: List[Category],
+        raise_errors: bool
+    ) -> List[Optional[int]]:
+        if len(email_contents) == 1:
+            return [await self.classify_email(email_contents[0], categories, raise_errors)]
+
+        categories_context = "\n".join([
+            f"Category {cat.id}: {cat.name} - {cat.description}"
+            for cat in categories
+        ])
+        emails_context = "\n\n".join([
+            f"Email {number}:\n{content[:settings.CLASSIFY_EMAIL_CHARS]}"
+            for number, content in enumerate(email_contents, start=1)
+        ])
+
+        prompt = f"""You are an email classifier. Your task is to classify each of the following {len(email_contents)} emails into one of these categories:
+
+{categories_context}
+
+{emails_context}
+
+For each email, choose the most appropriate category ID, or null if none of the categories fit well.
+Respond with a JSON object mapping every email number to its category ID, for example {{"1": 12, "2": null}}. No other text."""
+
+        try:
+            response = await self._complete(
+                "classify_batch",
+                model="gpt-3.5-turbo",
+                messages=[
+                    {"role": "system", "content": "You are a precise email classifier that only responds with a JSON object of category IDs."},
+                    {"role": "user", "content": prompt}
+                ],
+                response_format={"type": "json_object"},
+                temperature=0,
+                max_tokens=12 * len(email_contents) + 20  # "<number>": <id> per email
+            )
+        except Exception as e:
+            if raise_errors:
+                raise
+            logger.warning(f"Error in classify_emails: {str(e)}")
+            return [None] * len(email_contents)
+
+        results = parse_batch_classification(
+            response.choices[0].message.content or "",
+            len(email_contents),
+            {cat.id for cat in categories}
+        )
+        for index, result in enumerate(results):
+            if result is _UNRESOLVED:
+                results[index] = await self.classify_email(email_contents[index], categories, raise_errors)
+        return results
+
+    async def summarize_email(self, email_content: str, subject: str, raise_errors: bool = False) -> str:
         """
         Generate a concise summary of an email
-        Returns the summary text
+        Returns the summary text, or SUMMARY_ERROR when the API call fails
+        unless `raise_errors` is set
         """
         prompt = f"""Summarize this email concisely in 2-3 sentences. Focus on the main points and any action items.
 
@@ -81,7 +306,8 @@ Content:
 Provide only the summary, no additional text."""
 
         try:
-            response = await self.client.chat.completions.create(
+            response = await self._complete(
+                "summarize",
                 model="gpt-3.5-turbo",
                 messages=[
                     {"role": "system", "content": "You are a precise email summarizer that creates concise, informative summaries."},
@@ -94,8 +320,10 @@ Provide only the summary, no additional text."""
             return response.choices[0].message.content.strip()
 
         except Exception as e:
-            print(f"Error in summarize_email: {str(e)}")
-            return "Error generating summary"
+            if raise_errors:
+                raise
+            logger.warning(f"Error in summarize_email: {str(e)}")
+            return SUMMARY_ERROR
 
     async def find_unsubscribe_link(self, email_content: str) -> Optional[str]:
         """
@@ -110,7 +338,8 @@ Email content:
 Return only the unsubscribe URL or instructions, or "None". No other text."""
 
         try:
-            response = await self.client.chat.completions.create(
+            response = await self._complete(
+                "unsubscribe",
                 model="gpt-3.5-turbo",
                 messages=[
                     {"role": "system", "content": "You are an unsubscribe link finder that only returns URLs or None."},
@@ -124,39 +353,84 @@ Return only the unsubscribe URL or instructions, or "None". No other text."""
             return None if result.lower() == "none" else result
 
         except Exception as e:
-            print(f"Error in find_unsubscribe_link: {str(e)}")
+            logger.warning(f"Error in find_unsubscribe_link: {str(e)}")
             return None
 
-    async def process_new_email(self, db: Session, email: Email) -> None:
+    async def process_new_emails(self, db: Session, emails: List[Email]) -> None:
         """
-        Process a new email:
-        1. Generate a summary
-        2. Classify it into a category
-        Updates the email record in the database
+        Process a batch of a user's new emails:
+        1. Generate a summary for each, unless summaries are lazy
+        2. Classify them into categories with batched requests
+        Updates the email records in the database, including their AI
+        processing state. Also used by the retry queue, so steps that
+        already succeeded for an email are skipped. The session's work so
+        far is committed first and no connection is held while OpenAI
+        answers, so `db` must keep loaded attributes across commits
+        (expire_on_commit=False).
         """
+        if not emails:
+            return
         try:
             # Get all categories for the user
-            categories = db.query(Category).filter(Category.user_id == email.user_id).all()
+            categories = await asyncio.to_thread(_load_categories, db, emails[0].user_id)
+            errors: Dict[int, Exception] = {}
+
+            # Generate summaries; in lazy mode they are made on first view
+            if settings.SUMMARY_MODE != "lazy":
+                for email in emails:
+                    if email.summary and email.summary != SUMMARY_ERROR:
+                        continue
+                    try:
+                        email.summary = await self.summarize_email(email.content, email.subject, raise_errors=True)
+                    except Exception as e:
+                        logger.warning(f"Error summarizing email {email.id}: {str(e)}")
+                        email.summary = None
+                        errors[email.id] = e
 
-            # Generate summary
-            summary = await self.summarize_email(email.content, email.subject)
-            email.summary = summary
+            # Classify emails
+            unclassified = [email for email in emails if email.category_id is None]
+            try:
+                category_ids = await self.classify_emails(
+                    [email.content for email in unclassified], categories, raise_errors=True
+                )
+            except Exception as e:
+                logger.warning(f"Error classifying {len(unclassified)} emails: {str(e)}")
+                for email in unclassified:
+                    errors.setdefault(email.id, e)
+            else:
+                for email, category_id in zip(unclassified, category_ids):
+                    if category_id:
+                        email.category_id = category_id
 
-            # Classify email
-            category_id = await self.classify_email(email.content, categories)
-            if category_id:
-                email.category_id = category_id
+            # Find unsubscribe links (store them for later use), unless the
+            # List-Unsubscribe header already provided one. Best effort, on
+            # the first attempt only
+            for email in emails:
+                if not email.unsubscribe_link and email.ai_status == AI_PENDING:
+                    unsubscribe_link = await self.find_unsubscribe_link(email.content)
+                    if unsubscribe_link:
+                        email.unsubscribe_link = unsubscribe_link
 
-            # Find unsubscribe link (store it for later use)
-            unsubscribe_link = await self.find_unsubscribe_link(email.content)
-            if unsubscribe_link:
-                email.unsubscribe_link = unsubscribe_link
+            for email in emails:
+                record_ai_outcome(email, errors.get(email.id))
 
-            # Update the email record
-            db.add(email)
-            db.commit()
-            db.refresh(email)
+            # Update the email records
+            await asyncio.to_thread(_store_emails, db, emails)
 
         except Exception as e:
-            print(f"Error in process_new_email: {str(e)}")
-            db.rollback()
\ No newline at end of file
+            # Emails stay pending; the retry queue picks them up once their retry time passes
+            logger.warning(f"Error in process_new_emails: {str(e)}")
+            await asyncio.to_thread(db.rollback)
+
+def _load_categories(db: Session, user_id: int) -> List[Category]:
+    """A user's categories, detached, with the session's transaction committed"""
+    categories = db.query(Category).filter(Category.user_id == user_id).all()
+    # Detached categories keep their loaded attributes across the commit
+    for category in categories:
+        db.expunge(category)
+    db.commit()
+    return categories
+
+def _store_emails(db: Session, emails: List[Email]) -> None:
+    db.add_all(emails)
+    db.commit()
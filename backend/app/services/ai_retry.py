@@ -0,0 +1,93 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.events import EMAIL_CATEGORIZED, publish_event
+from app.models import Email
+from app.services.ai import AI_DEAD, AI_DONE, AI_FAILED, AIService
+from app.services.jobs import enqueue_ai_retry
+
+def users_with_due_retries(db: Session) -> List[int]:
+    """Users with emails whose AI processing retry time has passed"""
+    return [user_id for (user_id,) in db.query(Email.user_id).filter(
+        Email.ai_retry_at <= datetime.utcnow()
+    ).distinct()]
+
+def lease_due_emails(db: Session, user_id: int) -> List[Email]:
+    """
+    Move the retry time of a user's longest-waiting due emails out and load them
+    The new retry time is a lease, so a crash mid-run only delays them.
+    Commits, so no transaction is open when it returns.
+    """
+    now = datetime.utcnow()
+    due = select(Email.id).where(
+        Email.user_id == user_id,
+        Email.ai_retry_at <= now
+    ).order_by(Email.ai_retry_at).limit(settings.AI_RETRY_BATCH_SIZE).with_for_update(skip_locked=True)
+    email_ids = db.execute(
+        update(Email)
+        .where(Email.id.in_(due.scalar_subquery()))
+        .values(ai_retry_at=now + timedelta(seconds=settings.AI_RETRY_BASE_SECONDS))
+        .returning(Email.id)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+    emails = db.query(Email).filter(Email.id.in_(email_ids)).order_by(Email.id).all()
+    db.commit()
+    return emails
+
+def _publish_recovered(db: Session, user_id: int, emails: List[Email]) -> None:
+    for email in emails:
+        publish_event(db, user_id, EMAIL_CATEGORIZED, email_id=email.id, category_id=email.category_id)
+    db.commit()
+
+async def retry_ai_processing(user_id: int, ai_service: AIService) -> dict:
+    """
+    Job body: process a user's emails that are due for an AI retry again
+    Takes the AI_RETRY_BATCH_SIZE longest-waiting emails and leases them
+    (see lease_due_emails). Each CLASSIFY_BATCH_SIZE slice is processed and
+    committed on its own; database work runs in threads and no connection
+    is held while OpenAI answers.
+    """
+    # Loaded emails stay readable between transactions
+    db = SessionLocal(expire_on_commit=False)
+    try:
+        emails = await asyncio.to_thread(lease_due_emails, db, user_id)
+
+        result = {"retried": len(emails), "recovered": 0, "failed": 0, "dead": 0}
+        for start in range(0, len(emails), settings.CLASSIFY_BATCH_SIZE):
+            batch = emails[start:start + settings.CLASSIFY_BATCH_SIZE]
+            await ai_service.process_new_emails(db, batch)
+            recovered = [email for email in batch if email.ai_status == AI_DONE]
+            dead = sum(1 for email in batch if email.ai_status == AI_DEAD)
+            result["recovered"] += len(recovered)
+            result["dead"] += dead
+            result["failed"] += len(batch) - len(recovered) - dead
+            await asyncio.to_thread(_publish_recovered, db, user_id, recovered)
+        return result
+    finally:
+        db.close()
+
+def requeue_dead_letters(db: Session, email_ids: Optional[List[int]] = None, user_id: Optional[int] = None) -> int:
+    """
+    Give dead-lettered emails a fresh set of attempts, due now
+    Limited to `email_ids` and/or `user_id` when given. Queues a retry job
+    per affected user; the caller commits. Returns the number requeued.
+    """
+    query = update(Email).where(Email.ai_status == AI_DEAD)
+    if email_ids is not None:
+        query = query.where(Email.id.in_(email_ids))
+    if user_id is not None:
+        query = query.where(Email.user_id == user_id)
+    rows = db.execute(
+        query.values(ai_status=AI_FAILED, ai_attempts=0, ai_retry_at=datetime.utcnow())
+        .returning(Email.user_id)
+        .execution_options(synchronize_session=False)
+    ).all()
+    for affected_user_id in {row.user_id for row in rows}:
+        enqueue_ai_retry(db, affected_user_id)
+    return len(rows)
@@ -0,0 +1,121 @@
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, delete, select, update
+from sqlalchemy.orm import Session
+
+from app.core.changes import DELETE, UPSERT, record_changes
+from app.core.counters import CATEGORY, UNCATEGORIZED, apply_deltas, deltas_for_rows
+from app.core.database import SessionLocal
+from app.core.versioning import bump_user_versions
+from app.models import BulkOperation, Email, GmailAccount
+from app.services.gmail import GmailService
+
+# Label changes (add, remove) applied in Gmail for each action
+GMAIL_LABEL_CHANGES = {
+    "archive": ([], ["INBOX"]),
+    "unarchive": (["INBOX"], []),
+    "trash": (["TRASH"], ["INBOX"]),
+    # Permanent deletion (batchDelete) needs the full https://mail.google.com/
+    # scope and accounts only grant gmail.modify; Gmail empties its trash itself
+    "delete": (["TRASH"], ["INBOX"]),
+}
+
+def apply_bulk_action(
+    db: Session,
+    user_id: int,
+    action: str,
+    email_ids: List[int],
+    category_id: Optional[int] = None
+) -> Tuple[int, Dict[int, List[str]]]:
+    """
+    Apply the local side of a bulk action as a single set-based statement
+    Returns the number of affected emails and, for actions with Gmail side
+    effects, the Gmail message IDs to propagate grouped by account ID.
+    Does not commit.
+    """
+    emails = Email.__table__
+    owned = and_(emails.c.id.in_(email_ids), emails.c.user_id == user_id)
+    deltas = Counter()
+
+    if action == "recategorize":
+        # Read the previous category in the same statement to keep counters exact
+        previous = (
+            select(emails.c.id, emails.c.category_id.label("previous_category_id"))
+            .where(owned, emails.c.category_id.is_distinct_from(category_id))
+            .with_for_update()
+            .subquery()
+        )
+        rows = db.execute(
+            update(emails)
+            .where(emails.c.id == previous.c.id)
+            .values(category_id=category_id)
+            .returning(emails.c.id, emails.c.user_id, previous.c.previous_category_id)
+        ).all()
+        for _, row_user_id, previous_category_id in rows:
+            deltas[(row_user_id, CATEGORY, previous_category_id or UNCATEGORIZED)] -= 1
+            deltas[(row_user_id, CATEGORY, category_id or UNCATEGORIZED)] += 1
+        gmail_rows = []
+    elif action in ("archive", "unarchive"):
+        rows = db.execute(
+            update(emails)
+            .where(owned)
+            .values(is_archived=(action == "archive"))
+            .returning(emails.c.id, emails.c.gmail_account_id, emails.c.gmail_id)
+        ).all()
+        gmail_rows = [(row.gmail_account_id, row.gmail_id) for row in rows]
+    elif action in ("delete", "trash"):
+        rows = db.execute(
+            delete(emails)
+            .where(owned)
+            .returning(emails.c.user_id, emails.c.category_id, emails.c.gmail_account_id, emails.c.gmail_id, emails.c.id)
+        ).all()
+        deltas = deltas_for_rows([row[:3] for row in rows], -1)
+        gmail_rows = [(row.gmail_account_id, row.gmail_id) for row in rows]
+    else:
+        raise ValueError(f"Unknown bulk action: {action}")
+
+    # Set-based statements bypass the ORM flush hooks
+    apply_deltas(db.connection(), deltas)
+    if rows:
+        bump_user_versions(db.connection(), [user_id])
+        op = DELETE if action in ("delete", "trash") else UPSERT
+        record_changes(db.connection(), [(user_id, row.id, op) for row in rows])
+
+    targets = defaultdict(list)
+    for gmail_account_id, gmail_id in gmail_rows:
+        if gmail_account_id is not None and gmail_id:
+            targets[gmail_account_id].append(gmail_id)
+
+    return len(rows), dict(targets)
+
+def propagate_to_gmail(operation_id: int, action: str, targets: Dict[int, List[str]]) -> None:
+    """Job body: apply a bulk action in Gmail with one batch call per 1000 messages"""
+    db = SessionLocal()
+    try:
+        failed_count = 0
+        errors = []
+        for account_id, gmail_ids in targets.items():
+            account = db.query(GmailAccount).filter(GmailAccount.id == account_id).first()
+            if not account:
+                failed_count += len(gmail_ids)
+                errors.append(f"Gmail account {account_id} not found")
+                continue
+            try:
+                gmail_service = GmailService(account, db)
+                add_label_ids, remove_label_ids = GMAIL_LABEL_CHANGES[action]
+                gmail_service.batch_modify(gmail_ids, add_label_ids, remove_label_ids)
+            except Exception as e:
+                failed_count += len(gmail_ids)
+                errors.append(f"{account.email}: {str(e)}")
+
+        operation = db.query(BulkOperation).filter(BulkOperation.id == operation_id).first()
+        if operation:
+            operation.gmail_failed_count = failed_count
+            operation.status = "failed" if failed_count else "completed"
+            operation.error = "\n".join(errors) or None
+            operation.completed_at = datetime.utcnow()
+            db.commit()
+    finally:
+        db.close()
@@ -0,0 +1,99 @@
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from typing import Iterator, List
+
+from sqlalchemy import Select, select
+
+from app.core.database import SessionLocal
+from app.models import Email, GmailAccount
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+# Rows fetched from the server-side cursor per round trip
+EXPORT_BATCH_SIZE = 2000
+
+def export_statement(criteria: list, include_content: bool = True) -> Select:
+    """Column-level select for an export; joins accounts like list_emails does"""
+    columns = [
+        Email.id,
+        Email.gmail_id,
+        Email.gmail_account_id,
+        GmailAccount.email.label("account_email"),
+        Email.category_id,
+        Email.subject,
+        Email.sender,
+        Email.received_at,
+        Email.is_archived,
+        Email.summary,
+        Email.unsubscribe_link,
+    ]
+    if include_content:
+        columns.append(Email.content)
+
+    return (
+        select(*columns)
+        .join(GmailAccount, Email.gmail_account_id == GmailAccount.id)
+        .where(*criteria)
+        .order_by(Email.received_at.desc(), Email.id.desc())
+    )
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+def _ndjson_chunk(rows: List) -> str:
+    return "".join(
+        json.dumps(dict(row._mapping), default=_json_default, ensure_ascii=False) + "\n"
+        for row in rows
+    )
+
+def _csv_chunk(rows: List, header: List[str] = None) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(header)
+    writer.writerows(
+        [value.isoformat() if isinstance(value, datetime) else value for value in row]
+        for row in rows
+    )
+    return buffer.getvalue()
+
+def stream_export(stmt: Select, format: str, compress: bool = False) -> Iterator[bytes]:
+    """
+    Yield the export in chunks of EXPORT_BATCH_SIZE rows
+    Opens its own session: the request's session is closed before a
+    streaming response body is sent.
+    """
+    # wbits=31 produces a gzip container rather than a raw zlib stream
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+
+    def encode(text: str) -> bytes:
+        data = text.encode("utf-8")
+        return compressor.compress(data) if compressor else data
+
+    db = SessionLocal()
+    try:
+        result = db.execute(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        header = list(result.keys()) if format == "csv" else None
+        if header:
+            yield encode(_csv_chunk([], header))
+
+        for rows in result.partitions():
+            if format == "csv":
+                chunk = encode(_csv_chunk(rows))
+            else:
+                chunk = encode(_ndjson_chunk(rows))
+            if chunk:
+                yield chunk
+
+        if compressor:
+            yield compressor.flush()
+    finally:
+        db.close()
@@ -0,0 +1,127 @@
+"""
+Fair sharing of worker capacity across users
+
+Lanes pick whose job to run next with deficit round robin, OpenAI calls
+are capped per user, and background syncs spend from a per-user email
+budget that refills every scheduling cycle.
+"""
+import asyncio
+import math
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from app.core.config import settings
+from app.core.metrics import USER_LLM_IN_FLIGHT
+
+# User whose job is running in the current task; set by the worker per job
+current_job_user: ContextVar[Optional[int]] = ContextVar("current_job_user", default=None)
+
+class DeficitRoundRobin:
+    """
+    Weighted deficit round robin over users with runnable jobs
+    Each round every backlogged user earns quantum * weight credit, and a
+    job can start while its user has credit left. Starting a job costs one
+    unit, reserved at pick time and refunded if no job gets claimed; the
+    rest of its cost (emails handled) is charged when it finishes, so heavy
+    users wait out their debt.
+    """
+
+    def __init__(self, quantum: float):
+        if quantum <= 0:
+            raise ValueError(f"Deficit round robin quantum must be positive, got {quantum}")
+        self.quantum = quantum
+        self.deficit: Dict[Optional[int], float] = defaultdict(float)
+        self.order = []  # Round-robin position
+
+    def pick(self, weights: Dict[Optional[int], float]) -> Optional[int]:
+        """Next user to serve among those with runnable jobs (user_id -> weight)"""
+        if not weights:
+            return None
+        # Users that went idle lose leftover credit, as in classic DRR, but keep any debt
+        for user_id in list(self.deficit):
+            if user_id not in weights and self.deficit[user_id] > 0:
+                del self.deficit[user_id]
+        self.order = [user_id for user_id in self.order if user_id in weights]
+        self.order += [user_id for user_id in weights if user_id not in self.order]
+
+        index = self._first_with_credit()
+        if index is None:
+            # Nobody has credit: grant the rounds it takes for someone to earn some in one go
+            credit = {user_id: self.quantum * max(weight, 0.01) for user_id, weight in weights.items()}
+            rounds = min(math.floor(-self.deficit[user_id] / credit[user_id]) + 1 for user_id in self.order)
+            for user_id in self.order:
+                self.deficit[user_id] += rounds * credit[user_id]
+            index = self._first_with_credit()
+            if index is None:
+                # Only reachable through float rounding
+                index = max(range(len(self.order)), key=lambda i: self.deficit[self.order[i]])
+
+        user_id = self.order[index]
+        # Rotate so the next pick starts after this user
+        self.order = self.order[index + 1:] + self.order[:index + 1]
+        self.deficit[user_id] -= 1
+        return user_id
+
+    def _first_with_credit(self) -> Optional[int]:
+        """Position in the round-robin order of the first user with credit"""
+        for index, user_id in enumerate(self.order):
+            if self.deficit[user_id] > 0:
+                return index
+        return None
+
+    def refund(self, user_id: Optional[int]) -> None:
+        """Give back the unit reserved by a pick that claimed no job"""
+        self.deficit[user_id] += 1
+
+    def charge(self, user_id: Optional[int], cost: float) -> None:
+        """Charge a finished job's cost beyond the unit paid at pick time"""
+        self.deficit[user_id] -= max(cost - 1, 0)
+
+class EmailBudget:
+    """Emails each user may have synced in the background per scheduling cycle"""
+
+    def __init__(self, per_cycle: int):
+        self.per_cycle = per_cycle
+        self.spent: Dict[int, int] = defaultdict(int)
+
+    def remaining(self, user_id: int) -> Optional[int]:
+        """None when budgets are disabled"""
+        if not self.per_cycle:
+            return None
+        return max(self.per_cycle - self.spent[user_id], 0)
+
+    def spend(self, user_id: int, count: int) -> None:
+        self.spent[user_id] += count
+
+    def new_cycle(self) -> None:
+        self.spent.clear()
+
+_llm_slots: Dict[int, asyncio.Semaphore] = {}
+_llm_slot_users: Dict[int, int] = defaultdict(int)  # Tasks holding or waiting on each semaphore
+
+@asynccontextmanager
+async def llm_slot():
+    """Hold one of the current job user's in-flight OpenAI slots"""
+    user_id = current_job_user.get()
+    if user_id is None or not settings.USER_MAX_INFLIGHT_LLM:
+        yield
+        return
+    semaphore = _llm_slots.get(user_id)
+    if semaphore is None:
+        semaphore = _llm_slots[user_id] = asyncio.Semaphore(settings.USER_MAX_INFLIGHT_LLM)
+    _llm_slot_users[user_id] += 1
+    try:
+        async with semaphore:
+            USER_LLM_IN_FLIGHT.labels(str(user_id)).inc()
+            try:
+                yield
+            finally:
+                USER_LLM_IN_FLIGHT.labels(str(user_id)).dec()
+    finally:
+        # Drop an idle user's semaphore so the map only holds users with calls in flight
+        _llm_slot_users[user_id] -= 1
+        if not _llm_slot_users[user_id]:
+            del _llm_slot_users[user_id]
+            del _llm_slots[user_id]
@@ -1,22 +1,130 @@
-from typing import List, Optional
-from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+from datetime import datetime, timezone
 from google.oauth2.credentials import Credentials
+from google.auth.exceptions import GoogleAuthError, RefreshError, TransportError
 from google.auth.transport import requests as google_requests
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+from googleapiclient.http import build_http
+from google_auth_httplib2 import AuthorizedHttp
 from email.mime.text import MIMEText
 import base64
+import httplib2
+import logging
+import re
+import time
 
 from app.core.config import settings
+from app.core.metrics import GMAIL_API_CALLS, GMAIL_API_SECONDS
+from app.core.resilience import (
+    AUTH, QUOTA, TRANSIENT, PERMANENT, BreakerGroup, CircuitBreaker, DependencyError,
+    call_with_retry, retry_after_seconds
+)
 from app.models import GmailAccount
 from sqlalchemy.orm import Session
 
+logger = logging.getLogger(__name__)
+
+GMAIL = "gmail"
+
+# Gmail accepts at most 1000 message IDs per batchModify call
+GMAIL_BATCH_SIZE = 1000
+
+# 403 reasons that mean rate limiting rather than a missing permission
+QUOTA_REASONS = {"rateLimitExceeded", "userRateLimitExceeded", "quotaExceeded", "dailyLimitExceeded"}
+
+# Gmail-wide outages open the global breaker; a single mailbox's auth or
+# quota trouble only opens that account's breaker
+gmail_breaker = CircuitBreaker(GMAIL, "global", threshold=settings.BREAKER_GLOBAL_FAILURE_THRESHOLD)
+account_breakers = BreakerGroup(
+    GMAIL, "account",
+    threshold=settings.BREAKER_FAILURE_THRESHOLD,
+    counted=(TRANSIENT, QUOTA),
+    trips=(AUTH,)
+)
+
+def classify_gmail_error(error: Exception) -> DependencyError:
+    """Map a Gmail client exception to a DependencyError kind"""
+    if isinstance(error, HttpError):
+        status = error.resp.status
+        details = error.error_details if isinstance(error.error_details, list) else []
+        reasons = {detail.get("reason") for detail in details if isinstance(detail, dict)}
+        if status == 429 or (status == 403 and reasons & QUOTA_REASONS):
+            kind = QUOTA
+        elif status == 401:
+            kind = AUTH
+        elif status == 408 or status >= 500:
+            kind = TRANSIENT
+        else:
+            kind = PERMANENT
+        return DependencyError(GMAIL, kind, str(error), retry_after_seconds(error.resp.get("retry-after")))
+    if isinstance(error, RefreshError):
+        # invalid_grant and friends: the refresh token was revoked or expired
+        return DependencyError(GMAIL, TRANSIENT if error.retryable else AUTH, str(error))
+    if isinstance(error, (TransportError, httplib2.HttpLib2Error, OSError)):
+        return DependencyError(GMAIL, TRANSIENT, str(error))
+    if isinstance(error, GoogleAuthError):
+        return DependencyError(GMAIL, AUTH, str(error))
+    return DependencyError(GMAIL, PERMANENT, str(error))
+
+def parse_list_unsubscribe(headers: List[dict]) -> Tuple[Optional[str], bool]:
+    """
+    Extract the unsubscribe URL from List-Unsubscribe headers
+    Returns (url, one_click): the first HTTP(S) URL in List-Unsubscribe, and
+    whether the sender supports RFC 8058 one-click POST for it.
+    """
+    values = {h['name'].lower(): h['value'] for h in headers}
+    links = re.findall(r'<([^>]+)>', values.get('list-unsubscribe', ''))
+    url = next((link.strip() for link in links if link.strip().lower().startswith(('https://', 'http://'))), None)
+    if not url:
+        return None, False
+    one_click = (
+        url.lower().startswith('https://')
+        and 'list-unsubscribe=one-click' in values.get('list-unsubscribe-post', '').lower()
+    )
+    return url, one_click
+
 class GmailService:
     def __init__(self, gmail_account: GmailAccount, db: Session):
         """Initialize Gmail service with a GmailAccount model"""
         self.gmail_account = gmail_account
         self.db = db
+        self.breakers = [gmail_breaker, account_breakers.get(gmail_account.id)]
         self.credentials = self._get_credentials()
-        self.service = build('gmail', 'v1', credentials=self.credentials)
+        self.service = self._build_service()
+
+    def _build_service(self):
+        """Gmail API client with a GMAIL_TIMEOUT_SECONDS timeout, pointed at GMAIL_API_ENDPOINT when configured"""
+        client_options = {"api_endpoint": settings.GMAIL_API_ENDPOINT} if settings.GMAIL_API_ENDPOINT else None
+        http = build_http()
+        http.timeout = settings.GMAIL_TIMEOUT_SECONDS
+        return build('gmail', 'v1', http=AuthorizedHttp(self.credentials, http=http), client_options=client_options)
+
+    def _execute(self, method: str, request):
+        """
+        Execute a Gmail API request through the circuit breakers
+        Quota and transient errors are retried with backoff; anything else,
+        or the last failed retry, raises a DependencyError. Auth errors are
+        final: the client already refreshes the token on a 401.
+        """
+        return call_with_retry(
+            GMAIL, lambda: self._execute_once(method, request), classify_gmail_error, self.breakers
+        )
+
+    def _execute_once(self, method: str, request):
+        """Execute a Gmail API request once, recording its latency and HTTP status"""
+        start = time.perf_counter()
+        status = "error"
+        try:
+            response = request.execute()
+            status = "200"
+            return response
+        except HttpError as e:
+            status = str(e.resp.status)
+            raise
+        finally:
+            GMAIL_API_CALLS.labels(method, status).inc()
+            GMAIL_API_SECONDS.labels(method).observe(time.perf_counter() - start)
 
     def _get_credentials(self) -> Credentials:
         """Get credentials, refreshing if necessary"""
@@ -32,11 +140,11 @@ class GmailService:
         # Check if token needs refresh
         if self.gmail_account.token_expiry and datetime.utcnow() >= self.gmail_account.token_expiry:
             request = google_requests.Request()
-            creds.refresh(request)
+            call_with_retry(GMAIL, lambda: creds.refresh(request), classify_gmail_error, self.breakers)
             
             # Update tokens in database
             self.gmail_account.access_token = creds.token
-            self.gmail_account.token_expiry = datetime.utcnow() + timedelta(seconds=creds.expiry.second)
+            self.gmail_account.token_expiry = creds.expiry
             self.db.add(self.gmail_account)
             self.db.commit()
 
@@ -49,81 +157,103 @@ class GmailService:
         """
         query = "in:inbox"  # Only unarchived emails
         if since:
-            query += f" after:{int(since.timestamp())}"
+            # Stored times are naive UTC
+            query += f" after:{int(since.replace(tzinfo=timezone.utc).timestamp())}"
 
-        try:
-            results = self.service.users().messages().list(
+        results = self._execute(
+            'messages.list',
+            self.service.users().messages().list(
                 userId='me',
                 q=query,
                 maxResults=50  # Limit to 50 emails per sync
-            ).execute()
+            )
+        )
 
-            messages = []
-            if 'messages' in results:
-                for message in results['messages']:
-                    # Get full message details
-                    msg = self.service.users().messages().get(
+        messages = []
+        for message in results.get('messages', []):
+            # Get full message details
+            try:
+                msg = self._execute(
+                    'messages.get',
+                    self.service.users().messages().get(
                         userId='me',
                         id=message['id'],
                         format='full'
-                    ).execute()
-                    
-                    # Extract headers
-                    headers = msg['payload']['headers']
-                    subject = next(
-                        (h['value'] for h in headers if h['name'].lower() == 'subject'),
-                        'No Subject'
-                    )
-                    sender = next(
-                        (h['value'] for h in headers if h['name'].lower() == 'from'),
-                        'Unknown'
                     )
-                    
-                    # Get message body
-                    if 'parts' in msg['payload']:
-                        parts = msg['payload']['parts']
-                        body = next(
-                            (part['body']['data'] for part in parts if part['mimeType'] == 'text/plain'),
-                            None
-                        )
-                    else:
-                        body = msg['payload'].get('body', {}).get('data')
-
-                    if body:
-                        body = base64.urlsafe_b64decode(body).decode()
-                    else:
-                        body = ''
-
-                    messages.append({
-                        'gmail_id': msg['id'],
-                        'subject': subject,
-                        'sender': sender,
-                        'content': body,
-                        'received_at': datetime.fromtimestamp(int(msg['internalDate'])/1000)
-                    })
-
-            return messages
-
-        except Exception as e:
-            # If we get a token error, try refreshing and retry once
-            if "invalid_grant" in str(e):
-                self.credentials = self._get_credentials()
-                self.service = build('gmail', 'v1', credentials=self.credentials)
-                return self.list_unarchived_emails(since)
-            raise
+                )
+            except DependencyError as e:
+                if e.kind != PERMANENT:
+                    raise
+                # Deleted since it was listed, or unreadable; the rest still sync
+                logger.warning(f"Skipping Gmail message {message['id']}: {str(e)}")
+                continue
+
+            # Extract headers
+            headers = msg['payload']['headers']
+            subject = next(
+                (h['value'] for h in headers if h['name'].lower() == 'subject'),
+                'No Subject'
+            )
+            sender = next(
+                (h['value'] for h in headers if h['name'].lower() == 'from'),
+                'Unknown'
+            )
+            unsubscribe_link, unsubscribe_one_click = parse_list_unsubscribe(headers)
+
+            # Get message body
+            if 'parts' in msg['payload']:
+                parts = msg['payload']['parts']
+                body = next(
+                    (part['body']['data'] for part in parts if part['mimeType'] == 'text/plain'),
+                    None
+                )
+            else:
+                body = msg['payload'].get('body', {}).get('data')
+
+            if body:
+                body = base64.urlsafe_b64decode(body).decode()
+            else:
+                body = ''
+
+            messages.append({
+                'gmail_id': msg['id'],
+                'subject': subject,
+                'sender': sender,
+                'content': body,
+                'unsubscribe_link': unsubscribe_link,
+                'unsubscribe_one_click': unsubscribe_one_click,
+                'received_at': datetime.fromtimestamp(int(msg['internalDate'])/1000)
+            })
+
+        return messages
 
     def archive_email(self, message_id: str) -> None:
         """Archive an email by removing INBOX label"""
-        try:
+        self._execute(
+            'messages.modify',
             self.service.users().messages().modify(
                 userId='me',
                 id=message_id,
                 body={'removeLabelIds': ['INBOX']}
-            ).execute()
-        except Exception as e:
-            # If we get a token error, try refreshing and retry once
-            if "invalid_grant" in str(e):
-                self.credentials = self._get_credentials()
-                self.service = build('gmail', 'v1', credentials=self.credentials)
-                self.archive_email(message_id)
-            raise
\ No newline at end of file
+            )
+        )
+
+    def batch_modify(
+        self,
+        message_ids: List[str],
+        add_label_ids: Optional[List[str]] = None,
+        remove_label_ids: Optional[List[str]] = None
+    ) -> None:
+        """Add and/or remove labels on many messages with batchModify"""
+        for start in range(0, len(message_ids), GMAIL_BATCH_SIZE):
+            self._execute(
+                'messages.batchModify',
+                self.service.users().messages().batchModify(
+                    userId='me',
+                    body={
+                        'ids': message_ids[start:start + GMAIL_BATCH_SIZE],
+                        'addLabelIds': add_label_ids or [],
+                        'removeLabelIds': remove_label_ids or []
+                    }
+                )
+            )
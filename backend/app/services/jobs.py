@@ -0,0 +1,279 @@
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import case, delete, func, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models import Job, User
+
+logger = logging.getLogger(__name__)
+
+# Job kinds
+SYNC_ACCOUNT = "sync_account"
+BULK_GMAIL = "bulk_gmail"
+UNSUBSCRIBE = "unsubscribe"
+RECLASSIFY = "reclassify"
+SUMMARIZE = "summarize"
+RETRY_AI = "retry_ai"
+
+# Priority classes, highest first; each has its own worker lane
+INTERACTIVE = "interactive"  # Started by a user action
+PUSH = "push"  # Triggered by a change notification
+SCHEDULED = "scheduled"  # Periodic polling
+BACKFILL = "backfill"  # Large catch-up work: first syncs, reclassification, summaries
+PRIORITIES = (INTERACTIVE, PUSH, SCHEDULED, BACKFILL)
+
+ACTIVE_STATUSES = ("queued", "running")
+FINISHED_STATUSES = ("succeeded", "failed")
+
+def enqueue_job(
+    db: Session,
+    kind: str,
+    payload: Optional[Dict[str, Any]] = None,
+    user_id: Optional[int] = None,
+    dedupe_key: Optional[str] = None,
+    run_after: Optional[datetime] = None,
+    priority: str = SCHEDULED
+) -> Job:
+    """
+    Queue a job, or return the live job that already holds the dedupe key
+    A queued duplicate is promoted to `priority` if that is higher. The
+    caller owns the transaction and must commit.
+    """
+    values = dict(
+        kind=kind,
+        priority=priority,
+        payload=payload or {},
+        user_id=user_id,
+        dedupe_key=dedupe_key,
+        status="queued",
+        attempts=0,
+        max_attempts=settings.JOB_MAX_ATTEMPTS,
+        run_after=run_after or datetime.utcnow(),
+        created_at=datetime.utcnow(),
+        updated_at=datetime.utcnow()
+    )
+    stmt = insert(Job).values(**values).returning(Job.id)
+    if dedupe_key is not None:
+        stmt = stmt.on_conflict_do_nothing(
+            index_elements=[Job.dedupe_key],
+            index_where=Job.status.in_(ACTIVE_STATUSES)
+        )
+
+    while True:
+        job_id = db.execute(stmt).scalar()
+        if job_id is None:
+            job_id = db.query(Job.id).filter(
+                Job.dedupe_key == dedupe_key,
+                Job.status.in_(ACTIVE_STATUSES)
+            ).scalar()
+        # The conflicting job may have finished in between; insert again
+        if job_id is None:
+            continue
+        job = db.get(Job, job_id)
+        if job.status == "queued" and PRIORITIES.index(priority) < PRIORITIES.index(job.priority):
+            job.priority = priority
+            job.run_after = min(job.run_after, values["run_after"])
+        return job
+
+def enqueue_account_sync(db: Session, account_id: int, user_id: int, priority: str = INTERACTIVE) -> Job:
+    """Queue a sync of one Gmail account, deduplicated per account"""
+    return enqueue_job(
+        db,
+        SYNC_ACCOUNT,
+        {"gmail_account_id": account_id},
+        user_id=user_id,
+        dedupe_key=f"{SYNC_ACCOUNT}:{account_id}",
+        priority=priority
+    )
+
+def _queued_job(db: Session, kind: str, user_id: int) -> Optional[Job]:
+    """The user's queued job of this kind, locked so its payload can be widened"""
+    return db.query(Job).filter(
+        Job.kind == kind,
+        Job.user_id == user_id,
+        Job.status == "queued"
+    ).with_for_update().first()
+
+def enqueue_reclassify(
+    db: Session,
+    user_id: int,
+    category_ids: Optional[List[int]] = None,
+    uncategorized: bool = False
+) -> Job:
+    """
+    Queue reclassification of a user's emails in the given scope
+    Emails in any of `category_ids`, and uncategorized emails when
+    `uncategorized` is set. The scope is a predicate rather than a list of
+    emails, so the payload stays small however many emails it covers.
+    Widens the user's queued reclassify job if there is one, so a burst of
+    category edits is handled in one pass.
+    """
+    job = _queued_job(db, RECLASSIFY, user_id)
+    if job is None:
+        return enqueue_job(db, RECLASSIFY, {
+            "category_ids": sorted(set(category_ids or [])),
+            "uncategorized": uncategorized,
+        }, user_id=user_id, priority=BACKFILL)
+
+    # JSON columns don't track in-place changes; assign a new dict
+    job.payload = {
+        "category_ids": sorted(set(job.payload["category_ids"]) | set(category_ids or [])),
+        "uncategorized": job.payload["uncategorized"] or uncategorized or bool(job.payload.get("email_ids")),
+    }
+    return job
+
+def enqueue_summaries(db: Session, user_id: int, email_ids: List[int]) -> Job:
+    """Queue summary generation for a user's emails, merged into their queued summarize job"""
+    job = _queued_job(db, SUMMARIZE, user_id)
+    if job is None:
+        return enqueue_job(db, SUMMARIZE, {"email_ids": sorted(set(email_ids))}, user_id=user_id, priority=BACKFILL)
+    job.payload = {"email_ids": sorted(set(job.payload["email_ids"]) | set(email_ids))}
+    return job
+
+def summaries_queued(db: Session, user_id: int, email_ids: List[int]) -> bool:
+    """Whether the user's queued summarize job already covers these emails; reads without locking"""
+    payload = db.query(Job.payload).filter(
+        Job.kind == SUMMARIZE,
+        Job.user_id == user_id,
+        Job.status == "queued"
+    ).scalar()
+    return payload is not None and set(email_ids) <= set(payload["email_ids"])
+
+def enqueue_ai_retry(db: Session, user_id: int) -> Job:
+    """Queue a pass over a user's emails due for an AI processing retry, deduplicated per user"""
+    return enqueue_job(db, RETRY_AI, user_id=user_id, dedupe_key=f"{RETRY_AI}:{user_id}", priority=BACKFILL)
+
+def report_progress(db: Session, job_id: int, progress: Dict[str, Any]) -> None:
+    """Store a running job's progress in its result and commit; also extends its lock"""
+    now = datetime.utcnow()
+    db.execute(
+        update(Job)
+        .where(Job.id == job_id)
+        .values(
+            result=progress,
+            locked_at=case((Job.status == "running", now), else_=Job.locked_at),
+            updated_at=now
+        )
+    )
+    db.commit()
+
+def _holds_lock(job_id: int, worker_id: str, attempt: int) -> list:
+    """Conditions for a running job still being on the given worker's claim"""
+    return [Job.id == job_id, Job.status == "running", Job.locked_by == worker_id, Job.attempts == attempt]
+
+def heartbeat_job(db: Session, job_id: int, worker_id: str, attempt: int) -> bool:
+    """Extend the lock on a running job; False if the claim has been lost"""
+    result = db.execute(
+        update(Job)
+        .where(*_holds_lock(job_id, worker_id, attempt))
+        .values(locked_at=datetime.utcnow())
+    )
+    db.commit()
+    return bool(result.rowcount)
+
+def runnable_users(db: Session, priority: str) -> Dict[Optional[int], int]:
+    """Users with runnable jobs of a priority class, mapped to their job weight"""
+    rows = db.query(Job.user_id, func.coalesce(User.job_weight, 1)).outerjoin(
+        User, User.id == Job.user_id
+    ).filter(
+        Job.status == "queued",
+        Job.priority == priority,
+        Job.run_after <= datetime.utcnow()
+    ).group_by(Job.user_id, User.job_weight).all()
+    db.commit()
+    return dict(rows)
+
+def claim_job(db: Session, worker_id: str, priority: str, user_id: Optional[int] = None) -> Optional[Job]:
+    """
+    Lock the next runnable job of a priority class; concurrent workers skip it
+    Restricted to one user's jobs when `user_id` is given.
+    """
+    now = datetime.utcnow()
+    query = db.query(Job).filter(
+        Job.status == "queued",
+        Job.priority == priority,
+        Job.run_after <= now
+    )
+    if user_id is not None:
+        query = query.filter(Job.user_id == user_id)
+    job = query.order_by(
+        Job.run_after, Job.id
+    ).with_for_update(skip_locked=True).first()
+
+    if job:
+        job.status = "running"
+        job.locked_by = worker_id
+        job.locked_at = now
+        job.attempts += 1
+    db.commit()
+    return job
+
+def _finish(db: Session, job: Job, **values) -> bool:
+    """
+    Record the outcome of a claimed job, unless its claim has been lost
+    A job whose lock expired may have been claimed again; the attempt that
+    holds it now owns the outcome. `job` must still hold the claimed values.
+    """
+    result = db.execute(
+        update(Job)
+        .where(*_holds_lock(job.id, job.locked_by, job.attempts))
+        .values(locked_by=None, updated_at=datetime.utcnow(), **values)
+    )
+    db.commit()
+    if not result.rowcount:
+        logger.warning(f"Job {job.id} attempt {job.attempts} lost its claim; outcome discarded")
+    return bool(result.rowcount)
+
+def complete_job(db: Session, job: Job, result: Any = None) -> bool:
+    """Mark a claimed job as succeeded; False if its claim was lost"""
+    return _finish(db, job, status="succeeded", result=result, error=None, completed_at=datetime.utcnow())
+
+def fail_job(db: Session, job: Job, error: str) -> bool:
+    """
+    Record a failed attempt; retry with exponential backoff until attempts run out
+    Returns False if the job's claim was lost.
+    """
+    if job.attempts < job.max_attempts:
+        run_after = datetime.utcnow() + timedelta(
+            seconds=settings.JOB_RETRY_BASE_SECONDS * 2 ** (job.attempts - 1)
+        )
+        return _finish(db, job, status="queued", error=error, run_after=run_after)
+    return _finish(db, job, status="failed", error=error, completed_at=datetime.utcnow())
+
+def requeue_stale_jobs(db: Session) -> int:
+    """
+    Release jobs whose worker died mid-run; returns the number released
+    Running jobs refresh locked_at with heartbeats and progress reports, so
+    only jobs that have gone quiet for JOB_LOCK_TIMEOUT_MINUTES are released.
+    """
+    now = datetime.utcnow()
+    cutoff = now - timedelta(minutes=settings.JOB_LOCK_TIMEOUT_MINUTES)
+    exhausted = Job.attempts >= Job.max_attempts
+    result = db.execute(
+        update(Job)
+        .where(Job.status == "running", Job.locked_at < cutoff)
+        .values(
+            status=case((exhausted, "failed"), else_="queued"),
+            completed_at=case((exhausted, now), else_=None),
+            locked_by=None,
+            error="Worker lock expired",
+            updated_at=now
+        )
+    )
+    db.commit()
+    return result.rowcount
+
+def prune_finished_jobs(db: Session, older_than: timedelta) -> int:
+    """Delete finished jobs older than the given age; returns the number deleted"""
+    result = db.execute(
+        delete(Job).where(
+            Job.status.in_(FINISHED_STATUSES),
+            Job.completed_at < datetime.utcnow() - older_than
+        )
+    )
+    db.commit()
+    return result.rowcount
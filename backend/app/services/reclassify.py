@@ -0,0 +1,125 @@
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Any, Dict
+
+from sqlalchemy import false, func, or_
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.events import RECLASSIFY_PROGRESS, publish_event
+from app.models import Category, Email
+from app.services.ai import SUMMARY_ERROR, AIService
+from app.services.bulk import apply_bulk_action
+from app.services.jobs import report_progress
+
+logger = logging.getLogger(__name__)
+
+def detach_category(db: Session, user_id: int, category_id: int) -> int:
+    """
+    Move a category's emails to uncategorized in short transactions
+    Commits every chunk but the last, so the caller can delete the category
+    in the same transaction. Returns the number of moved emails.
+    """
+    detached = 0
+    while True:
+        email_ids = [email_id for (email_id,) in db.query(Email.id).filter(
+            Email.user_id == user_id,
+            Email.category_id == category_id
+        ).order_by(Email.id).limit(settings.CATEGORY_DETACH_BATCH_SIZE)]
+        if email_ids:
+            apply_bulk_action(db, user_id, "recategorize", email_ids, None)
+        detached += len(email_ids)
+        if len(email_ids) < settings.CATEGORY_DETACH_BATCH_SIZE:
+            return detached
+        db.commit()
+
+def classification_input(email) -> str:
+    """Text to classify an email from: its stored summary when there is one, else the body"""
+    if email.summary and email.summary != SUMMARY_ERROR:
+        return f"Subject: {email.subject}\nFrom: {email.sender}\n\n{email.summary}"
+    return email.content or ""
+
+async def reclassify_emails(job_id: int, user_id: int, scope: Dict[str, Any], ai_service: AIService) -> dict:
+    """
+    Job body: classify a user's emails in `scope` against their current categories
+    Walks the scope in ID order a chunk at a time, classifying with batched
+    requests and committing each chunk's category changes. Progress is
+    reported on the job and the event stream.
+    """
+    conditions = [false()]
+    if scope.get("category_ids"):
+        conditions.append(Email.category_id.in_(scope["category_ids"]))
+    # Jobs queued before scopes dropped email_ids listed detached, now uncategorized, emails
+    if scope.get("uncategorized") or scope.get("email_ids"):
+        conditions.append(Email.category_id.is_(None))
+    in_scope = [Email.user_id == user_id, or_(*conditions)]
+
+    db = SessionLocal()
+    semaphore = asyncio.Semaphore(settings.RECLASSIFY_CONCURRENCY)
+
+    async def classify(emails, categories):
+        async with semaphore:
+            return await ai_service.classify_emails(
+                [classification_input(email) for email in emails], categories, raise_errors=True
+            )
+
+    try:
+        progress = {
+            "total": db.query(func.count(Email.id)).filter(*in_scope).scalar(),
+            "processed": 0,
+            "changed": 0,
+            "failed": 0,
+        }
+        last_id = 0
+        while True:
+            emails = db.query(
+                Email.id, Email.subject, Email.sender, Email.summary, Email.content, Email.category_id
+            ).filter(*in_scope, Email.id > last_id).order_by(Email.id).limit(settings.RECLASSIFY_BATCH_SIZE).all()
+            if not emails:
+                return progress
+            last_id = emails[-1].id
+            # Reloaded per chunk so categories edited mid-run are honoured
+            categories = db.query(Category).filter(Category.user_id == user_id).all()
+            # Don't sit idle in a transaction while OpenAI answers; detached
+            # categories keep their loaded attributes across the commit
+            db.expunge_all()
+            db.commit()
+
+            # One batched request per CLASSIFY_BATCH_SIZE emails
+            batches = [
+                emails[start:start + settings.CLASSIFY_BATCH_SIZE]
+                for start in range(0, len(emails), settings.CLASSIFY_BATCH_SIZE)
+            ]
+            results = await asyncio.gather(
+                *(classify(batch, categories) for batch in batches),
+                return_exceptions=True
+            )
+            errors = [result for result in results if isinstance(result, Exception)]
+            if len(errors) == len(batches):
+                # Likely an outage; fail the attempt so the job retries later
+                raise errors[0]
+
+            valid_ids = {category.id for category in categories}
+            targets = defaultdict(list)
+            failed = 0
+            for batch, category_ids in zip(batches, results):
+                if isinstance(category_ids, Exception):
+                    logger.warning(f"Could not classify {len(batch)} emails: {str(category_ids)}")
+                    failed += len(batch)
+                    continue
+                for email, category_id in zip(batch, category_ids):
+                    if category_id != email.category_id and (category_id is None or category_id in valid_ids):
+                        targets[category_id].append(email.id)
+
+            for category_id, email_ids in targets.items():
+                changed, _ = apply_bulk_action(db, user_id, "recategorize", email_ids, category_id)
+                progress["changed"] += changed
+            progress["processed"] += len(emails)
+            progress["failed"] += failed
+            publish_event(db, user_id, RECLASSIFY_PROGRESS, job_id=job_id, **progress)
+            db.commit()
+            report_progress(db, job_id, progress)
+    finally:
+        db.close()
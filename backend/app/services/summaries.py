@@ -0,0 +1,159 @@
+import asyncio
+import logging
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from app.core.changes import UPSERT, record_changes
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.events import EMAIL_SUMMARIZED, publish_event
+from app.core.versioning import bump_user_versions
+from app.models import Category, Email
+from app.services.ai import SUMMARY_ERROR, AIService
+
+logger = logging.getLogger(__name__)
+
+# email_id -> generation in progress in this process
+_inflight: Dict[int, asyncio.Task] = {}
+# category_id -> views not yet added to categories.view_count
+_pending_views: Counter = Counter()
+_ai_service: Optional[AIService] = None
+
+def lazy_summaries() -> bool:
+    return settings.SUMMARY_MODE == "lazy"
+
+def _get_ai_service() -> AIService:
+    # Created on first use so the API starts without OpenAI settings
+    global _ai_service
+    if _ai_service is None:
+        _ai_service = AIService()
+    return _ai_service
+
+def store_summary(db: Session, email_id: int, summary: str) -> Optional[str]:
+    """
+    Save a generated summary unless the email already has one
+    Returns the summary the email ends up with. Does not commit.
+    """
+    row = db.execute(
+        update(Email)
+        .where(Email.id == email_id, Email.summary.is_(None))
+        .values(summary=summary, updated_at=datetime.utcnow())
+        .returning(Email.user_id)
+    ).first()
+    if row is None:
+        # Summarized elsewhere in the meantime, or deleted
+        return db.query(Email.summary).filter(Email.id == email_id).scalar()
+
+    # Set-based statements bypass the ORM flush hooks
+    bump_user_versions(db.connection(), [row.user_id])
+    record_changes(db.connection(), [(row.user_id, email_id, UPSERT)])
+    publish_event(db, row.user_id, EMAIL_SUMMARIZED, email_id=email_id)
+    return summary
+
+async def _generate(email_id: int, subject: str, content: str, ai_service: AIService) -> Optional[str]:
+    summary = await ai_service.summarize_email(content, subject)
+    if summary == SUMMARY_ERROR:
+        # Leave it unset so the next view tries again
+        return None
+    async with AsyncSessionLocal() as db:
+        summary = await db.run_sync(store_summary, email_id, summary)
+        await db.commit()
+    return summary
+
+async def get_or_create_summary(
+    email_id: int,
+    subject: str,
+    content: str,
+    ai_service: Optional[AIService] = None
+) -> Optional[str]:
+    """
+    Generate and store an email's summary, once per process at a time
+    Concurrent callers for the same email share one generation; a caller
+    that goes away doesn't cancel it for the others. Returns None when
+    generation fails.
+    """
+    task = _inflight.get(email_id)
+    if task is None:
+        task = asyncio.ensure_future(_generate(email_id, subject, content, ai_service or _get_ai_service()))
+        _inflight[email_id] = task
+        task.add_done_callback(lambda _: _inflight.pop(email_id, None))
+    return await asyncio.shield(task)
+
+async def summarize_emails(email_ids: List[int], ai_service: AIService) -> dict:
+    """Job body: generate missing summaries for the given emails"""
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(Email.id, Email.subject, Email.content)
+            .where(Email.id.in_(email_ids), Email.summary.is_(None))
+        )
+        emails = result.all()
+
+    semaphore = asyncio.Semaphore(settings.SUMMARY_CONCURRENCY)
+
+    async def summarize(email):
+        async with semaphore:
+            return await get_or_create_summary(email.id, email.subject, email.content, ai_service)
+
+    summaries = await asyncio.gather(*(summarize(email) for email in emails))
+    failed = sum(1 for summary in summaries if summary is None)
+    return {"summarized": len(emails) - failed, "failed": failed}
+
+def prewarm_targets(db: Session, user_id: int) -> List[int]:
+    """Newest unsummarized emails in the user's most-viewed categories"""
+    category_ids = [category_id for (category_id,) in db.query(Category.id).filter(
+        Category.user_id == user_id,
+        Category.view_count > 0
+    ).order_by(Category.view_count.desc()).limit(settings.SUMMARY_PREWARM_CATEGORIES)]
+
+    email_ids = []
+    for category_id in category_ids:
+        email_ids.extend(email_id for (email_id,) in db.query(Email.id).filter(
+            Email.user_id == user_id,
+            Email.category_id == category_id,
+            Email.summary.is_(None)
+        ).order_by(Email.received_at.desc()).limit(settings.SUMMARY_PREWARM_EMAILS))
+    return email_ids
+
+def record_category_view(category_id: Optional[int]) -> None:
+    """
+    Count an opened email towards its category's view count
+    Buffered in the process and written by flush_category_views, so
+    reading an email doesn't update a row every other reader also updates.
+    """
+    if category_id is not None:
+        _pending_views[category_id] += 1
+
+async def flush_category_views() -> int:
+    """Add the buffered views to categories.view_count; returns the number of views written"""
+    views = dict(_pending_views)
+    _pending_views.clear()
+    if not views:
+        return 0
+    try:
+        async with AsyncSessionLocal() as db:
+            # Sorted so concurrent flushes lock category rows in the same order
+            for category_id, count in sorted(views.items()):
+                await db.execute(
+                    update(Category)
+                    .where(Category.id == category_id)
+                    .values(view_count=Category.view_count + count)
+                )
+            await db.commit()
+    except Exception:
+        # Keep them for the next flush
+        _pending_views.update(views)
+        raise
+    return sum(views.values())
+
+async def flush_category_views_periodically() -> None:
+    """Flush buffered category views every CATEGORY_VIEW_FLUSH_SECONDS until cancelled"""
+    while True:
+        await asyncio.sleep(settings.CATEGORY_VIEW_FLUSH_SECONDS)
+        try:
+            await flush_category_views()
+        except Exception as e:
+            logger.warning(f"Could not write category views: {str(e)}")
@@ -0,0 +1,176 @@
+import asyncio
+import ipaddress
+import socket
+from dataclasses import dataclass
+from datetime import datetime
+from email.utils import parseaddr
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+from sqlalchemy import select, update
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models import UnsubscribeRequest
+
+# RFC 8058 one-click request body
+ONE_CLICK_BODY = {"List-Unsubscribe": "One-Click"}
+
+@dataclass
+class UnsubscribeTarget:
+    request_id: int
+    url: str
+    one_click: bool
+
+@dataclass
+class UnsubscribeResult:
+    request_id: int
+    succeeded: bool
+    status_code: Optional[int] = None
+    error: Optional[str] = None
+
+def sender_address(sender: Optional[str]) -> str:
+    """Normalized address from a From header, e.g. 'News <a@b.com>' -> 'a@b.com'"""
+    return parseaddr(sender or "")[1].strip().lower()
+
+def is_http_url(url: Optional[str]) -> bool:
+    return bool(url) and urlsplit(url).scheme in ("http", "https") and bool(urlsplit(url).hostname)
+
+def plan_unsubscribes(emails: Iterable) -> Dict[str, Tuple[Optional[str], bool]]:
+    """
+    Pick one unsubscribe link per sender
+    Takes rows with sender, unsubscribe_link and unsubscribe_one_click and
+    prefers one-click links, then any HTTP(S) link, then whatever was found.
+    """
+    def rank(url: Optional[str], one_click: bool) -> int:
+        if one_click and is_http_url(url):
+            return 3
+        if is_http_url(url):
+            return 2
+        return 1 if url else 0
+
+    plan = {}
+    for email in emails:
+        sender = sender_address(email.sender)
+        if not sender:
+            continue
+        candidate = (email.unsubscribe_link, bool(email.unsubscribe_one_click))
+        if sender not in plan or rank(*candidate) > rank(*plan[sender]):
+            plan[sender] = candidate
+    return plan
+
+async def _is_private_host(host: str) -> bool:
+    """Whether a host name resolves to a loopback, private or otherwise internal address"""
+    try:
+        infos = await asyncio.get_running_loop().getaddrinfo(host, None, type=socket.SOCK_STREAM)
+    except socket.gaierror:
+        return False  # Let the request itself fail with a connection error
+    for info in infos:
+        address = ipaddress.ip_address(info[4][0])
+        if not address.is_global:
+            return True
+    return False
+
+class UnsubscribeExecutor:
+    """
+    Executes unsubscribe requests concurrently over one pooled HTTP client,
+    with a global and a per-host concurrency limit and a per-request timeout.
+    Pass a client (e.g. one pointed at a local stand-in server) to override
+    the default one.
+    """
+
+    def __init__(
+        self,
+        client: Optional[httpx.AsyncClient] = None,
+        concurrency: Optional[int] = None,
+        per_host_concurrency: Optional[int] = None,
+        timeout: Optional[float] = None,
+        allow_private_hosts: Optional[bool] = None
+    ):
+        self.client = client
+        self.concurrency = concurrency or settings.UNSUBSCRIBE_CONCURRENCY
+        self.per_host_concurrency = per_host_concurrency or settings.UNSUBSCRIBE_PER_HOST_CONCURRENCY
+        self.timeout = timeout or settings.UNSUBSCRIBE_TIMEOUT
+        self.allow_private_hosts = (
+            settings.UNSUBSCRIBE_ALLOW_PRIVATE_HOSTS if allow_private_hosts is None else allow_private_hosts
+        )
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    async def run(self, targets: List[UnsubscribeTarget]) -> List[UnsubscribeResult]:
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        client = self.client or httpx.AsyncClient(
+            timeout=httpx.Timeout(self.timeout),
+            limits=httpx.Limits(max_connections=self.concurrency),
+            event_hooks={"request": [self._check_request]},
+        )
+        try:
+            return await asyncio.gather(*(self._unsubscribe(client, target) for target in targets))
+        finally:
+            if client is not self.client:
+                await client.aclose()
+
+    async def _check_request(self, request: httpx.Request) -> None:
+        """Refuse internal addresses, including ones reached through a redirect"""
+        if not self.allow_private_hosts and await _is_private_host(request.url.host):
+            raise httpx.RequestError("Refusing to contact a private address", request=request)
+
+    def _host_semaphore(self, host: str) -> asyncio.Semaphore:
+        if host not in self._host_semaphores:
+            self._host_semaphores[host] = asyncio.Semaphore(self.per_host_concurrency)
+        return self._host_semaphores[host]
+
+    async def _unsubscribe(self, client: httpx.AsyncClient, target: UnsubscribeTarget) -> UnsubscribeResult:
+        host = urlsplit(target.url).hostname or ""
+        try:
+            async with self._semaphore, self._host_semaphore(host):
+                if target.one_click:
+                    # RFC 8058: POST the one-click body; senders must not redirect
+                    response = await client.post(target.url, data=ONE_CLICK_BODY)
+                else:
+                    response = await client.get(target.url, follow_redirects=True)
+        except httpx.TimeoutException:
+            return UnsubscribeResult(target.request_id, False, error="Timed out")
+        except httpx.HTTPError as e:
+            return UnsubscribeResult(target.request_id, False, error=str(e) or type(e).__name__)
+
+        succeeded = response.status_code < 400
+        return UnsubscribeResult(
+            target.request_id,
+            succeeded,
+            status_code=response.status_code,
+            error=None if succeeded else f"HTTP {response.status_code}"
+        )
+
+async def run_unsubscribe_requests(request_ids: List[int]) -> None:
+    """
+    Job body: execute pending unsubscribe requests and record the results
+    No session is open while the requests run, so slow senders don't hold
+    a pooled connection.
+    """
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(UnsubscribeRequest.id, UnsubscribeRequest.url, UnsubscribeRequest.one_click).where(
+                UnsubscribeRequest.id.in_(request_ids),
+                UnsubscribeRequest.status == "pending"
+            )
+        )
+        targets = [UnsubscribeTarget(*row) for row in result.all()]
+
+    results = await UnsubscribeExecutor().run(targets)
+
+    completed_at = datetime.utcnow()
+    async with AsyncSessionLocal() as db:
+        for outcome in results:
+            await db.execute(
+                update(UnsubscribeRequest)
+                .where(UnsubscribeRequest.id == outcome.request_id)
+                .values(
+                    status="succeeded" if outcome.succeeded else "failed",
+                    status_code=outcome.status_code,
+                    error=outcome.error,
+                    completed_at=completed_at
+                )
+            )
+        await db.commit()
@@ -1,15 +1,45 @@
 import asyncio
+import os
+import socket
 import sys
+import time
 from datetime import datetime, timedelta
+from prometheus_client import start_http_server
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
 import logging
+from typing import List, Optional
 
 from app.core.config import settings
-from app.models import GmailAccount, Email
+from app.core.changes import prune_changes
+from app.core.counters import reconcile_counters
+from app.core.database import SessionLocal, set_async_pool_share, sync_pool_capacity
+from app.core.diagnostics import start_worker_diagnostics
+from app.core.partitions import apply_retention, ensure_partitions
+from app.core.metrics import (
+    JOB_QUEUE_WAIT_SECONDS, JOBS_RUNNING, USER_JOB_SERVICE, EMAILS_PROCESSED, SYNC_DURATION_SECONDS, SYNC_LAST_DURATION_SECONDS, SYNC_FRESHNESS_LAG_SECONDS
+)
+from app.core.events import (
+    SYNC_STARTED, SYNC_FINISHED, SYNC_FAILED, EMAIL_INGESTED, EMAIL_CATEGORIZED,
+    publish_event
+)
+from app.core.resilience import AUTH, CircuitOpenError, DependencyError
+from app.models import GmailAccount, GmailMessage, Email, Job, User
+from app.services.bulk import propagate_to_gmail
+from app.services.fairness import DeficitRoundRobin, EmailBudget, current_job_user
 from app.services.gmail import GmailService
-from app.services.ai import AIService
+from app.services.ai import AI_PENDING, AIService
+from app.services.ai_retry import retry_ai_processing, users_with_due_retries
+from app.services.jobs import (
+    SYNC_ACCOUNT, BULK_GMAIL, UNSUBSCRIBE, RECLASSIFY, SUMMARIZE, RETRY_AI,
+    PRIORITIES, INTERACTIVE, SCHEDULED, BACKFILL,
+    enqueue_account_sync, enqueue_ai_retry, enqueue_summaries, runnable_users, claim_job, complete_job, fail_job,
+    heartbeat_job, requeue_stale_jobs, prune_finished_jobs
+)
+from app.services.reclassify import reclassify_emails
+from app.services.summaries import lazy_summaries, prewarm_targets, summarize_emails
+from app.services.unsubscribe import run_unsubscribe_requests
 
 # Configure logging
 logging.basicConfig(
@@ -19,15 +49,108 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Create database connection
-engine = create_engine(settings.DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
 # Initialize AI service
 ai_service = AIService()
 
-async def sync_account(db: Session, account: GmailAccount):
-    """Sync a single Gmail account"""
+# Identifies this process in jobs.locked_by
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+# Background sync allowance per user, refilled each sync cycle
+email_budget = EmailBudget(settings.USER_EMAIL_BUDGET_PER_CYCLE)
+
+# gmail_account_id -> unix time of the newest ingested email
+_newest_received = {}
+
+def track_freshness(db: Session, account_id: int):
+    """Refresh the freshness lag gauge for an account after a sync"""
+    newest = db.query(func.max(Email.received_at)).filter(Email.gmail_account_id == account_id).scalar()
+    if newest is None:
+        return
+    if account_id not in _newest_received:
+        # Evaluated at scrape time, so the lag keeps growing between syncs
+        SYNC_FRESHNESS_LAG_SECONDS.labels(str(account_id)).set_function(
+            lambda: time.time() - _newest_received[account_id]
+        )
+    # received_at is stored as naive host-local time (see GmailService.list_unarchived_emails)
+    _newest_received[account_id] = newest.timestamp()
+
+def commit_event(db: Session, user_id: int, event_type: str, **data):
+    """Publish an event and commit it with the rest of the session's work"""
+    publish_event(db, user_id, event_type, **data)
+    db.commit()
+
+def store_new_email(db: Session, account: GmailAccount, email_data: dict) -> Optional[Email]:
+    """Ingest a fetched email and commit it; None if an earlier sync already did"""
+    # Check if email already exists, by Gmail ID alone: received_at can't be trusted to match
+    existing_email = db.get(GmailMessage, (account.id, email_data["gmail_id"]))
+    if existing_email:
+        db.commit()
+        return None
+
+    # Create new email record
+    db_email = Email(
+        gmail_id=email_data["gmail_id"],
+        subject=email_data["subject"],
+        sender=email_data["sender"],
+        content=email_data["content"],
+        unsubscribe_link=email_data.get("unsubscribe_link"),
+        unsubscribe_one_click=email_data.get("unsubscribe_one_click", False),
+        received_at=email_data["received_at"],
+        user_id=account.user_id,
+        gmail_account_id=account.id,
+        is_archived=True,
+        # Retried by the worker if processing never records an outcome
+        ai_status=AI_PENDING,
+        ai_retry_at=datetime.utcnow() + timedelta(seconds=settings.AI_RETRY_BASE_SECONDS)
+    )
+    db.add(db_email)
+    db.flush()  # Flush to get the email ID
+    db.add(GmailMessage(
+        gmail_account_id=account.id,
+        gmail_id=db_email.gmail_id,
+        email_id=db_email.id,
+        received_at=db_email.received_at
+    ))
+    try:
+        db.flush()
+    except IntegrityError:
+        # Ingested concurrently by another sync
+        db.rollback()
+        return None
+    commit_event(
+        db, account.user_id, EMAIL_INGESTED,
+        email_id=db_email.id,
+        gmail_account_id=account.id,
+        subject=(db_email.subject or "")[:200],
+        sender=db_email.sender,
+        received_at=db_email.received_at
+    )
+    return db_email
+
+def commit_categorized(db: Session, user_id: int, emails: List[Email]):
+    for db_email in emails:
+        publish_event(
+            db, user_id, EMAIL_CATEGORIZED,
+            email_id=db_email.id,
+            category_id=db_email.category_id
+        )
+    db.commit()
+
+async def sync_account(db: Session, account: GmailAccount, max_emails: Optional[int] = None) -> int:
+    """
+    Sync a single Gmail account; returns the number of new emails
+    With `max_emails`, stops after that many and leaves last_sync_time
+    alone, so the rest are picked up by a later sync. An email that can't
+    be archived doesn't fail the sync: it stays ingested, last_sync_time
+    stays put, and the next sync archives it. Auth failures and open
+    circuit breakers end the sync; emails ingested so far are kept.
+    Database work runs in threads and commits before every Gmail or OpenAI
+    call, so `db` must keep loaded attributes across commits
+    (expire_on_commit=False).
+    """
+    user_id, account_id = account.user_id, account.id
+    start = time.perf_counter()
+    sync_status = "failed"
     try:
         # Check if we've synced recently (reduced to 1 minute)
         # if account.last_sync_time and datetime.utcnow() - account.last_sync_time < timedelta(minutes=1):
@@ -35,80 +158,470 @@ async def sync_account(db: Session, account: GmailAccount):
         #     return
 
         logger.info(f"Starting sync for {account.email}")
-        gmail_service = GmailService(account, db)
+        await asyncio.to_thread(commit_event, db, user_id, SYNC_STARTED, gmail_account_id=account_id)
+        # May refresh the access token, with retries
+        gmail_service = await asyncio.to_thread(GmailService, account, db)
         synced_count = 0
+        archive_failures = 0
         
         # Fetch emails since last sync time or last 24 hours if no sync
         since_time = account.last_sync_time or (datetime.utcnow() - timedelta(days=1))
-        new_emails_data = gmail_service.list_unarchived_emails(since=since_time)
+        # Gmail client calls block; keep them off the loop so other lanes run
+        new_emails_data = await asyncio.to_thread(gmail_service.list_unarchived_emails, since=since_time)
         
-        for email_data in new_emails_data:
-            # Check if email already exists
-            existing_email = db.query(Email).filter(
-                Email.gmail_id == email_data["gmail_id"],
-                Email.gmail_account_id == account.id
-            ).first()
-
-            if not existing_email:
-                # Create new email record
-                db_email = Email(
-                    gmail_id=email_data["gmail_id"],
-                    subject=email_data["subject"],
-                    sender=email_data["sender"],
-                    content=email_data["content"],
-                    received_at=email_data["received_at"],
-                    user_id=account.user_id,
-                    gmail_account_id=account.id,
-                    is_archived=True
-                )
-                db.add(db_email)
-                db.commit()  # Commit to get the email ID
-                
+        # AI processing runs a batch at a time so classification can share requests
+        batch_size = settings.CLASSIFY_BATCH_SIZE
+        budget_left = max_emails
+        truncated = False
+        for offset in range(0, len(new_emails_data), batch_size):
+            batch = []
+            # Ingested by an earlier sync but still in the inbox: archiving it failed then
+            leftovers = []
+            for email_data in new_emails_data[offset:offset + batch_size]:
+                if budget_left is not None and len(batch) >= budget_left:
+                    truncated = True
+                    break
+                db_email = await asyncio.to_thread(store_new_email, db, account, email_data)
+                if db_email is None:
+                    leftovers.append(email_data["gmail_id"])
+                    continue
+                EMAILS_PROCESSED.labels("ingested").inc()
+                batch.append((email_data["gmail_id"], db_email))
+
+            if budget_left is not None:
+                budget_left -= len(batch)
+
+            if batch:
                 # Process with AI
-                logger.info(f"Processing email '{db_email.subject}' with AI")
-                await ai_service.process_new_email(db, db_email)
-                
-                # Archive email in Gmail
-                gmail_service.archive_email(email_data["gmail_id"])
-                synced_count += 1
+                logger.info(f"Processing {len(batch)} emails with AI")
+                emails = [db_email for _, db_email in batch]
+                await ai_service.process_new_emails(db, emails)
+                await asyncio.to_thread(commit_categorized, db, user_id, emails)
+                EMAILS_PROCESSED.labels("ai_processed").inc(len(batch))
+                synced_count += len(batch)
+
+            # Archive emails in Gmail
+            for gmail_id in [gmail_id for gmail_id, _ in batch] + leftovers:
+                try:
+                    await asyncio.to_thread(gmail_service.archive_email, gmail_id)
+                except DependencyError as e:
+                    if isinstance(e, CircuitOpenError) or e.kind == AUTH:
+                        raise
+                    logger.warning(f"Could not archive {gmail_id} for {account.email}: {str(e)}")
+                    archive_failures += 1
+                    continue
+                EMAILS_PROCESSED.labels("archived").inc()
+
+            if truncated:
+                break
         
-        # Update last sync time
-        account.last_sync_time = datetime.utcnow()
-        db.add(account)
-        db.commit()
+        # Update last sync time, unless emails were left for a later sync
+        if truncated:
+            logger.info(f"Email budget reached for {account.email}; the rest wait for the next cycle")
+        elif archive_failures:
+            logger.warning(f"{archive_failures} email(s) left in the inbox for {account.email}; retrying next sync")
+        else:
+            account.last_sync_time = datetime.utcnow()
+            db.add(account)
+        await asyncio.to_thread(
+            commit_event, db, user_id, SYNC_FINISHED,
+            gmail_account_id=account_id, synced=synced_count, archive_failed=archive_failures
+        )
         
         logger.info(f"Successfully synced and processed {synced_count} new emails for {account.email}")
+        sync_status = "succeeded"
+        await asyncio.to_thread(track_freshness, db, account_id)
+        return synced_count
     
     except Exception as e:
         logger.error(f"Error syncing {account.email}: {str(e)}")
+        await asyncio.to_thread(db.rollback)
+        await asyncio.to_thread(commit_event, db, user_id, SYNC_FAILED, gmail_account_id=account_id, error=str(e)[:500])
+        raise
+
+    finally:
+        elapsed = time.perf_counter() - start
+        SYNC_DURATION_SECONDS.labels(sync_status).observe(elapsed)
+        SYNC_LAST_DURATION_SECONDS.labels(str(account_id)).set(elapsed)
+
+def load_account(db: Session, account_id: int) -> Optional[GmailAccount]:
+    account = db.query(GmailAccount).filter(GmailAccount.id == account_id).first()
+    db.commit()
+    return account
+
+async def run_sync_account(job: Job):
+    """Job handler: sync one Gmail account"""
+    # The account and ingested emails stay readable between transactions
+    db = SessionLocal(expire_on_commit=False)
+    try:
+        account = await asyncio.to_thread(load_account, db, job.payload["gmail_account_id"])
+        if not account:
+            return {"synced": 0, "skipped": "Gmail account not found"}
+        if job.priority == INTERACTIVE:
+            return {"synced": await sync_account(db, account)}
+
+        # Background syncs share a per-user budget so one large mailbox can't crowd out others
+        remaining = email_budget.remaining(account.user_id)
+        if remaining == 0:
+            return {"synced": 0, "skipped": "Email budget for this cycle used up"}
+        synced = await sync_account(db, account, max_emails=remaining)
+        email_budget.spend(account.user_id, synced)
+        return {"synced": synced}
+    except DependencyError as e:
+        if e.kind != AUTH:
+            raise
+        # Retrying won't help until the user reconnects the account
+        return {"synced": 0, "skipped": f"Gmail authorization failed: {str(e)[:200]}"}
+    finally:
+        db.close()
+
+async def run_bulk_gmail(job: Job):
+    """Job handler: propagate a bulk operation to Gmail"""
+    # JSON object keys come back as strings
+    targets = {int(account_id): gmail_ids for account_id, gmail_ids in job.payload["targets"].items()}
+    await asyncio.to_thread(
+        propagate_to_gmail, job.payload["operation_id"], job.payload["action"], targets
+    )
+
+async def run_unsubscribe(job: Job):
+    """Job handler: execute pending unsubscribe requests"""
+    await run_unsubscribe_requests(job.payload["request_ids"])
+
+async def run_reclassify(job: Job):
+    """Job handler: reclassify a user's emails after their categories changed"""
+    return await reclassify_emails(job.id, job.user_id, job.payload, ai_service)
+
+async def run_summarize(job: Job):
+    """Job handler: generate missing summaries (lazy summary mode)"""
+    return await summarize_emails(job.payload["email_ids"], ai_service)
+
+async def run_retry_ai(job: Job):
+    """Job handler: retry AI processing for a user's failed emails"""
+    return await retry_ai_processing(job.user_id, ai_service)
+
+JOB_HANDLERS = {
+    SYNC_ACCOUNT: run_sync_account,
+    BULK_GMAIL: run_bulk_gmail,
+    UNSUBSCRIBE: run_unsubscribe,
+    RECLASSIFY: run_reclassify,
+    SUMMARIZE: run_summarize,
+    RETRY_AI: run_retry_ai,
+}
+
+# Result field counting the emails a job handled, for fair scheduling
+JOB_COST_FIELDS = {
+    SYNC_ACCOUNT: "synced",
+    RECLASSIFY: "processed",
+    SUMMARIZE: "summarized",
+    RETRY_AI: "retried",
+}
+
+def job_cost(job: Job, result) -> int:
+    """Emails a job handled, at least 1"""
+    field = JOB_COST_FIELDS.get(job.kind)
+    value = result.get(field) if field and isinstance(result, dict) else None
+    return max(int(value or 0), 1)
+
+def send_heartbeat(job_id: int, worker_id: str, attempt: int) -> bool:
+    db = SessionLocal()
+    try:
+        return heartbeat_job(db, job_id, worker_id, attempt)
+    finally:
+        db.close()
+
+async def keep_job_locked(job_id: int, worker_id: str, attempt: int):
+    """Refresh a running job's lock until cancelled, so long jobs aren't released as stale"""
+    while True:
+        await asyncio.sleep(settings.JOB_HEARTBEAT_SECONDS)
+        try:
+            if not await asyncio.to_thread(send_heartbeat, job_id, worker_id, attempt):
+                logger.warning(f"Job {job_id} attempt {attempt} lost its claim while running")
+                return
+        except Exception as e:
+            logger.warning(f"Heartbeat for job {job_id} failed: {str(e)}")
+
+async def run_job(db: Session, job: Job):
+    """Run a claimed job and record its outcome; returns the handler's result"""
+    handler = JOB_HANDLERS.get(job.kind)
+    # Lets per-user limits (OpenAI slots) see whose work this is
+    token = current_job_user.set(job.user_id)
+    heartbeat = asyncio.create_task(keep_job_locked(job.id, job.locked_by, job.attempts))
+    try:
+        if handler is None:
+            raise ValueError(f"Unknown job kind {job.kind!r}")
+        result = await handler(job)
+    except Exception as e:
+        logger.error(f"Job {job.id} ({job.kind}) failed on attempt {job.attempts}: {str(e)}")
+        await asyncio.to_thread(fail_job, db, job, str(e))
+        return None
+    else:
+        await asyncio.to_thread(complete_job, db, job, result)
+        return result
+    finally:
+        heartbeat.cancel()
+        current_job_user.reset(token)
+
+class RateLimiter:
+    """Token bucket shared by the slots of a lane; a rate of 0 means unlimited"""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.burst = max(rate, 1.0)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    async def acquire(self):
+        if not self.rate:
+            return
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def refund(self):
+        if self.rate:
+            self.tokens = min(self.burst, self.tokens + 1)
+
+async def run_lane(priority: str, limiter: RateLimiter, scheduler: DeficitRoundRobin):
+    """
+    One slot of a priority lane: claim and run jobs of that class only
+    The lane's scheduler picks which user's job runs next.
+    """
+    # Claimed jobs stay loaded after commit, so the slot holds no connection while a job runs
+    db = SessionLocal(expire_on_commit=False)
+    try:
+        while True:
+            try:
+                await limiter.acquire()
+                # Queries run in threads, so waiting on the pool never stalls the event loop
+                weights = await asyncio.to_thread(runnable_users, db, priority)
+                job = None
+                if weights:
+                    user_id = scheduler.pick(weights)
+                    job = await asyncio.to_thread(claim_job, db, WORKER_ID, priority, user_id)
+                    if job is None:
+                        # Another slot or worker got there first
+                        scheduler.refund(user_id)
+                if job is None:
+                    limiter.refund()
+                    await asyncio.sleep(settings.JOB_POLL_INTERVAL_SECONDS)
+                    continue
+
+                JOB_QUEUE_WAIT_SECONDS.labels(priority).observe(
+                    max((job.locked_at - job.run_after).total_seconds(), 0)
+                )
+                JOBS_RUNNING.labels(priority).inc()
+                try:
+                    result = await run_job(db, job)
+                finally:
+                    JOBS_RUNNING.labels(priority).dec()
+                cost = job_cost(job, result)
+                scheduler.charge(job.user_id, cost)
+                USER_JOB_SERVICE.labels(str(job.user_id), priority).inc(cost)
+            except Exception as e:
+                logger.error(f"Error in {priority} lane: {str(e)}")
+                db.rollback()
+                await asyncio.sleep(settings.JOB_POLL_INTERVAL_SECONDS)
+    finally:
+        db.close()
+
+def check_pool_capacity():
+    """
+    Refuse to start when the sync pool can't serve every lane slot at once
+    Each slot runs its database work on the sync engine, and so does the
+    maintenance thread; with fewer connections, slots would queue on the
+    pool behind each other.
+    """
+    slots = sum(int(settings.JOB_LANES.get(priority, {}).get("concurrency", 1)) for priority in PRIORITIES)
+    needed = slots + 1  # The maintenance thread
+    capacity = sync_pool_capacity()
+    if capacity is not None and capacity < needed:
+        raise RuntimeError(
+            f"Worker needs {needed} database connections ({slots} lane slots and maintenance) "
+            f"but its sync pool holds {capacity}; raise DB_POOL_SIZE or DB_MAX_OVERFLOW, "
+            f"lower WORKER_DB_ASYNC_POOL_SHARE, or reduce JOB_LANES concurrency"
+        )
+
+def start_lanes() -> list:
+    """
+    Start the worker lanes for each priority class
+    Every class gets its own slots, so a backlog in one never holds up another.
+    """
+    tasks = []
+    for priority in PRIORITIES:
+        lane = settings.JOB_LANES.get(priority, {})
+        limiter = RateLimiter(lane.get("rate", 0))
+        scheduler = DeficitRoundRobin(settings.FAIR_QUANTUM)
+        for _ in range(int(lane.get("concurrency", 1))):
+            tasks.append(asyncio.create_task(run_lane(priority, limiter, scheduler)))
+    return tasks
+
+def enqueue_scheduled_syncs():
+    """Queue a sync for every Gmail account; accounts with a live sync job are skipped"""
+    db = SessionLocal()
+    try:
+        accounts = db.query(GmailAccount.id, GmailAccount.user_id, GmailAccount.last_sync_time).all()
+        for account_id, user_id, last_sync_time in accounts:
+            # An account's first sync catches up on its whole backlog
+            priority = SCHEDULED if last_sync_time else BACKFILL
+            enqueue_account_sync(db, account_id, user_id, priority)
+        db.commit()
+        email_budget.new_cycle()
+    except Exception as e:
+        logger.error(f"Error scheduling syncs: {str(e)}")
         db.rollback()
+    finally:
+        db.close()
 
-async def sync_all_accounts():
-    """Sync all Gmail accounts"""
+def prewarm_summaries():
+    """Queue summaries for the newest emails in each user's most-viewed categories"""
+    db = SessionLocal()
     try:
-        db = SessionLocal()
-        accounts = db.query(GmailAccount).all()
-        
-        for account in accounts:
-            await sync_account(db, account)
-            
+        queued = 0
+        for (user_id,) in db.query(User.id).all():
+            email_ids = prewarm_targets(db, user_id)
+            if email_ids:
+                enqueue_summaries(db, user_id, email_ids)
+                queued += len(email_ids)
+        db.commit()
+        logger.info(f"Queued {queued} summaries for pre-warming")
+    except Exception as e:
+        logger.error(f"Error pre-warming summaries: {str(e)}")
+        db.rollback()
+    finally:
+        db.close()
+
+def enqueue_ai_retries():
+    """Queue a retry job for every user with emails due for another AI processing attempt"""
+    db = SessionLocal()
+    try:
+        user_ids = users_with_due_retries(db)
+        for user_id in user_ids:
+            enqueue_ai_retry(db, user_id)
+        db.commit()
+        if user_ids:
+            logger.info(f"Queued AI retries for {len(user_ids)} user(s)")
+    except Exception as e:
+        logger.error(f"Error queueing AI retries: {str(e)}")
+        db.rollback()
+    finally:
+        db.close()
+
+def maintain_jobs():
+    """Release jobs held by dead workers and prune old finished jobs"""
+    db = SessionLocal()
+    try:
+        released = requeue_stale_jobs(db)
+        if released:
+            logger.warning(f"Released {released} stale job(s)")
+        prune_finished_jobs(db, timedelta(days=settings.JOB_RETENTION_DAYS))
     except Exception as e:
-        logger.error(f"Error in sync_all_accounts: {str(e)}")
+        logger.error(f"Error maintaining jobs: {str(e)}")
+        db.rollback()
+    finally:
+        db.close()
+
+def prune_change_log():
+    """Drop email change log entries past their retention"""
+    db = SessionLocal()
+    try:
+        pruned = prune_changes(db, timedelta(days=settings.EMAIL_CHANGES_RETENTION_DAYS))
+        logger.info(f"Pruned {pruned} email change log entries")
+    except Exception as e:
+        logger.error(f"Error pruning email change log: {str(e)}")
+        db.rollback()
+    finally:
+        db.close()
+
+def maintain_partitions():
+    """Create upcoming email partitions and trim bodies past their retention"""
+    db = SessionLocal()
+    try:
+        created = ensure_partitions(db)
+        if created:
+            logger.info(f"Created email partitions: {', '.join(created)}")
+        compacted = apply_retention(db)
+        if compacted:
+            logger.info(f"Trimmed email bodies in partitions: {', '.join(compacted)}")
+    except Exception as e:
+        logger.error(f"Error maintaining email partitions: {str(e)}")
+        db.rollback()
+    finally:
+        db.close()
+
+def reconcile_all_counters():
+    """Rebuild the precomputed email counters of every user whose counts drifted"""
+    db = SessionLocal()
+    try:
+        user_ids = [user_id for (user_id,) in db.query(User.id).all()]
+        corrected = failed = 0
+        for user_id in user_ids:
+            # One user's failure doesn't stop the pass
+            try:
+                corrected += reconcile_counters(db, user_id)
+            except Exception as e:
+                logger.error(f"Error reconciling email counters for user {user_id}: {str(e)}")
+                db.rollback()
+                failed += 1
+        logger.info(f"Reconciled email counters for {len(user_ids)} users: {corrected} corrected, {failed} failed")
+    except Exception as e:
+        logger.error(f"Error reconciling email counters: {str(e)}")
+        db.rollback()
     finally:
         db.close()
 
 async def main():
     """Main worker loop"""
-    logger.info("Starting email sync worker (1-minute intervals)")
+    logger.info(f"Starting worker {WORKER_ID}")
+    # Lanes and maintenance run on the sync engine; give it most of the connection budget
+    set_async_pool_share(settings.WORKER_DB_ASYNC_POOL_SHARE)
+    check_pool_capacity()
+    if settings.WORKER_METRICS_PORT:
+        start_http_server(settings.WORKER_METRICS_PORT)
+        logger.info(f"Serving metrics on port {settings.WORKER_METRICS_PORT}")
+    start_worker_diagnostics()
+    sync_interval = timedelta(seconds=settings.SYNC_INTERVAL_SECONDS)
+    reconcile_interval = timedelta(minutes=settings.COUNTER_RECONCILE_INTERVAL_MINUTES)
+    prewarm_interval = timedelta(minutes=settings.SUMMARY_PREWARM_INTERVAL_MINUTES)
+    ai_retry_interval = timedelta(seconds=settings.AI_RETRY_INTERVAL_SECONDS)
+    partition_interval = timedelta(minutes=settings.EMAIL_PARTITION_MAINTENANCE_INTERVAL_MINUTES)
+    last_sync = None
+    last_reconcile = None
+    last_prewarm = None
+    last_ai_retry = None
+    last_partition_maintenance = None
+    lanes = start_lanes()  # Keep references; the loop only holds tasks weakly
     
+    # Periodic maintenance runs in threads so it never stalls the lanes
     while True:
-        try:
-            await sync_all_accounts()
-        except Exception as e:
-            logger.error(f"Error in main loop: {str(e)}")
-        
-        # Wait for 1 minute before next sync
-        await asyncio.sleep(60)  # 60 seconds = 1 minute
+        if not last_sync or datetime.utcnow() - last_sync >= sync_interval:
+            await asyncio.to_thread(maintain_jobs)
+            await asyncio.to_thread(enqueue_scheduled_syncs)
+            last_sync = datetime.utcnow()
+
+        if not last_reconcile or datetime.utcnow() - last_reconcile >= reconcile_interval:
+            await asyncio.to_thread(reconcile_all_counters)
+            await asyncio.to_thread(prune_change_log)
+            last_reconcile = datetime.utcnow()
+
+        if not last_ai_retry or datetime.utcnow() - last_ai_retry >= ai_retry_interval:
+            await asyncio.to_thread(enqueue_ai_retries)
+            last_ai_retry = datetime.utcnow()
+
+        if not last_partition_maintenance or datetime.utcnow() - last_partition_maintenance >= partition_interval:
+            await asyncio.to_thread(maintain_partitions)
+            last_partition_maintenance = datetime.utcnow()
+
+        prewarm_enabled = lazy_summaries() and settings.SUMMARY_PREWARM_CATEGORIES > 0
+        if prewarm_enabled and (not last_prewarm or datetime.utcnow() - last_prewarm >= prewarm_interval):
+            await asyncio.to_thread(prewarm_summaries)
+            last_prewarm = datetime.utcnow()
+
+        await asyncio.sleep(settings.JOB_POLL_INTERVAL_SECONDS)
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
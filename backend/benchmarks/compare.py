@@ -0,0 +1,43 @@
+"""
+Compare two benchmark reports
+
+    python -m benchmarks.compare benchmarks/results/<base>.json benchmarks/results/<head>.json
+"""
+import json
+import sys
+
+METRICS = [
+    # (key, higher is better)
+    ("emails_per_second", True),
+    ("email_latency_p50_ms", False),
+    ("email_latency_p95_ms", False),
+    ("gmail_calls_per_email", False),
+    ("openai_calls_per_email", False),
+    ("openai_tokens_per_email", False),
+    ("peak_rss_mb", False),
+    ("sync_errors", False),
+]
+
+def compare(base: dict, head: dict) -> str:
+    lines = [f"{'metric':<26}{base['revision']:>22}{head['revision']:>22}{'change':>16}"]
+    if base["params"] != head["params"]:
+        lines.append("warning: runs used different parameters; numbers are not comparable")
+    for key, higher_is_better in METRICS:
+        before, after = base["results"].get(key), head["results"].get(key)
+        change = ""
+        if before and after is not None:
+            pct = (after - before) / before * 100
+            better = pct > 0 if higher_is_better else pct < 0
+            verdict = "" if abs(pct) < 1 else (" better" if better else " worse")
+            change = f"{pct:+.1f}%{verdict}"
+        lines.append(f"{key:<26}{str(before):>22}{str(after):>22}{change:>16}")
+    return "\n".join(lines)
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        sys.exit(__doc__)
+    with open(sys.argv[1]) as f:
+        base = json.load(f)
+    with open(sys.argv[2]) as f:
+        head = json.load(f)
+    print(compare(base, head))
@@ -0,0 +1,134 @@
+"""
+Local fake of the Gmail API endpoints the app uses
+
+Serves a synthetic mailbox with configurable latency and 429 injection,
+and records per-method call counts plus per-email latency (first
+messages.get until the message is archived) at GET /_stats.
+"""
+import asyncio
+import random
+import re
+import time
+from collections import Counter
+from typing import List
+
+import uvicorn
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
+
+from benchmarks.mailbox import generate_mailbox
+
+RATE_LIMITED = {
+    "error": {
+        "code": 429,
+        "message": "Rate Limit Exceeded",
+        "status": "RESOURCE_EXHAUSTED",
+        "errors": [{"message": "Rate Limit Exceeded", "domain": "usageLimits", "reason": "rateLimitExceeded"}],
+    }
+}
+
+def create_app(
+    messages: List[dict],
+    latency_ms: float = 0.0,
+    jitter_ms: float = 0.0,
+    error_rate: float = 0.0,
+    seed: int = 1
+) -> FastAPI:
+    app = FastAPI(title="Fake Gmail API")
+    rng = random.Random(seed)
+    by_id = {message["id"]: message for message in messages}
+    calls = Counter()
+    first_fetched = {}
+    email_latencies = []
+
+    def archive(message_id: str, add: List[str], remove: List[str]) -> None:
+        message = by_id.get(message_id)
+        if message is None:
+            return
+        labels = set(message["labelIds"]) | set(add)
+        labels -= set(remove)
+        if "INBOX" in message["labelIds"] and "INBOX" not in labels and message_id in first_fetched:
+            email_latencies.append(time.perf_counter() - first_fetched[message_id])
+        message["labelIds"] = sorted(labels)
+
+    @app.middleware("http")
+    async def simulate_api(request: Request, call_next):
+        if request.url.path.startswith("/_"):
+            return await call_next(request)
+        delay = rng.gauss(latency_ms, jitter_ms) if jitter_ms else latency_ms
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+        if error_rate and rng.random() < error_rate:
+            calls["rate_limited"] += 1
+            return JSONResponse(RATE_LIMITED, status_code=429)
+        return await call_next(request)
+
+    @app.get("/gmail/v1/users/{user_id}/messages")
+    def list_messages(q: str = "", maxResults: int = 100, pageToken: str = None):
+        calls["messages.list"] += 1
+        after = re.search(r"after:(\d+)", q)
+        in_inbox = "in:inbox" in q
+        matches = [
+            message for message in messages
+            if (not in_inbox or "INBOX" in message["labelIds"])
+            and (not after or int(message["internalDate"]) // 1000 > int(after.group(1)))
+        ]
+        start = int(pageToken or 0)
+        page = matches[start:start + maxResults]
+        response = {
+            "messages": [{"id": m["id"], "threadId": m["threadId"]} for m in page],
+            "resultSizeEstimate": len(matches),
+        }
+        if start + maxResults < len(matches):
+            response["nextPageToken"] = str(start + maxResults)
+        if not page:
+            del response["messages"]
+        return response
+
+    @app.get("/gmail/v1/users/{user_id}/messages/{message_id}")
+    def get_message(message_id: str, format: str = "full"):
+        calls["messages.get"] += 1
+        message = by_id.get(message_id)
+        if message is None:
+            return JSONResponse({"error": {"code": 404, "message": "Not Found"}}, status_code=404)
+        first_fetched.setdefault(message_id, time.perf_counter())
+        return message
+
+    @app.post("/gmail/v1/users/{user_id}/messages/{message_id}/modify")
+    async def modify_message(message_id: str, request: Request):
+        calls["messages.modify"] += 1
+        body = await request.json()
+        archive(message_id, body.get("addLabelIds", []), body.get("removeLabelIds", []))
+        return {"id": message_id, "labelIds": by_id.get(message_id, {}).get("labelIds", [])}
+
+    @app.post("/gmail/v1/users/{user_id}/messages/batchModify")
+    async def batch_modify(request: Request):
+        calls["messages.batchModify"] += 1
+        body = await request.json()
+        for message_id in body.get("ids", []):
+            archive(message_id, body.get("addLabelIds", []), body.get("removeLabelIds", []))
+        return Response(status_code=204)
+
+    @app.post("/gmail/v1/users/{user_id}/messages/batchDelete")
+    async def batch_delete(request: Request):
+        calls["messages.batchDelete"] += 1
+        body = await request.json()
+        for message_id in body.get("ids", []):
+            by_id.pop(message_id, None)
+        messages[:] = [message for message in messages if message["id"] in by_id]
+        return Response(status_code=204)
+
+    @app.get("/_stats")
+    def stats():
+        return {
+            "calls": dict(calls),
+            "inbox": sum(1 for message in messages if "INBOX" in message["labelIds"]),
+            "email_latencies": email_latencies,
+        }
+
+    return app
+
+def serve(port: int, count: int, seed: int = 1, **options) -> None:
+    """Process entry point: generate the mailbox and serve it on 127.0.0.1:port"""
+    app = create_app(generate_mailbox(count, seed), seed=seed, **options)
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
@@ -0,0 +1,99 @@
+"""
+Local fake of the OpenAI chat completions endpoint
+
+Answers the app's classify (single and batched), summarize and
+unsubscribe prompts deterministically, with configurable latency and
+token usage estimated from prompt length.
+"""
+import asyncio
+import json
+import random
+import re
+import zlib
+from collections import Counter
+
+import uvicorn
+from fastapi import FastAPI, Request
+
+def _prompt_type(system: str) -> str:
+    system = system.lower()
+    if "classifier" in system:
+        return "classify"
+    if "summarizer" in system:
+        return "summarize"
+    if "unsubscribe" in system:
+        return "unsubscribe"
+    return "other"
+
+def _pick_category(category_ids: list, text: str) -> str:
+    # Stable pick per email so repeated runs classify identically
+    return category_ids[zlib.crc32(text.encode()) % len(category_ids)]
+
+def _answer(prompt_type: str, prompt: str) -> str:
+    if prompt_type == "classify_batch":
+        category_ids = re.findall(r"^Category (\d+):", prompt, re.M)
+        emails = re.split(r"^Email (\d+):$", prompt, flags=re.M)[1:]
+        return json.dumps({
+            number: int(_pick_category(category_ids, text)) if category_ids else None
+            for number, text in zip(emails[::2], emails[1::2])
+        })
+    if prompt_type == "classify":
+        category_ids = re.findall(r"^Category (\d+):", prompt, re.M)
+        if not category_ids:
+            return "None"
+        return _pick_category(category_ids, prompt)
+    if prompt_type == "summarize":
+        return "The sender shares an update and asks for a short reply. No other action is needed."
+    return "None"
+
+def create_app(latency_ms: float = 0.0, jitter_ms: float = 0.0, seed: int = 1) -> FastAPI:
+    app = FastAPI(title="Fake OpenAI API")
+    rng = random.Random(seed)
+    calls = Counter()
+    tokens = Counter()
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        messages = body.get("messages", [])
+        system = next((m["content"] for m in messages if m["role"] == "system"), "")
+        prompt = "\n".join(m["content"] for m in messages if m["role"] == "user")
+        prompt_type = _prompt_type(system)
+        if prompt_type == "classify" and body.get("response_format", {}).get("type") == "json_object":
+            prompt_type = "classify_batch"
+
+        delay = rng.gauss(latency_ms, jitter_ms) if jitter_ms else latency_ms
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+
+        content = _answer(prompt_type, prompt)
+        prompt_tokens = (len(system) + len(prompt)) // 4
+        completion_tokens = max(len(content) // 4, 1)
+        calls[prompt_type] += 1
+        tokens[prompt_type] += prompt_tokens + completion_tokens
+        return {
+            "id": f"chatcmpl-{sum(calls.values())}",
+            "object": "chat.completion",
+            "created": 0,
+            "model": body.get("model", "fake"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    @app.get("/_stats")
+    def stats():
+        return {"calls": dict(calls), "tokens": dict(tokens)}
+
+    return app
+
+def serve(port: int, **options) -> None:
+    """Process entry point: serve the fake on 127.0.0.1:port"""
+    uvicorn.run(create_app(**options), host="127.0.0.1", port=port, log_level="warning")
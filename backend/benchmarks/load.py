@@ -0,0 +1,165 @@
+"""
+Load test the email endpoints at fixed concurrency
+
+    python -m benchmarks.seed --users 20 --emails-per-user 50000
+    python -m benchmarks.load --base-url http://localhost:8000 --concurrency 16 --duration 30
+
+Each scenario runs on its own for --duration seconds with --concurrency
+workers, each picking a random seeded user per request. Reports requests
+per second and latency percentiles per scenario, printed and written to
+benchmarks/results/load-<git sha>.json. bulk_delete removes seeded
+emails, so it runs last and only when listed explicitly.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Callable, Dict, List, Tuple
+
+import httpx
+
+from benchmarks.mailbox import WORDS
+from benchmarks.run import RESULTS_DIR, git_revision, percentile
+from benchmarks.seed import DEFAULT_MANIFEST
+
+# name -> builder(rng, user, manifest) returning (method, path, json body)
+Request = Tuple[str, str, object]
+
+def list_page(rng, user, manifest) -> Request:
+    return "GET", f"/api/v1/emails/?limit=50&skip={rng.choice([0, 0, 0, 50, 100])}", None
+
+def deep_page(rng, user, manifest) -> Request:
+    deepest = max(manifest["emails_per_user"] - 50, 0)
+    return "GET", f"/api/v1/emails/?limit=50&skip={rng.randint(deepest // 2, deepest)}", None
+
+def search(rng, user, manifest) -> Request:
+    return "GET", f"/api/v1/emails/?limit=50&search={rng.choice(WORDS)}", None
+
+def search_miss(rng, user, manifest) -> Request:
+    # No row matches, so the whole mailbox is scanned
+    return "GET", f"/api/v1/emails/?limit=50&search=zq{rng.randint(0, 99999)}x", None
+
+def category_filter(rng, user, manifest) -> Request:
+    return "GET", f"/api/v1/emails/?limit=50&category_id={rng.choice(user['category_ids'])}", None
+
+def get_email(rng, user, manifest) -> Request:
+    low, high = user["email_id_range"]
+    return "GET", f"/api/v1/emails/{rng.randint(low, high)}", None
+
+def bulk_delete(rng, user, manifest) -> Request:
+    low, high = user["email_id_range"]
+    return "POST", "/api/v1/emails/bulk-delete", [rng.randint(low, high) for _ in range(50)]
+
+SCENARIOS: Dict[str, Callable] = {
+    "list_page": list_page,
+    "deep_page": deep_page,
+    "search": search,
+    "search_miss": search_miss,
+    "category_filter": category_filter,
+    "get_email": get_email,
+    "bulk_delete": bulk_delete,
+}
+DEFAULT_SCENARIOS = ["list_page", "deep_page", "search", "search_miss", "category_filter", "get_email"]
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    build: Callable,
+    manifest: dict,
+    concurrency: int,
+    duration: float,
+    seed: int
+) -> dict:
+    latencies: List[float] = []
+    statuses = Counter()
+    deadline = time.perf_counter() + duration
+
+    async def worker(worker_id: int) -> None:
+        rng = random.Random(seed * 1000 + worker_id)
+        while time.perf_counter() < deadline:
+            user = rng.choice(manifest["users"])
+            method, path, body = build(rng, user, manifest)
+            headers = {"Authorization": f"Bearer {user['token']}"}
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path, json=body, headers=headers)
+                statuses[str(response.status_code)] += 1
+            except httpx.HTTPError as e:
+                statuses[type(e).__name__] += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    def ms(pct):
+        value = percentile(latencies, pct)
+        return round(value * 1000, 2) if value is not None else None
+
+    return {
+        "requests": sum(statuses.values()),
+        "requests_per_second": round(len(latencies) / elapsed, 2),
+        "statuses": dict(statuses),
+        "p50_ms": ms(50),
+        "p90_ms": ms(90),
+        "p95_ms": ms(95),
+        "p99_ms": ms(99),
+        "max_ms": round(max(latencies) * 1000, 2) if latencies else None,
+    }
+
+async def run(args, manifest: dict) -> dict:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    results = {}
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=args.timeout) as client:
+        for name in args.scenarios:
+            print(f"Running {name} for {args.duration}s at concurrency {args.concurrency}", file=sys.stderr)
+            results[name] = await run_scenario(
+                client, SCENARIOS[name], manifest, args.concurrency, args.duration, args.seed
+            )
+    return results
+
+def main(argv=None) -> dict:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--manifest", default=DEFAULT_MANIFEST)
+    parser.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS), default=DEFAULT_SCENARIOS)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output-dir", default=RESULTS_DIR)
+    args = parser.parse_args(argv)
+    # Destructive scenarios go last so they don't skew the others
+    args.scenarios.sort(key=lambda name: name == "bulk_delete")
+
+    with open(args.manifest) as f:
+        manifest = json.load(f)
+
+    report = {
+        "revision": git_revision(),
+        "timestamp": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "params": {
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "seed": args.seed,
+            "users": len(manifest["users"]),
+            "emails_per_user": manifest["emails_per_user"],
+        },
+        "scenarios": asyncio.run(run(args, manifest)),
+    }
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    path = os.path.join(args.output_dir, f"load-{report['revision']}.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+    print(f"Wrote {path}", file=sys.stderr)
+    return report
+
+if __name__ == "__main__":
+    main()
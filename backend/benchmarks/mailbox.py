@@ -0,0 +1,148 @@
+"""
+Synthetic mailboxes in Gmail API `format=full` shape
+
+Generation is deterministic for a given seed, so every run of a benchmark
+sees byte-identical messages.
+"""
+import base64
+import math
+import random
+import time
+from typing import List
+
+WORDS = (
+    "account invoice meeting project update schedule review order shipping "
+    "delivery payment receipt newsletter offer sale discount team report "
+    "deadline launch feature release security alert password reset welcome "
+    "subscription renewal ticket support question follow up agenda notes "
+    "quarterly budget travel booking confirmation itinerary event invitation"
+).split()
+
+SENDERS = [
+    ("Acme Store", "orders@acme-store.example"),
+    ("Weekly Digest", "digest@news.example"),
+    ("Jira", "jira@tracker.example"),
+    ("Bank Alerts", "alerts@bank.example"),
+    ("Alex Kim", "alex.kim@corp.example"),
+    ("Travel Desk", "bookings@travel.example"),
+    ("GitHub", "notifications@github.example"),
+    ("Calendar", "calendar@corp.example"),
+]
+
+# (MIME layout, weight)
+LAYOUTS = [
+    ("text/plain", 35),
+    ("multipart/alternative", 45),
+    ("multipart/mixed", 15),
+    ("text/html", 5),
+]
+
+# Body sizes are log-normal: median ~2 KB with a long tail, capped at 256 KB
+BODY_SIZE_MEDIAN = 2048
+BODY_SIZE_SIGMA = 1.1
+BODY_SIZE_MAX = 256 * 1024
+
+def _b64(text: str) -> str:
+    return base64.urlsafe_b64encode(text.encode()).decode()
+
+def body_text(rng: random.Random, size: int) -> str:
+    """Roughly `size` characters of filler text, 12 words per line"""
+    words = []
+    length = 0
+    while length < size:
+        word = rng.choice(WORDS)
+        words.append(word)
+        length += len(word) + 1
+    lines = [" ".join(words[i:i + 12]) for i in range(0, len(words), 12)]
+    return "\n".join(lines)
+
+def _part(part_id: str, mime_type: str, data: str) -> dict:
+    return {
+        "partId": part_id,
+        "mimeType": mime_type,
+        "filename": "",
+        "headers": [{"name": "Content-Type", "value": f"{mime_type}; charset=UTF-8"}],
+        "body": {"size": len(data), "data": _b64(data)},
+    }
+
+def _payload(rng: random.Random, layout: str, headers: List[dict], body: str) -> dict:
+    html = f"<html><body><p>{body.replace(chr(10), '</p><p>')}</p></body></html>"
+    if layout == "text/plain":
+        payload = _part("", "text/plain", body)
+    elif layout == "text/html":
+        payload = _part("", "text/html", html)
+    elif layout == "multipart/alternative":
+        payload = {
+            "partId": "",
+            "mimeType": layout,
+            "filename": "",
+            "body": {"size": 0},
+            "parts": [_part("0", "text/plain", body), _part("1", "text/html", html)],
+        }
+    else:
+        attachment_size = int(rng.lognormvariate(math.log(80 * 1024), 1.0))
+        payload = {
+            "partId": "",
+            "mimeType": layout,
+            "filename": "",
+            "body": {"size": 0},
+            "parts": [
+                {
+                    "partId": "0",
+                    "mimeType": "multipart/alternative",
+                    "filename": "",
+                    "body": {"size": 0},
+                    "parts": [_part("0.0", "text/plain", body), _part("0.1", "text/html", html)],
+                },
+                {
+                    "partId": "1",
+                    "mimeType": "application/pdf",
+                    "filename": f"document-{rng.randint(1, 9999)}.pdf",
+                    "body": {"size": attachment_size, "attachmentId": f"att-{rng.getrandbits(48):x}"},
+                },
+            ],
+        }
+    payload["headers"] = headers + payload.get("headers", [])
+    return payload
+
+def generate_mailbox(count: int, seed: int = 1, now: float = None) -> List[dict]:
+    """
+    Generate `count` inbox messages received over the last 23 hours
+    Returned newest first, like messages.list.
+    """
+    rng = random.Random(seed)
+    now = now or time.time()
+    layouts, weights = zip(*LAYOUTS)
+    messages = []
+    for index in range(count):
+        message_id = f"{seed:x}{index:08x}"
+        received = now - rng.uniform(60, 23 * 3600)
+        name, address = rng.choice(SENDERS)
+        subject = " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 9))).capitalize()
+        size = min(int(rng.lognormvariate(math.log(BODY_SIZE_MEDIAN), BODY_SIZE_SIGMA)), BODY_SIZE_MAX)
+        body = body_text(rng, size)
+
+        headers = [
+            {"name": "From", "value": f"{name} <{address}>"},
+            {"name": "To", "value": "bench@example.com"},
+            {"name": "Subject", "value": subject},
+            {"name": "Date", "value": time.strftime("%a, %d %b %Y %H:%M:%S +0000", time.gmtime(received))},
+            {"name": "Message-ID", "value": f"<{message_id}@mail.example>"},
+        ]
+        if rng.random() < 0.3:
+            headers.append({"name": "List-Unsubscribe", "value": f"<https://{address.split('@')[1]}/u/{message_id}>"})
+            if rng.random() < 0.5:
+                headers.append({"name": "List-Unsubscribe-Post", "value": "List-Unsubscribe=One-Click"})
+
+        messages.append({
+            "id": message_id,
+            "threadId": message_id,
+            "labelIds": ["INBOX", "UNREAD"],
+            "snippet": body[:100],
+            "internalDate": str(int(received * 1000)),
+            "sizeEstimate": size,
+            "payload": _payload(rng, rng.choices(layouts, weights)[0], headers, body),
+        })
+
+    messages.sort(key=lambda message: int(message["internalDate"]), reverse=True)
+    return messages
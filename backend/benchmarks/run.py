@@ -0,0 +1,234 @@
+"""
+Sync benchmark: run the worker's sync path against fake Gmail and OpenAI
+
+    python -m benchmarks.run --emails 500 --gmail-latency-ms 40 --openai-latency-ms 300
+
+Starts both fakes in child processes, creates a throwaway user with one
+Gmail account and a few categories in DATABASE_URL (use a dedicated
+database), and calls app.worker.sync_account until the fake inbox is
+empty. The report is printed and written to
+benchmarks/results/<git sha>.json so runs on different commits can be
+diffed with benchmarks.compare.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from statistics import quantiles
+from typing import List, Optional
+
+import httpx
+
+from benchmarks import fake_gmail, fake_openai
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+def git_revision() -> str:
+    """Current commit SHA, suffixed with -dirty when the tree has local changes"""
+    try:
+        sha = subprocess.check_output(["git", "rev-parse", "--short=12", "HEAD"], text=True).strip()
+        dirty = subprocess.call(["git", "diff", "--quiet", "HEAD", "--", "."]) != 0
+        return f"{sha}-dirty" if dirty else sha
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def wait_until_ready(url: str, timeout: float = 15.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.TransportError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Fake server at {url} did not start")
+
+def percentile(values: List[float], pct: int) -> Optional[float]:
+    if not values:
+        return None
+    if len(values) == 1:
+        return values[0]
+    return quantiles(values, n=100, method="inclusive")[pct - 1]
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+async def run_sync(account_id: int, max_rounds: int) -> dict:
+    """Sync the benchmark account until the inbox is drained"""
+    # Imported here so the fake endpoints are configured before settings load
+    from app.core.database import SessionLocal
+    from app.models import GmailAccount
+    from app.worker import sync_account
+
+    rounds = errors = synced = 0
+    # sync_account commits before every Gmail and OpenAI call and reads the account between them
+    db = SessionLocal(expire_on_commit=False)
+    try:
+        while rounds < max_rounds:
+            rounds += 1
+            account = db.get(GmailAccount, account_id)
+            # Each sync only looks back from last_sync_time; start over each round
+            account.last_sync_time = None
+            db.commit()
+            try:
+                count = await sync_account(db, account)
+            except Exception:
+                errors += 1
+                continue
+            synced += count
+            if count == 0:
+                break
+    finally:
+        db.close()
+    return {"rounds": rounds, "sync_errors": errors, "synced": synced}
+
+def create_fixture(categories: int) -> tuple:
+    from app.core.database import SessionLocal
+    from app.models import Category, GmailAccount, User
+
+    db = SessionLocal()
+    try:
+        email = f"bench-{uuid.uuid4().hex[:8]}@example.com"
+        user = User(email=email)
+        db.add(user)
+        db.flush()
+        account = GmailAccount(
+            email=email,
+            google_id=f"bench-{uuid.uuid4().hex}",
+            access_token="bench-token",
+            refresh_token="bench-refresh",
+            token_expiry=datetime.utcnow() + timedelta(days=1),
+            is_primary=True,
+            user_id=user.id
+        )
+        db.add(account)
+        names = ["Receipts", "Newsletters", "Work", "Travel", "Security", "Social", "Finance", "Updates"]
+        for index in range(categories):
+            db.add(Category(
+                name=names[index % len(names)],
+                description=f"Emails about {names[index % len(names)].lower()}",
+                user_id=user.id
+            ))
+        db.commit()
+        return user.id, account.id
+    finally:
+        db.close()
+
+def drop_fixture(user_id: int) -> None:
+    from sqlalchemy import delete
+    from app.core.database import SessionLocal
+    from app.models import Category, Email, EmailCounter, GmailAccount, User, UserVersion
+
+    db = SessionLocal()
+    try:
+        for model in (Email, EmailCounter, Category, GmailAccount, UserVersion):
+            db.execute(delete(model).where(model.user_id == user_id))
+        db.execute(delete(User).where(User.id == user_id))
+        db.commit()
+    finally:
+        db.close()
+
+def main(argv=None) -> dict:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--emails", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--categories", type=int, default=5)
+    parser.add_argument("--gmail-latency-ms", type=float, default=30.0)
+    parser.add_argument("--gmail-jitter-ms", type=float, default=10.0)
+    parser.add_argument("--gmail-429-rate", type=float, default=0.0)
+    parser.add_argument("--openai-latency-ms", type=float, default=200.0)
+    parser.add_argument("--openai-jitter-ms", type=float, default=50.0)
+    parser.add_argument("--max-rounds", type=int, default=1000)
+    parser.add_argument("--output-dir", default=RESULTS_DIR)
+    parser.add_argument("--keep-data", action="store_true", help="Leave the benchmark user in the database")
+    args = parser.parse_args(argv)
+
+    gmail_port, openai_port = free_port(), free_port()
+    servers = [
+        multiprocessing.Process(target=fake_gmail.serve, args=(gmail_port, args.emails, args.seed), kwargs={
+            "latency_ms": args.gmail_latency_ms,
+            "jitter_ms": args.gmail_jitter_ms,
+            "error_rate": args.gmail_429_rate,
+        }, daemon=True),
+        multiprocessing.Process(target=fake_openai.serve, args=(openai_port,), kwargs={
+            "latency_ms": args.openai_latency_ms,
+            "jitter_ms": args.openai_jitter_ms,
+            "seed": args.seed,
+        }, daemon=True),
+    ]
+    for server in servers:
+        server.start()
+
+    gmail_url = f"http://127.0.0.1:{gmail_port}/"
+    openai_url = f"http://127.0.0.1:{openai_port}/v1"
+    os.environ["GMAIL_API_ENDPOINT"] = gmail_url
+    os.environ["OPENAI_BASE_URL"] = openai_url
+    os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+    try:
+        wait_until_ready(f"{gmail_url}_stats")
+        wait_until_ready(f"http://127.0.0.1:{openai_port}/_stats")
+
+        user_id, account_id = create_fixture(args.categories)
+        rss_before = peak_rss_mb()
+        start = time.perf_counter()
+        outcome = asyncio.run(run_sync(account_id, args.max_rounds))
+        elapsed = time.perf_counter() - start
+
+        gmail_stats = httpx.get(f"{gmail_url}_stats").json()
+        openai_stats = httpx.get(f"http://127.0.0.1:{openai_port}/_stats").json()
+        if not args.keep_data:
+            drop_fixture(user_id)
+    finally:
+        for server in servers:
+            server.terminate()
+
+    latencies = gmail_stats.pop("email_latencies")
+    synced = outcome["synced"]
+    report = {
+        "revision": git_revision(),
+        "timestamp": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "python": platform.python_version(),
+        "params": {key: value for key, value in vars(args).items() if key not in ("output_dir", "keep_data")},
+        "results": {
+            **outcome,
+            "left_in_inbox": gmail_stats["inbox"],
+            "elapsed_seconds": round(elapsed, 3),
+            "emails_per_second": round(synced / elapsed, 3) if elapsed else None,
+            "email_latency_p50_ms": round(percentile(latencies, 50) * 1000, 1) if latencies else None,
+            "email_latency_p95_ms": round(percentile(latencies, 95) * 1000, 1) if latencies else None,
+            "gmail_calls_per_email": round(sum(gmail_stats["calls"].values()) / synced, 3) if synced else None,
+            "openai_calls_per_email": round(sum(openai_stats["calls"].values()) / synced, 3) if synced else None,
+            "openai_tokens_per_email": round(sum(openai_stats["tokens"].values()) / synced, 1) if synced else None,
+            "gmail_calls": gmail_stats["calls"],
+            "openai_calls": openai_stats["calls"],
+            "rss_before_mb": round(rss_before, 1),
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+        },
+    }
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    path = os.path.join(args.output_dir, f"{report['revision']}.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+    print(f"Wrote {path}", file=sys.stderr)
+    return report
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""
+Bulk-load synthetic users and emails for load testing
+
+    python -m benchmarks.seed --users 20 --emails-per-user 50000
+    python -m benchmarks.seed --drop
+
+Users, accounts and categories are inserted normally; emails are streamed
+in with COPY, then counters are rebuilt and the table is analyzed. Writes
+a manifest with each user's token, category IDs and email ID range for
+benchmarks.load. Use a dedicated database.
+"""
+import argparse
+import csv
+import io
+import json
+import math
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.mailbox import BODY_SIZE_MEDIAN, BODY_SIZE_SIGMA, SENDERS, WORDS, body_text
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+DEFAULT_MANIFEST = os.path.join(RESULTS_DIR, "loadtest-users.json")
+USER_PREFIX = "loadtest-"
+CATEGORY_NAMES = ["Receipts", "Newsletters", "Work", "Travel", "Security", "Social", "Finance", "Updates"]
+
+EMAIL_COLUMNS = (
+    "gmail_id", "subject", "sender", "content", "summary", "unsubscribe_link",
+    "unsubscribe_one_click", "received_at", "is_archived", "category_id",
+    "user_id", "gmail_account_id", "created_at", "updated_at",
+)
+COPY_BATCH_ROWS = 20000
+# Email bodies are slices of one shared corpus; generating each is too slow at this scale
+CORPUS_SIZE = 4 * 1024 * 1024
+BODY_SIZE_MAX = 64 * 1024
+
+def email_rows(rng, corpus, run_id, user_id, account_id, category_ids, count, now):
+    for index in range(count):
+        size = min(int(rng.lognormvariate(math.log(BODY_SIZE_MEDIAN), BODY_SIZE_SIGMA)), BODY_SIZE_MAX)
+        offset = rng.randrange(0, len(corpus) - size)
+        name, address = rng.choice(SENDERS)
+        categorized = category_ids and rng.random() < 0.7
+        received_at = now - timedelta(seconds=rng.uniform(0, 365 * 86400))
+        yield (
+            f"{USER_PREFIX}{run_id}-{user_id}-{index}",
+            " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 9))).capitalize(),
+            f"{name} <{address}>",
+            corpus[offset:offset + size],
+            "The sender shares an update and asks for a short reply." if categorized else None,
+            f"https://{address.split('@')[1]}/u/{index}" if rng.random() < 0.3 else None,
+            "f",
+            received_at,
+            "t",
+            rng.choice(category_ids) if categorized else None,
+            user_id,
+            account_id,
+            received_at,
+            received_at,
+        )
+
+def copy_emails(raw_connection, rows) -> int:
+    """Stream rows into the emails table with COPY, one batch at a time"""
+    copied = 0
+    statement = f"COPY emails ({', '.join(EMAIL_COLUMNS)}) FROM STDIN WITH (FORMAT csv)"
+    cursor = raw_connection.cursor()
+    while True:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        batch = 0
+        for row in rows:
+            # csv writes None as an empty unquoted field, which COPY reads as NULL
+            writer.writerow(row)
+            batch += 1
+            if batch == COPY_BATCH_ROWS:
+                break
+        if not batch:
+            break
+        buffer.seek(0)
+        cursor.copy_expert(statement, buffer)
+        copied += batch
+    raw_connection.commit()
+    return copied
+
+def seed(users: int, emails_per_user: int, categories: int, seed_value: int) -> dict:
+    from sqlalchemy import func, text
+    from app.api.api_v1.endpoints.auth import create_access_token
+    from app.core.counters import reconcile_counters
+    from app.core.database import SessionLocal, engine
+    from app.models import Category, Email, GmailAccount, User
+
+    rng = random.Random(seed_value)
+    corpus = body_text(rng, CORPUS_SIZE)
+    run_id = f"{int(time.time()):x}"
+    now = datetime.utcnow()
+    manifest = {"run_id": run_id, "emails_per_user": emails_per_user, "users": []}
+
+    db = SessionLocal()
+    raw_connection = engine.raw_connection()
+    try:
+        for index in range(users):
+            email = f"{USER_PREFIX}{run_id}-{index}@example.com"
+            user = User(email=email)
+            db.add(user)
+            db.flush()
+            account = GmailAccount(
+                email=email,
+                google_id=f"{USER_PREFIX}{run_id}-{index}",
+                access_token="loadtest",
+                token_expiry=now + timedelta(days=365),
+                is_primary=True,
+                user_id=user.id
+            )
+            user_categories = [
+                Category(name=name, description=f"Emails about {name.lower()}", user_id=user.id)
+                for name in CATEGORY_NAMES[:categories]
+            ]
+            db.add(account)
+            db.add_all(user_categories)
+            db.commit()
+            category_ids = [category.id for category in user_categories]
+
+            started = time.perf_counter()
+            copied = copy_emails(
+                raw_connection,
+                email_rows(rng, corpus, run_id, user.id, account.id, category_ids, emails_per_user, now)
+            )
+            # COPY bypasses the ORM hooks that maintain counters
+            reconcile_counters(db, user.id)
+            min_id, max_id = db.query(func.min(Email.id), func.max(Email.id)).filter(Email.user_id == user.id).one()
+            manifest["users"].append({
+                "id": user.id,
+                "token": create_access_token(user.id),
+                "category_ids": category_ids,
+                "email_id_range": [min_id, max_id],
+            })
+            print(f"User {index + 1}/{users}: {copied} emails in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+        db.execute(text("ANALYZE emails"))
+        db.commit()
+    finally:
+        raw_connection.close()
+        db.close()
+    return manifest
+
+def drop() -> int:
+    """Delete every seeded user and their data; returns the number of users"""
+    from sqlalchemy import delete, select
+    from app.core.database import SessionLocal
+    from app.models import Category, Email, EmailCounter, GmailAccount, User, UserVersion
+
+    db = SessionLocal()
+    try:
+        user_ids = select(User.id).where(User.email.like(f"{USER_PREFIX}%")).scalar_subquery()
+        for model in (Email, EmailCounter, Category, GmailAccount, UserVersion):
+            db.execute(delete(model).where(model.user_id.in_(user_ids)))
+        result = db.execute(delete(User).where(User.email.like(f"{USER_PREFIX}%")))
+        db.commit()
+        return result.rowcount
+    finally:
+        db.close()
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--emails-per-user", type=int, default=10000)
+    parser.add_argument("--categories", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--manifest", default=DEFAULT_MANIFEST)
+    parser.add_argument("--drop", action="store_true", help="Remove all seeded users instead of seeding")
+    args = parser.parse_args(argv)
+
+    if args.drop:
+        print(f"Dropped {drop()} seeded users", file=sys.stderr)
+        return
+
+    manifest = seed(args.users, args.emails_per_user, min(args.categories, len(CATEGORY_NAMES)), args.seed)
+    os.makedirs(os.path.dirname(args.manifest) or ".", exist_ok=True)
+    with open(args.manifest, "w") as f:
+        json.dump(manifest, f, indent=2)
+    print(f"Wrote {args.manifest}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Gmail and OpenAI clients against stand-in servers
+
+Points the real clients at local servers (the benchmark fakes, or small
+apps answering with a fixed status) and checks request timeouts, retries,
+and how failures map to DependencyError kinds.
+"""
+import asyncio
+import time
+
+import httpx
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from app.core.config import settings
+from app.core.resilience import AUTH, PERMANENT, QUOTA, TRANSIENT, BreakerGroup, CircuitBreaker, DependencyError
+from app.models import GmailAccount
+from app.services import ai, gmail
+from app.services.ai import AIService
+from app.services.gmail import GmailService
+from benchmarks import fake_gmail, fake_openai
+from benchmarks.mailbox import generate_mailbox
+
+LATENCY_MS = 1500
+TIMEOUT_SECONDS = 0.3
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    """Short backoff, and breakers that start closed for every test"""
+    monkeypatch.setattr(settings, "RETRY_MAX_ATTEMPTS", 3)
+    monkeypatch.setattr(settings, "RETRY_BASE_SECONDS", 0.01)
+    monkeypatch.setattr(settings, "RETRY_MAX_SECONDS", 0.05)
+    monkeypatch.setattr(gmail, "gmail_breaker", CircuitBreaker(gmail.GMAIL, "global", threshold=100))
+    monkeypatch.setattr(gmail, "account_breakers", BreakerGroup(gmail.GMAIL, "account", threshold=100))
+    monkeypatch.setattr(ai, "openai_breaker", CircuitBreaker(ai.OPENAI, "global", threshold=100))
+
+def status_app(path: str, status_code: int, body: dict, headers: dict = None):
+    """A server answering every request to `path` with a fixed status; returns (app, calls)"""
+    app = FastAPI()
+    calls = []
+
+    @app.api_route(path, methods=["GET", "POST"])
+    async def respond(request: Request):
+        calls.append(request.url.path)
+        return JSONResponse(body, status_code=status_code, headers=headers)
+
+    return app, calls
+
+def gmail_service(monkeypatch, base_url: str) -> GmailService:
+    monkeypatch.setattr(settings, "GMAIL_API_ENDPOINT", f"{base_url}/")
+    account = GmailAccount(id=1, email="tester@example.com", access_token="token")
+    return GmailService(account, db=None)
+
+def gmail_error(message: str, status: str, reason: str = None) -> dict:
+    error = {"code": 0, "message": message, "status": status}
+    if reason:
+        error["errors"] = [{"message": message, "domain": "global", "reason": reason}]
+    return {"error": error}
+
+def test_gmail_lists_the_fake_mailbox(monkeypatch, serve):
+    base_url = serve(fake_gmail.create_app(generate_mailbox(5, seed=3)))
+    emails = gmail_service(monkeypatch, base_url).list_unarchived_emails()
+
+    assert len(emails) == 5
+    assert all(email["gmail_id"] and email["received_at"] for email in emails)
+
+def test_gmail_requests_time_out(monkeypatch, serve):
+    monkeypatch.setattr(settings, "GMAIL_TIMEOUT_SECONDS", TIMEOUT_SECONDS)
+    base_url = serve(fake_gmail.create_app(generate_mailbox(1), latency_ms=LATENCY_MS))
+    service = gmail_service(monkeypatch, base_url)
+
+    start = time.perf_counter()
+    with pytest.raises(DependencyError) as raised:
+        service.archive_email("missing")
+    elapsed = time.perf_counter() - start
+
+    assert raised.value.kind == TRANSIENT
+    # Every attempt gave up at the timeout instead of waiting for the response
+    assert elapsed < settings.RETRY_MAX_ATTEMPTS * LATENCY_MS / 1000
+
+def test_gmail_rate_limits_are_retried_then_raised_as_quota(monkeypatch, serve):
+    base_url = serve(fake_gmail.create_app(generate_mailbox(1), error_rate=1.0))
+    service = gmail_service(monkeypatch, base_url)
+
+    with pytest.raises(DependencyError) as raised:
+        service.archive_email("any")
+
+    assert raised.value.kind == QUOTA
+    stats = httpx.get(f"{base_url}/_stats").json()
+    assert stats["calls"]["rate_limited"] == settings.RETRY_MAX_ATTEMPTS
+
+@pytest.mark.parametrize("status_code, body, kind, attempts", [
+    (500, gmail_error("Backend Error", "INTERNAL"), TRANSIENT, 3),
+    (403, gmail_error("Quota exceeded", "PERMISSION_DENIED", "userRateLimitExceeded"), QUOTA, 3),
+    (403, gmail_error("Insufficient Permission", "PERMISSION_DENIED", "insufficientPermissions"), PERMANENT, 1),
+    (401, gmail_error("Invalid Credentials", "UNAUTHENTICATED", "authError"), AUTH, 1),
+    (400, gmail_error("Invalid id", "INVALID_ARGUMENT", "invalidArgument"), PERMANENT, 1),
+])
+def test_gmail_errors_map_to_kinds(monkeypatch, serve, status_code, body, kind, attempts):
+    app, calls = status_app("/gmail/v1/users/me/messages/{message_id}/modify", status_code, body)
+    service = gmail_service(monkeypatch, serve(app))
+
+    with pytest.raises(DependencyError) as raised:
+        service.archive_email("message")
+
+    assert raised.value.kind == kind
+    # Only quota and transient errors are retried
+    assert len(calls) == attempts
+
+def openai_service(monkeypatch, base_url: str) -> AIService:
+    monkeypatch.setattr(settings, "OPENAI_BASE_URL", f"{base_url}/v1")
+    return AIService()
+
+def test_openai_summarizes_through_the_fake(monkeypatch, serve):
+    service = openai_service(monkeypatch, serve(fake_openai.create_app()))
+    summary = asyncio.run(service.summarize_email("Lunch on Friday?", "Lunch", raise_errors=True))
+
+    assert summary
+
+def test_openai_requests_time_out(monkeypatch, serve):
+    monkeypatch.setattr(settings, "OPENAI_TIMEOUT_SECONDS", TIMEOUT_SECONDS)
+    service = openai_service(monkeypatch, serve(fake_openai.create_app(latency_ms=LATENCY_MS)))
+
+    start = time.perf_counter()
+    with pytest.raises(DependencyError) as raised:
+        asyncio.run(service.summarize_email("Body", "Subject", raise_errors=True))
+    elapsed = time.perf_counter() - start
+
+    assert raised.value.kind == TRANSIENT
+    assert elapsed < settings.RETRY_MAX_ATTEMPTS * LATENCY_MS / 1000
+
+def test_openai_failures_fall_back_without_raise_errors(monkeypatch, serve):
+    app, calls = status_app("/v1/chat/completions", 500, {"error": {"message": "Server error"}})
+    service = openai_service(monkeypatch, serve(app))
+
+    assert asyncio.run(service.summarize_email("Body", "Subject")) == ai.SUMMARY_ERROR
+    assert len(calls) == settings.RETRY_MAX_ATTEMPTS
+
+@pytest.mark.parametrize("status_code, kind, attempts", [
+    (429, QUOTA, 3),
+    (503, TRANSIENT, 3),
+    (401, AUTH, 1),
+    (400, PERMANENT, 1),
+])
+def test_openai_errors_map_to_kinds(monkeypatch, serve, status_code, kind, attempts):
+    app, calls = status_app(
+        "/v1/chat/completions", status_code, {"error": {"message": "Failed", "type": "test"}}, {"retry-after": "0"}
+    )
+    service = openai_service(monkeypatch, serve(app))
+
+    with pytest.raises(DependencyError) as raised:
+        asyncio.run(service.summarize_email("Body", "Subject", raise_errors=True))
+
+    assert raised.value.kind == kind
+    assert len(calls) == attempts
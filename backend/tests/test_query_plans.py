@@ -0,0 +1,141 @@
+"""
+Query plan regression tests for the hot email queries
+
+Seeds a few hundred users with tens of thousands of emails, then checks
+with EXPLAIN that each query is served by the index built for it rather
+than a sequential scan.
+"""
+import json
+from datetime import datetime
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+
+from app.api.api_v1.endpoints.emails import email_filters
+from app.models import Category, Email, GmailAccount, GmailMessage
+
+USERS = 400
+CATEGORIES_PER_USER = 8
+EMAILS_PER_USER = 150
+
+@pytest.fixture(scope="module")
+def seeded(db_connection, db_session):
+    """Seed users, accounts, categories and emails; returns the IDs of one user's rows"""
+    now = datetime.utcnow()
+    db_connection.execute(text(
+        "INSERT INTO users (email, created_at, updated_at) "
+        "SELECT 'plan-user-' || n || '@example.com', now(), now() FROM generate_series(1, :users) n"
+    ), {"users": USERS})
+    db_connection.execute(text(
+        "INSERT INTO gmail_accounts (email, google_id, is_primary, user_id, created_at, updated_at) "
+        "SELECT 'plan-account-' || u.id || '@example.com', 'plan-' || u.id, true, u.id, now(), now() "
+        "FROM users u WHERE u.email LIKE 'plan-user-%'"
+    ))
+    db_connection.execute(text(
+        "INSERT INTO categories (name, description, user_id, created_at, updated_at) "
+        "SELECT 'Category ' || n, 'Seeded', u.id, now(), now() "
+        "FROM users u CROSS JOIN generate_series(1, :categories) n WHERE u.email LIKE 'plan-user-%'"
+    ), {"categories": CATEGORIES_PER_USER})
+    # Emails spread over the last 15 months, so the old partition is populated too
+    db_connection.execute(text(
+        "INSERT INTO emails (gmail_id, subject, sender, content, received_at, is_archived, "
+        "category_id, user_id, gmail_account_id, created_at, updated_at) "
+        "SELECT 'plan-' || a.id || '-' || n, 'Subject ' || n, 'sender@example.com', 'Body', "
+        "CAST(:now AS timestamp) - n * interval '3 days', true, "
+        "(SELECT c.id FROM categories c WHERE c.user_id = a.user_id ORDER BY c.id OFFSET n % :categories LIMIT 1), "
+        "a.user_id, a.id, now(), now() "
+        "FROM gmail_accounts a CROSS JOIN generate_series(1, :emails) n WHERE a.email LIKE 'plan-account-%'"
+    ), {"now": now, "categories": CATEGORIES_PER_USER, "emails": EMAILS_PER_USER})
+    db_connection.execute(text(
+        "INSERT INTO gmail_messages (gmail_account_id, gmail_id, email_id, received_at) "
+        "SELECT gmail_account_id, gmail_id, id, received_at FROM emails WHERE gmail_id LIKE 'plan-%'"
+    ))
+    for table in ("users", "gmail_accounts", "categories", "emails", "gmail_messages"):
+        db_connection.execute(text(f"ANALYZE {table}"))
+
+    account = db_session.query(GmailAccount).filter(GmailAccount.email.like("plan-account-%")).first()
+    category = db_session.query(Category).filter(Category.user_id == account.user_id).first()
+    email = db_session.query(Email).filter(Email.gmail_account_id == account.id).first()
+    # Planning a sequential scan of an empty partition (e.g. next month's) is fine
+    empty = {name for (name,) in db_connection.execute(text(
+        "SELECT relname FROM pg_class WHERE relispartition AND relname LIKE 'emails_p%' AND reltuples <= 0"
+    ))}
+    return {
+        "empty_partitions": empty,
+        "user_id": account.user_id,
+        "gmail_account_id": account.id,
+        "category_id": category.id,
+        "gmail_id": email.gmail_id,
+    }
+
+def plan_nodes(db_session, query) -> list:
+    """All nodes of the EXPLAIN plan for an ORM query or statement"""
+    statement = getattr(query, "statement", query)
+    sql = statement.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})
+    plan = db_session.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    nodes = []
+    def walk(node):
+        nodes.append(node)
+        for child in node.get("Plans", []):
+            walk(child)
+    walk(plan[0]["Plan"])
+    return nodes
+
+def assert_uses_index(nodes: list, table: str, *indexes: str, skip=()) -> None:
+    """
+    Assert that `table` is only read through indexes, one of them in `indexes`
+    Partitions of emails have their own copies of each index, named after
+    the partition and the indexed columns, so an index may be given as a
+    fragment of its name. Relations in `skip` are not checked.
+    """
+    reads = [
+        node for node in nodes
+        if node.get("Relation Name", "").startswith(table) and node["Relation Name"] not in skip
+    ]
+    assert reads, f"{table} is not read by the plan"
+    for node in reads:
+        assert node["Node Type"] in ("Index Scan", "Index Only Scan", "Bitmap Heap Scan"), (
+            f"{node['Relation Name']} read with {node['Node Type']}"
+        )
+    index_names = [node["Index Name"] for node in nodes if "Index Name" in node]
+    assert any(index in name for index in indexes for name in index_names), (
+        f"none of {indexes} used; plan uses {index_names}"
+    )
+
+def list_query(db_session, user_id, **filters):
+    """The query list_emails runs for a page of 50"""
+    return db_session.query(Email).join(Email.gmail_account).filter(
+        *email_filters(db_session, user_id, **filters)
+    ).order_by(Email.received_at.desc()).limit(50)
+
+def test_list_emails_uses_user_index(db_session, seeded):
+    nodes = plan_nodes(db_session, list_query(db_session, seeded["user_id"]))
+    assert_uses_index(nodes, "emails", "user_id_received_at", skip=seeded["empty_partitions"])
+
+def test_list_emails_by_category_uses_category_index(db_session, seeded):
+    query = list_query(db_session, seeded["user_id"], category_id=seeded["category_id"])
+    assert_uses_index(plan_nodes(db_session, query), "emails", "category_id_received_at", skip=seeded["empty_partitions"])
+
+def test_list_emails_by_account_uses_account_index(db_session, seeded):
+    query = list_query(db_session, seeded["user_id"], gmail_account_id=seeded["gmail_account_id"])
+    assert_uses_index(plan_nodes(db_session, query), "emails", "gmail_account_id_received_at", skip=seeded["empty_partitions"])
+
+def test_sync_dedup_lookup_uses_primary_key(db_session, seeded):
+    # Same lookup as store_new_email's existence check
+    query = db_session.query(GmailMessage).filter(
+        GmailMessage.gmail_account_id == seeded["gmail_account_id"],
+        GmailMessage.gmail_id == seeded["gmail_id"]
+    )
+    assert_uses_index(plan_nodes(db_session, query), "gmail_messages", "gmail_messages_pkey")
+
+def test_category_list_uses_user_index(db_session, seeded):
+    query = db_session.query(Category).filter(Category.user_id == seeded["user_id"])
+    assert_uses_index(plan_nodes(db_session, query), "categories", "ix_categories_user_id")
+
+def test_account_list_uses_user_index(db_session, seeded):
+    query = db_session.query(GmailAccount).filter(GmailAccount.user_id == seeded["user_id"])
+    assert_uses_index(plan_nodes(db_session, query), "gmail_accounts", "ix_gmail_accounts_user_id")
@@ -0,0 +1,131 @@
+"""Bulk unsubscribe executor against a stand-in server with slow and failing endpoints"""
+import asyncio
+import time
+
+import pytest
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import RedirectResponse
+
+from app.services.unsubscribe import ONE_CLICK_BODY, UnsubscribeExecutor, UnsubscribeTarget
+from benchmarks.run import free_port
+
+SLOW_SECONDS = 2.0
+
+def stand_in_app(state: dict) -> FastAPI:
+    """Unsubscribe endpoints that answer, fail, stall or redirect; records what they receive"""
+    app = FastAPI()
+    state.update(requests=[], in_flight=0, max_in_flight=0, one_click_bodies=[])
+
+    @app.middleware("http")
+    async def record(request: Request, call_next):
+        state["requests"].append(request.url.path)
+        return await call_next(request)
+
+    @app.get("/ok")
+    def ok():
+        return {"unsubscribed": True}
+
+    @app.get("/fail")
+    def fail():
+        return Response(status_code=500)
+
+    @app.get("/gone")
+    def gone():
+        return Response(status_code=404)
+
+    @app.get("/slow")
+    async def slow():
+        await asyncio.sleep(SLOW_SECONDS)
+        return {"unsubscribed": True}
+
+    @app.get("/redirect")
+    def redirect():
+        return RedirectResponse("/ok", status_code=302)
+
+    @app.post("/one-click")
+    async def one_click(request: Request):
+        state["one_click_bodies"].append(dict(await request.form()))
+        return {"unsubscribed": True}
+
+    @app.get("/tracked")
+    async def tracked():
+        state["in_flight"] += 1
+        state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+        await asyncio.sleep(0.1)
+        state["in_flight"] -= 1
+        return {"unsubscribed": True}
+
+    return app
+
+@pytest.fixture
+def stand_in(serve):
+    state = {}
+    return serve(stand_in_app(state)), state
+
+def run(executor: UnsubscribeExecutor, targets):
+    return {result.request_id: result for result in asyncio.run(executor.run(targets))}
+
+def test_outcomes_are_tracked_per_request(stand_in):
+    base_url, state = stand_in
+    executor = UnsubscribeExecutor(timeout=0.5, allow_private_hosts=True)
+    results = run(executor, [
+        UnsubscribeTarget(1, f"{base_url}/ok", False),
+        UnsubscribeTarget(2, f"{base_url}/fail", False),
+        UnsubscribeTarget(3, f"{base_url}/gone", False),
+        UnsubscribeTarget(4, f"{base_url}/redirect", False),
+    ])
+
+    assert (results[1].succeeded, results[1].status_code, results[1].error) == (True, 200, None)
+    assert (results[2].succeeded, results[2].status_code, results[2].error) == (False, 500, "HTTP 500")
+    assert (results[3].succeeded, results[3].status_code, results[3].error) == (False, 404, "HTTP 404")
+    # Plain links may redirect to a confirmation page
+    assert (results[4].succeeded, results[4].status_code) == (True, 200)
+
+def test_slow_endpoints_time_out_without_holding_up_the_rest(stand_in):
+    base_url, state = stand_in
+    executor = UnsubscribeExecutor(timeout=0.3, allow_private_hosts=True)
+    start = time.perf_counter()
+    results = run(executor, [
+        UnsubscribeTarget(1, f"{base_url}/slow", False),
+        UnsubscribeTarget(2, f"{base_url}/ok", False),
+    ])
+    elapsed = time.perf_counter() - start
+
+    assert (results[1].succeeded, results[1].status_code, results[1].error) == (False, None, "Timed out")
+    assert results[2].succeeded
+    assert elapsed < SLOW_SECONDS
+
+def test_unreachable_hosts_are_failures():
+    executor = UnsubscribeExecutor(timeout=0.5, allow_private_hosts=True)
+    # Nothing listens on a freshly released port
+    results = run(executor, [UnsubscribeTarget(1, f"http://127.0.0.1:{free_port()}/ok", False)])
+
+    assert not results[1].succeeded
+    assert results[1].status_code is None
+    assert results[1].error
+
+def test_one_click_links_get_the_rfc_8058_post(stand_in):
+    base_url, state = stand_in
+    executor = UnsubscribeExecutor(timeout=0.5, allow_private_hosts=True)
+    results = run(executor, [UnsubscribeTarget(1, f"{base_url}/one-click", True)])
+
+    assert results[1].succeeded
+    assert state["one_click_bodies"] == [ONE_CLICK_BODY]
+
+def test_requests_to_one_host_are_capped(stand_in):
+    base_url, state = stand_in
+    executor = UnsubscribeExecutor(concurrency=10, per_host_concurrency=2, timeout=2, allow_private_hosts=True)
+    results = run(executor, [UnsubscribeTarget(n, f"{base_url}/tracked", False) for n in range(8)])
+
+    assert all(result.succeeded for result in results.values())
+    assert state["max_in_flight"] == 2
+
+def test_private_hosts_are_refused_by_default(stand_in):
+    base_url, state = stand_in
+    results = run(UnsubscribeExecutor(timeout=0.5, allow_private_hosts=False), [
+        UnsubscribeTarget(1, f"{base_url}/ok", False),
+    ])
+
+    assert not results[1].succeeded
+    assert "private address" in results[1].error
+    assert state["requests"] == []